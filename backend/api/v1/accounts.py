@@ -1,16 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from core.deps import get_current_user
 from schemas.account import CloudAccountCreate, CloudAccountResponse, CloudResourcesResponse
-from schemas.user import StandardResponse
+from schemas.user import StandardResponse, PaginatedResponse
 from models import User
 from services.cloud_account_service import CloudAccountService
 from services.aws_service import AwsService
+from services.aws_rate_limiter import aws_rate_limiter
 from db.database import get_db
+from db.partitions import utc_today
 from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import StreamingResponse
+from core.responses import FastJSONResponse
+from services.resource_export_service import EXPORT_FORMATS, stream_resources_export
+from services.scan_snapshot_service import ScanSnapshotService
+from services.cost_rollup_service import CostRollupService
+from models.resources import DETAIL_FIELD_PATTERN
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
 
 router = APIRouter()
 
+def parse_detail_fields(fields: Optional[str]) -> Optional[List[str]]:
+    detail_fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    if detail_fields and not all(DETAIL_FIELD_PATTERN.match(field) for field in detail_fields):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fields must be a comma separated list of detail keys"
+        )
+    return detail_fields
+
 @router.post('/', response_model=StandardResponse[CloudAccountResponse])
 def add_account(account_input: CloudAccountCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     cloud_account_service = CloudAccountService(db=db)
@@ -37,13 +56,144 @@ def get_account(db: Session = Depends(get_db), user: User = Depends(get_current_
         data=account_list
     )
 
-@router.get('/{account_id}/resources', response_model=StandardResponse[List[CloudResourcesResponse]])
-def get_resources(account_id: str, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+@router.get('/summary', response_model=StandardResponse)
+def get_accounts_summary(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    return StandardResponse(
+        message="Accounts summary retrieved",
+        data=CloudAccountService(db=db).get_summary(user.user_id)
+    )
+
+@router.get('/{account_id}/summary', response_model=StandardResponse)
+def get_account_summary(account_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    return StandardResponse(
+        message="Account summary retrieved",
+        data=CloudAccountService(db=db).get_summary(user.user_id, account_id)
+    )
+
+@router.get('/{account_id}/resources', response_model=PaginatedResponse[List[CloudResourcesResponse]])
+def get_resources(account_id: str,
+                  limit: int = Query(100, ge=1, le=1000),
+                  cursor: Optional[str] = None,
+                  resource_type: Optional[str] = None,
+                  region: Optional[str] = None,
+                  state: Optional[str] = None,
+                  tag_key: Optional[str] = None,
+                  tag_value: Optional[str] = None,
+                  fields: Optional[str] = None,
+                  as_of: Optional[datetime] = None,
+                  db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     cloud_account_service = CloudAccountService(db=db)
-    account_resources = cloud_account_service.get_resources(account_id)
+    account_resources, next_cursor = cloud_account_service.get_resources(
+        account_id, user_id=user.user_id, limit=limit, cursor=cursor,
+        resource_type=resource_type, region=region, state=state, tag_key=tag_key, tag_value=tag_value,
+        fields=parse_detail_fields(fields), as_of=as_of
+    )
+    # Rows are already shaped like CloudResourcesResponse, skip the model validation pass
+    return FastJSONResponse({
+        "message": f"Resources for account {account_id} successfully retrieved",
+        "data": account_resources,
+        "next_cursor": next_cursor
+    })
+
+@router.get('/{account_id}/resources/export')
+def export_resources(account_id: UUID,
+                     export_format: str = Query('ndjson', alias='format', pattern='^(ndjson|csv)$'),
+                     fields: Optional[str] = None,
+                     gzip: bool = False,
+                     db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    cloud_account_service = CloudAccountService(db=db)
+    cloud_account_service.check_account_owner(account_id=account_id, user_id=user.user_id)
+
+    detail_fields = parse_detail_fields(fields)
+
+    filename = f"resources-{account_id}.{export_format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_resources_export(account_id, export_format, detail_fields, gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get('/{account_id}/costs/summary', response_model=StandardResponse)
+def get_cost_summary(account_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    CloudAccountService(db=db).check_account_owner(account_id, user.user_id)
+    return StandardResponse(
+        message="Cost summary retrieved",
+        data=CostRollupService(db).summary(account_id)
+    )
+
+@router.get('/{account_id}/costs/monthly', response_model=StandardResponse)
+def get_monthly_costs(account_id: UUID,
+                      months: int = Query(12, ge=1, le=60),
+                      by_service: bool = False,
+                      db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    CloudAccountService(db=db).check_account_owner(account_id, user.user_id)
+    return FastJSONResponse({
+        "message": "Monthly costs retrieved",
+        "data": CostRollupService(db).monthly(account_id, months=months, by_service=by_service)
+    })
+
+@router.get('/{account_id}/costs/daily', response_model=StandardResponse)
+def get_daily_costs(account_id: UUID,
+                    start: Optional[date] = None,
+                    end: Optional[date] = None,
+                    by_service: bool = False,
+                    db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    CloudAccountService(db=db).check_account_owner(account_id, user.user_id)
+    end = end or utc_today()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days > 366:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end and at most 366 days apart"
+        )
+    return FastJSONResponse({
+        "message": "Daily costs retrieved",
+        "data": CostRollupService(db).daily(account_id, start, end, by_service=by_service)
+    })
+
+@router.get('/{account_id}/scans')
+def get_scans(account_id: UUID,
+              limit: int = Query(50, ge=1, le=500),
+              before: Optional[int] = None,
+              db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    CloudAccountService(db=db).check_account_owner(account_id, user.user_id)
+    scans = ScanSnapshotService(db).list_scans(account_id, limit=limit, before=before)
+    return FastJSONResponse({
+        "message": "Scans retrieved",
+        "data": scans,
+        "next_before": scans[-1]['id'] if len(scans) == limit else None
+    })
+
+@router.get('/{account_id}/scans/{scan_id}/snapshot')
+def get_scan_snapshot(account_id: UUID, scan_id: int,
+                      resource_type: Optional[str] = None,
+                      region: Optional[str] = None,
+                      db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """
+    Inventory as recorded by a past scan, rebuilt from its keyframe and deltas
+    """
+    CloudAccountService(db=db).check_account_owner(account_id, user.user_id)
+    inventory = ScanSnapshotService(db).reconstruct(account_id, scan_id)
+    if inventory is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan snapshot not found"
+        )
+    return FastJSONResponse({
+        "message": f"Snapshot of scan {scan_id} successfully retrieved",
+        "data": [
+            {"resource_type": key[0], "region": key[1], "resource_id": key[2], "detail": detail}
+            for key, detail in sorted(inventory.items())
+            if (resource_type is None or key[0] == resource_type) and (region is None or key[1] == region)
+        ]
+    })
+
+@router.get('/{account_id}/rate_limits', response_model=StandardResponse)
+def get_rate_limits(account_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    account = CloudAccountService(db=db).check_account_owner(account_id, user.user_id)
     return StandardResponse(
-        message=f"Resources for account {account_id} successfully retrieved",
-        data=account_resources
+        message="AWS rate limits retrieved",
+        data=aws_rate_limiter.stats(account.access_key_public)
     )
 
 @router.get('/{account_id}/test_connection', response_model=StandardResponse)
@@ -1,17 +1,35 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
 from models.user import User
 from core.deps import get_current_user
 from uuid import UUID
 from schemas.user import StandardResponse
-from worker import task_scan_account, celery_app
+from core.progress import get_progress_owner_async, stream_progress
+from worker import enqueue_scan, task_ingest_costs, celery_app
 
 router = APIRouter()
 
+@router.post("/{account_id}/scan-all", response_model=StandardResponse)
+async def scan_account_all_regions(account_id: UUID, user: User = Depends(get_current_user)):
+    task_id, created = enqueue_scan(str(account_id), str(user.user_id))
+    return StandardResponse(
+        message="Scan started successfully" if created else "Scan already in progress",
+        data={"task_id": task_id}
+    )
+
 @router.post("/{account_id}/scan-{region}", response_model=StandardResponse)
 async def scan_account(account_id: UUID, region: str, user: User = Depends(get_current_user)):
-    task = task_scan_account.delay(str(account_id), str(user.user_id), region)
+    task_id, created = enqueue_scan(str(account_id), str(user.user_id), region)
+    return StandardResponse(
+        message="Scan started successfully" if created else "Scan already in progress",
+        data={"task_id": task_id}
+    )
+
+@router.post("/{account_id}/ingest-costs", response_model=StandardResponse)
+async def ingest_costs(account_id: UUID, user: User = Depends(get_current_user)):
+    task = task_ingest_costs.delay(str(account_id), str(user.user_id))
     return StandardResponse(
-        message="Scan started successfully",
+        message="Cost ingestion started successfully",
         data={"task_id": task.id}
     )
 
@@ -27,3 +45,20 @@ async def get_task_status(task_id: str, user: User = Depends(get_current_user)):
             "error": str(task.result) if task.state == "FAILURE" else None
         }
     )
+
+@router.get("/task/{task_id}/events")
+async def stream_task_events(task_id: str, last_event_id: int = Header(0), user: User = Depends(get_current_user)):
+    """
+    Server-Sent Events of a scan (scan_started, service_started, batch_written, service_finished,
+    service_failed, scan_finished), replayed from the start or from the Last-Event-ID header
+    """
+    if await get_progress_owner_async(task_id) != str(user.user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan not found"
+        )
+    return StreamingResponse(
+        stream_progress(task_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,132 @@
+"""
+Cost queries on a plain daily_costs table against the same rows partitioned by month.
+
+Needs a reachable DATABASE_URL, the tables are temporary and everything is rolled back:
+    python -m benchmarks.bench_cost_partitions --accounts 100 --services 20 --years 3 --plans
+
+Prints the timing and the relations scanned for each query, --plans adds the full EXPLAIN ANALYZE output.
+"""
+
+import argparse
+import json
+import time
+from datetime import date
+from sqlalchemy import text
+from db.database import SessionLocal
+from db.partitions import month_start, partition_name
+
+# Shape of daily_costs before partitioning: UUID primary key, date index, unique (account, date, service)
+TABLE_SQL = """
+CREATE TEMP TABLE {table} (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    account_id UUID NOT NULL,
+    date DATE NOT NULL,
+    service_name VARCHAR NOT NULL,
+    cost NUMERIC(14, 5) NOT NULL,
+    currency VARCHAR NOT NULL DEFAULT 'USD',
+    PRIMARY KEY ({primary_key}),
+    UNIQUE (account_id, date, service_name)
+) {partitioning}
+"""
+
+ROWS_SQL = """
+INSERT INTO costs_plain (account_id, date, service_name, cost)
+SELECT account_id, day::date, 'service-' || service, round((random() * 100)::numeric, 5)
+FROM (SELECT gen_random_uuid() AS account_id FROM generate_series(1, :accounts)) AS accounts,
+    generate_series(1, :services) AS service,
+    generate_series(CAST(:start AS DATE), CAST(:end AS DATE), INTERVAL '1 day') AS day
+"""
+
+QUERIES = {
+    'month to date, one account': """
+        SELECT service_name, sum(cost) FROM {table}
+        WHERE account_id = :account_id AND date >= :month_start AND date <= :today
+        GROUP BY service_name
+    """,
+    '90 day trend, one account': """
+        SELECT date, sum(cost) FROM {table}
+        WHERE account_id = :account_id AND date > :today - 90 AND date <= :today
+        GROUP BY date ORDER BY date
+    """,
+    'anomaly window, all accounts': """
+        SELECT account_id, service_name, date, cost FROM {table}
+        WHERE date >= :today - 7 AND date <= :today
+    """,
+}
+
+
+def scanned_relations(plan: dict) -> set:
+    relations = {plan['Relation Name']} if 'Relation Name' in plan else set()
+    for child in plan.get('Plans', []):
+        relations |= scanned_relations(child)
+    return relations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--services', type=int, default=20)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--plans', action='store_true', help='print the full EXPLAIN ANALYZE of every query')
+    args = parser.parse_args()
+
+    today = date.today()
+    start = month_start(today, -12 * args.years)
+    db = SessionLocal()
+    try:
+        db.execute(text(TABLE_SQL.format(table='costs_plain', primary_key='id', partitioning='')))
+        db.execute(text("CREATE INDEX ON costs_plain (date)"))
+        db.execute(text(TABLE_SQL.format(table='costs_partitioned', primary_key='id, date', partitioning='PARTITION BY RANGE (date)')))
+        db.execute(text("CREATE INDEX ON costs_partitioned (date)"))
+        month = start
+        while month <= today:
+            db.execute(text(
+                f"CREATE TEMP TABLE {partition_name('costs_partitioned', month)} PARTITION OF costs_partitioned "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+            ))
+            month = month_start(month, 1)
+
+        db.execute(text(ROWS_SQL), {'accounts': args.accounts, 'services': args.services, 'start': start, 'end': today})
+        db.execute(text("INSERT INTO costs_partitioned SELECT * FROM costs_plain"))
+        db.execute(text("ANALYZE costs_plain"))
+        db.execute(text("ANALYZE costs_partitioned"))
+        rows = db.execute(text("SELECT count(*) FROM costs_plain")).scalar()
+        print(f"{rows} daily costs, {args.accounts} accounts x {args.services} services since {start}")
+
+        params = {
+            'account_id': db.execute(text("SELECT account_id FROM costs_plain LIMIT 1")).scalar(),
+            'month_start': month_start(today),
+            'today': today,
+        }
+        for name, query in QUERIES.items():
+            print(f"\n{name}")
+            for table in ('costs_plain', 'costs_partitioned'):
+                statement = text(query.format(table=table))
+                plan = db.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement.text}"), params).scalar()
+                plan = plan if isinstance(plan, list) else json.loads(plan)
+                elapsed = 0.0
+                for _ in range(args.repeat):
+                    query_start = time.perf_counter()
+                    db.execute(statement, params).all()
+                    elapsed += time.perf_counter() - query_start
+                print(f"  {table:18}: {elapsed / args.repeat * 1000:8.2f} ms, {len(scanned_relations(plan[0]['Plan']))} relations scanned")
+                if args.plans:
+                    for (line,) in db.execute(text(f"EXPLAIN (ANALYZE, COSTS OFF) {statement.text}"), params):
+                        print(f"      {line}")
+
+        # Retention of the oldest month: DELETE of its rows against DROP of its partition
+        print("\nretention, oldest month")
+        query_start = time.perf_counter()
+        deleted = db.execute(text("DELETE FROM costs_plain WHERE date < :end"), {'end': month_start(start, 1)}).rowcount
+        print(f"  {'DELETE':18}: {(time.perf_counter() - query_start) * 1000:8.2f} ms for {deleted} rows")
+        query_start = time.perf_counter()
+        db.execute(text(f"DROP TABLE {partition_name('costs_partitioned', start)}"))
+        print(f"  {'DROP partition':18}: {(time.perf_counter() - query_start) * 1000:8.2f} ms")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
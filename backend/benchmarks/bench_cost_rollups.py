@@ -0,0 +1,98 @@
+"""
+Dashboard cost queries on the rollups against the same aggregates computed from daily_costs.
+
+Needs a reachable DATABASE_URL, everything runs in one transaction that is rolled back:
+    python -m benchmarks.bench_cost_rollups --services 150 --months 36
+
+One account with `services` services billed every day of the last `months` months (at most COST_RETENTION_MONTHS).
+"""
+
+import argparse
+import time
+import uuid
+from datetime import date, timedelta
+from sqlalchemy import text
+from core.config import COST_RESTATEMENT_DAYS
+from db.database import SessionLocal
+from db.partitions import month_start, retention_start
+from models import User, CloudAccount
+from services.cost_rollup_service import CostRollupService
+
+ROWS_SQL = """
+INSERT INTO daily_costs (id, account_id, date, service_name, cost, currency)
+SELECT gen_random_uuid(), CAST(:account_id AS UUID), day::date, 'service-' || service, round((random() * 100)::numeric, 5), 'USD'
+FROM generate_series(1, :services) AS service,
+    generate_series(CAST(:start AS DATE), CAST(:end AS DATE), INTERVAL '1 day') AS day
+"""
+
+# What the dashboard would run without rollups
+RAW_QUERIES = {
+    'summary': """
+        SELECT service_name, sum(cost) FROM daily_costs
+        WHERE account_id = :account_id AND date >= :month_start AND date <= :today GROUP BY service_name;
+        SELECT date, sum(cost) FROM daily_costs
+        WHERE account_id = :account_id AND date > :today - 7 AND date <= :today GROUP BY date
+    """,
+    'monthly, 12 months': """
+        SELECT date_trunc('month', date), sum(cost) FROM daily_costs
+        WHERE account_id = :account_id AND date >= :year_start GROUP BY 1 ORDER BY 1
+    """,
+    'daily, 30 days': """
+        SELECT date, sum(cost) FROM daily_costs
+        WHERE account_id = :account_id AND date > :today - 30 AND date <= :today GROUP BY date ORDER BY date
+    """,
+}
+
+
+def timed(function, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--services', type=int, default=150)
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    today = date.today()
+    start = max(month_start(today, -args.months), retention_start('daily_costs', today))
+    db = SessionLocal()
+    try:
+        user = User(email=f"bench-{uuid.uuid4()}@example.com", firstname='bench', lastname='bench', entreprise='bench')
+        db.add(user)
+        db.flush()
+        account = CloudAccount(account_name='bench-rollups', provider='AWS', access_key_public='rollups', dek_encrypted='-', cloud_secret_encrypted='-', user_id=user.user_id)
+        db.add(account)
+        db.flush()
+
+        db.execute(text(ROWS_SQL), {'account_id': str(account.id), 'services': args.services, 'start': start, 'end': today})
+        db.execute(text("ANALYZE daily_costs"))
+        rollup_service = CostRollupService(db)
+        rebuild_ms = timed(lambda: rollup_service.rebuild(account.id), 1)
+        rows = db.execute(text("SELECT count(*) FROM daily_costs WHERE account_id = :account_id"), {'account_id': account.id}).scalar()
+        print(f"{rows} daily costs of {args.services} services since {start}, full rebuild {rebuild_ms:.1f} ms")
+
+        ingestion_start = today - timedelta(days=COST_RESTATEMENT_DAYS)
+        print(f"refresh after a daily ingestion : {timed(lambda: rollup_service.refresh(account.id, ingestion_start, today + timedelta(days=1)), args.repeat):8.2f} ms")
+
+        params = {'account_id': account.id, 'today': today, 'month_start': month_start(today), 'year_start': month_start(today, -11)}
+        reads = {
+            'summary': lambda: rollup_service.summary(account.id),
+            'monthly, 12 months': lambda: rollup_service.monthly(account.id, months=12),
+            'daily, 30 days': lambda: rollup_service.daily(account.id, today - timedelta(days=29), today),
+        }
+        for name, read in reads.items():
+            statements = [statement for statement in RAW_QUERIES[name].split(';') if statement.strip()]
+            raw_ms = timed(lambda: [db.execute(text(statement), params).all() for statement in statements], args.repeat)
+            print(f"{name:20}: raw {raw_ms:8.2f} ms, rollups {timed(read, args.repeat):8.2f} ms")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Point-in-time inventory queries over a year of resource history (ix_resource_history).
+
+Needs a reachable DATABASE_URL with btree_gist, everything runs in one transaction that is rolled back:
+    python -m benchmarks.bench_resource_history --resources 5000 --days 365 --period 30
+
+Every resource gets a new version each `period` days, so the history holds about resources * days / period versions.
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, text
+from db.database import SessionLocal
+from models import User, CloudAccount
+from models.resources import CloudResource, resource_valid_at
+from services.cloud_account_service import CloudAccountService
+
+# One version per resource and change day, each closed by the next one, the last one is current
+HISTORY_SQL = """
+WITH changes AS (
+    SELECT resource_number, day
+    FROM generate_series(1, :resources) AS resource_number,
+    LATERAL (SELECT 0 AS day UNION ALL SELECT generate_series(resource_number % :period + 1, :days - 1, :period)) AS days
+)
+INSERT INTO resource (id, cloud_account_id, resource_type, resource_id, region, detail, detail_hash, valid_from, valid_to)
+SELECT gen_random_uuid(), CAST(:account_id AS UUID), 'ec2_instance', 'i-' || resource_number, 'eu-west-3',
+    jsonb_build_object('instance_id', 'i-' || resource_number, 'state', 'running', 'version', day),
+    md5(resource_number || '-' || day),
+    CAST(:start AS TIMESTAMPTZ) + day * INTERVAL '1 day',
+    CAST(:start AS TIMESTAMPTZ) + lead(day) OVER (PARTITION BY resource_number ORDER BY day) * INTERVAL '1 day'
+FROM changes
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resources', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--period', type=int, default=30, help='days between two versions of a resource')
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+
+    start = datetime.now(timezone.utc) - timedelta(days=args.days)
+    db = SessionLocal()
+    try:
+        user = User(email=f"bench-{uuid.uuid4()}@example.com", firstname='bench', lastname='bench', entreprise='bench')
+        db.add(user)
+        db.flush()
+        account = CloudAccount(account_name='bench-history', provider='AWS', access_key_public='history', dek_encrypted='-', cloud_secret_encrypted='-', user_id=user.user_id)
+        db.add(account)
+        db.flush()
+
+        db.execute(text(HISTORY_SQL), {'resources': args.resources, 'days': args.days, 'period': args.period, 'account_id': str(account.id), 'start': start})
+        db.execute(text("ANALYZE resource"))
+        versions = db.query(func.count(CloudResource.id)).filter(CloudResource.cloud_account_id == account.id).scalar()
+        print(f"{versions} versions of {args.resources} resources over {args.days} days")
+
+        service = CloudAccountService(db)
+        instants = [start + timedelta(seconds=random.uniform(0, args.days * 86400)) for _ in range(args.queries)]
+
+        elapsed = 0.0
+        for as_of in instants:
+            query_start = time.perf_counter()
+            service.get_resources(account.id, user.user_id, limit=100, as_of=as_of)
+            elapsed += time.perf_counter() - query_start
+        print(f"as_of page of 100     : {elapsed / args.queries * 1000:8.2f} ms")
+
+        elapsed = 0.0
+        for as_of in instants:
+            query_start = time.perf_counter()
+            db.query(func.count(CloudResource.id)).filter(CloudResource.cloud_account_id == account.id, resource_valid_at(as_of)).scalar()
+            elapsed += time.perf_counter() - query_start
+        print(f"as_of full inventory  : {elapsed / args.queries * 1000:8.2f} ms")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
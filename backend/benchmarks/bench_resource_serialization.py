@@ -0,0 +1,84 @@
+"""
+Serialization cost of a resource list response, no database needed:
+    python -m benchmarks.bench_resource_serialization --rows 10000
+
+Compares the former path (CloudResourcesResponse validation of ORM rows, then Pydantic JSON)
+with FastJSONResponse on plain rows, with the full detail and with a fields= projection.
+"""
+
+import argparse
+import time
+import uuid
+from types import SimpleNamespace
+from typing import List
+from core.responses import FastJSONResponse
+from schemas.account import CloudResourcesResponse
+from schemas.user import StandardResponse
+
+
+def fake_rows(count: int) -> List[dict]:
+    account_id = uuid.uuid4()
+    return [
+        {
+            'id': uuid.uuid4(),
+            'cloud_account_id': account_id,
+            'resource_type': 'ec2_instance',
+            'resource_id': f"i-{index:017x}",
+            'region': 'eu-west-3',
+            'detail': {
+                'instance_id': f"i-{index:017x}",
+                'instance_type': 't3.medium',
+                'state': 'running',
+                'state_code': 16,
+                'architecture': 'x86_64',
+                'launch_time': '2025-01-01T00:00:00+00:00',
+                'availability_zone': 'eu-west-3a',
+                'vpc_id': 'vpc-0123456789abcdef0',
+                'subnet_id': 'subnet-0123456789abcdef0',
+                'private_ip_address': f"10.0.{index // 256 % 256}.{index % 256}",
+                'private_dns_name': f"ip-10-0-{index // 256 % 256}-{index % 256}.eu-west-3.compute.internal",
+                'public_dns_name': '',
+                'security_groups': [{'group_id': 'sg-0123456789abcdef0', 'group_name': 'default'}],
+                'tags': {'Name': f"bench-{index}", 'env': 'bench', 'team': 'platform'},
+                'platform': 'Linux/UNIX',
+                'ebs_optimized': True,
+                'root_device_type': 'ebs',
+                'virtualization_type': 'hvm',
+            },
+        }
+        for index in range(count)
+    ]
+
+
+def timed(label: str, func, repeat: int):
+    best = None
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(func())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<40} {best * 1000:8.1f} ms  {size / 1024:8.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = fake_rows(args.rows)
+    orm_rows = [SimpleNamespace(**row) for row in rows]
+    projected = [{**row, 'detail': {'state': row['detail']['state']}} for row in rows]
+
+    def pydantic_path():
+        response = StandardResponse[List[CloudResourcesResponse]](message="bench", data=orm_rows)
+        return response.model_dump_json().encode()
+
+    timed("Pydantic validation + JSON", pydantic_path, args.repeat)
+    timed("FastJSONResponse, full detail", lambda: FastJSONResponse({'message': 'bench', 'data': rows}).body, args.repeat)
+    timed("FastJSONResponse, fields=state", lambda: FastJSONResponse({'message': 'bench', 'data': projected}).body, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
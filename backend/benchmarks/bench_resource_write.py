@@ -0,0 +1,80 @@
+"""
+Compare the ORM write path with the COPY + merge path of ResourceSyncService.
+
+Needs a reachable DATABASE_URL, everything runs in one transaction that is rolled back:
+    python -m benchmarks.bench_resource_write --rows 50000
+"""
+
+import argparse
+import time
+import uuid
+from db.database import SessionLocal
+from models import User, CloudAccount
+from models.resources import CloudResource
+from services.aws_service import batched
+from services.resource_sync_service import ResourceSyncService
+from core.config import SCAN_BATCH_SIZE
+
+
+def fake_instances(count: int):
+    for index in range(count):
+        yield {
+            'instance_id': f"i-{index:017x}",
+            'instance_type': 't3.medium',
+            'state': 'running',
+            'availability_zone': 'eu-west-3a',
+            'private_ip_address': f"10.0.{index // 256 % 256}.{index % 256}",
+            'security_groups': [{'group_id': 'sg-0123456789', 'group_name': 'default'}],
+            'tags': {'Name': f"bench-{index}", 'env': 'bench'},
+        }
+
+
+def run_orm(db, account_id: uuid.UUID, rows: int) -> float:
+    start = time.perf_counter()
+    for batch in batched(fake_instances(rows), SCAN_BATCH_SIZE):
+        db.add_all([
+            CloudResource(cloud_account_id=account_id, resource_type='ec2_instance', resource_id=item['instance_id'], region='eu-west-3', detail=item)
+            for item in batch
+        ])
+        db.flush()
+        db.expunge_all()
+    return time.perf_counter() - start
+
+
+def run_copy(db, account_id: uuid.UUID, rows: int) -> float:
+    sync_service = ResourceSyncService(db, account_id)
+    start = time.perf_counter()
+    for batch in batched(fake_instances(rows), SCAN_BATCH_SIZE):
+        sync_service.upsert_batch('ec2_instance', 'eu-west-3', batch, id_key='instance_id')
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = User(email=f"bench-{uuid.uuid4()}@example.com", firstname='bench', lastname='bench', entreprise='bench')
+        db.add(user)
+        db.flush()
+        accounts = []
+        for name in ('orm', 'copy'):
+            account = CloudAccount(account_name=f"bench-{name}", provider='AWS', access_key_public=name, dek_encrypted='-', cloud_secret_encrypted='-', user_id=user.user_id)
+            db.add(account)
+            db.flush()
+            accounts.append(account.id)
+
+        orm_seconds = run_orm(db, accounts[0], args.rows)
+        copy_seconds = run_copy(db, accounts[1], args.rows)
+
+        print(f"ORM add_all   : {args.rows / orm_seconds:10.0f} rows/s ({orm_seconds:.2f}s)")
+        print(f"COPY + merge  : {args.rows / copy_seconds:10.0f} rows/s ({copy_seconds:.2f}s)")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
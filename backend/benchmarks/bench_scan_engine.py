@@ -0,0 +1,174 @@
+"""
+Collection throughput of one worker process against a stubbed AWS endpoint with a fixed latency, no database needed:
+    python -m benchmarks.bench_scan_engine --accounts 40 --regions 3 --latency-ms 50
+
+The prefork model is what one Celery process does today: the (service, region) collectors of every
+account one after the other with boto3. The async model is AsyncScanEngine scanning all accounts at once.
+The stub runs in its own process and answers EC2, RDS, S3 and CloudWatch (CBOR) calls.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import socket
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+EC2_NS = 'http://ec2.amazonaws.com/doc/2016-11-15/'
+RDS_NS = 'http://rds.amazonaws.com/doc/2014-10-31/'
+
+
+def _ec2_response(action: str, regions: int, per_region: int) -> str:
+    if action == 'DescribeRegions':
+        items = ''.join(f"<item><regionName>region-{index}</regionName></item>" for index in range(regions))
+        return f'<DescribeRegionsResponse xmlns="{EC2_NS}"><regionInfo>{items}</regionInfo></DescribeRegionsResponse>'
+    if action == 'DescribeInstances':
+        items = ''.join(
+            f"<item><instanceId>i-{index:08x}</instanceId><instanceType>t3.micro</instanceType>"
+            f"<instanceState><code>16</code><name>running</name></instanceState>"
+            f"<launchTime>2024-01-01T00:00:00.000Z</launchTime><placement><availabilityZone>a</availabilityZone></placement></item>"
+            for index in range(per_region)
+        )
+        return f'<DescribeInstancesResponse xmlns="{EC2_NS}"><reservationSet><item><reservationId>r-1</reservationId><instancesSet>{items}</instancesSet></item></reservationSet></DescribeInstancesResponse>'
+    if action == 'DescribeVolumes':
+        items = ''.join(
+            f"<item><volumeId>vol-{index:08x}</volumeId><size>8</size><volumeType>gp3</volumeType><status>in-use</status>"
+            f"<attachmentSet><item><instanceId>i-{index:08x}</instanceId><status>attached</status></item></attachmentSet></item>"
+            for index in range(per_region)
+        )
+        return f'<DescribeVolumesResponse xmlns="{EC2_NS}"><volumeSet>{items}</volumeSet></DescribeVolumesResponse>'
+    if action == 'DescribeAddresses':
+        return f'<DescribeAddressesResponse xmlns="{EC2_NS}"><addressesSet><item><publicIp>192.0.2.1</publicIp><allocationId>eipalloc-1</allocationId><domain>vpc</domain></item></addressesSet></DescribeAddressesResponse>'
+    raise ValueError(action)
+
+
+def _rds_response(per_region: int) -> str:
+    items = ''.join(
+        f"<DBInstance><DBInstanceIdentifier>db-{index}</DBInstanceIdentifier><DBInstanceClass>db.t3.micro</DBInstanceClass>"
+        f"<Engine>postgres</Engine><DBInstanceStatus>available</DBInstanceStatus></DBInstance>"
+        for index in range(per_region)
+    )
+    return f'<DescribeDBInstancesResponse xmlns="{RDS_NS}"><DescribeDBInstancesResult><DBInstances>{items}</DBInstances></DescribeDBInstancesResult></DescribeDBInstancesResponse>'
+
+
+def _s3_response(buckets: int) -> str:
+    items = ''.join(
+        f"<Bucket><Name>bucket-{index}</Name><CreationDate>2024-01-01T00:00:00.000Z</CreationDate><BucketRegion>region-0</BucketRegion></Bucket>"
+        for index in range(buckets)
+    )
+    return f'<ListAllMyBucketsResult><Buckets>{items}</Buckets><Owner><ID>owner</ID></Owner></ListAllMyBucketsResult>'
+
+
+def run_stub(port: int, latency: float, regions: int, per_region: int):
+    from botocore.parsers import BaseCBORParser
+    from botocore.serialize import CBORSerializer
+    from botocore.session import get_session
+
+    get_metric_data = get_session().get_service_model('cloudwatch').operation_model('GetMetricData')
+    cbor_parser = BaseCBORParser()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, body: bytes, content_type: str = 'text/xml', headers: dict = None):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        @staticmethod
+        def _metric_data(request: dict) -> dict:
+            return {'MetricDataResults': [
+                {'Id': query['Id'], 'Label': query['Id'], 'StatusCode': 'Complete', 'Values': [1.0, 2.0, 3.0]}
+                for query in request['MetricDataQueries']
+            ]}
+
+        def do_GET(self):
+            self._reply(_s3_response(per_region).encode())
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            # GetMetricData comes as CBOR or JSON depending on the protocol botocore picked
+            if self.path.endswith('/operation/GetMetricData'):
+                request = cbor_parser.parse_data_item(io.BufferedReader(io.BytesIO(body)))
+                serialized = bytearray()
+                CBORSerializer()._serialize_data_item(serialized, self._metric_data(request), get_metric_data.output_shape)
+                self._reply(bytes(serialized), 'application/cbor', {'smithy-protocol': 'rpc-v2-cbor'})
+                return
+            if self.headers.get('X-Amz-Target', '').endswith('.GetMetricData'):
+                self._reply(json.dumps(self._metric_data(json.loads(body))).encode(), 'application/x-amz-json-1.0')
+                return
+            action = parse_qs(body.decode())['Action'][0]
+            if action == 'DescribeDBInstances':
+                self._reply(_rds_response(per_region).encode())
+            else:
+                self._reply(_ec2_response(action, regions, per_region).encode())
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer(('127.0.0.1', port), StubHandler).serve_forever()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=40)
+    parser.add_argument('--regions', type=int, default=3)
+    parser.add_argument('--resources', type=int, default=20, help='resources per collector and region')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = multiprocessing.Process(target=run_stub, args=(port, args.latency_ms / 1000, args.regions, args.resources), daemon=True)
+    stub.start()
+    time.sleep(1)
+
+    # Every client built from here on talks to the stub
+    os.environ['AWS_ENDPOINT_URL'] = f"http://127.0.0.1:{port}"
+    from services.aws_rate_limiter import aws_rate_limiter
+    from services.aws_service import AwsService
+    from services.async_scan_engine import AsyncScanEngine
+    from worker import SCAN_COLLECTORS, GLOBAL_SERVICES
+    aws_rate_limiter.enabled = False
+
+    credentials = {f"account-{index}": {'access_key_public': f"AKIABENCH{index:06d}", 'secret_key': 'secret'} for index in range(args.accounts)}
+
+    start = time.perf_counter()
+    collected = 0
+    for account_credentials in credentials.values():
+        aws_service = AwsService(account_credentials['access_key_public'], account_credentials['secret_key'], region='us-east-1')
+        jobs = [(service, region) for region in aws_service.get_enabled_regions() for service in SCAN_COLLECTORS if service not in GLOBAL_SERVICES]
+        jobs += [(service, aws_service.region) for service in GLOBAL_SERVICES]
+        for service, region in jobs:
+            collected += sum(len(batch) for batch in getattr(aws_service.for_region(region), SCAN_COLLECTORS[service][1])())
+    prefork = time.perf_counter() - start
+    print(f"prefork (1 process, sequential): {args.accounts} accounts, {collected} resources in {prefork:.2f} s ({args.accounts / prefork:.1f} accounts/s)")
+
+    engine = AsyncScanEngine(SCAN_COLLECTORS, GLOBAL_SERVICES, persist=False)
+    start = time.perf_counter()
+    results = asyncio.run(engine.scan_accounts(credentials))
+    elapsed = time.perf_counter() - start
+    collected = sum(result['counts'].get('collected', 0) for account in results.values() for result in account)
+    failed = sum(result['status'] != 'SUCCESS' for account in results.values() for result in account)
+    print(f"async (1 process, AsyncScanEngine): {args.accounts} accounts, {collected} resources in {elapsed:.2f} s ({args.accounts / elapsed:.1f} accounts/s), {failed} failed slices")
+    print(f"speedup x{prefork / elapsed:.1f}")
+    stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
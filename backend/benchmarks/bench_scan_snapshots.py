@@ -0,0 +1,76 @@
+"""
+Storage and speed of scan snapshots (keyframes + zstd deltas) against one uncompressed JSON document per scan.
+
+No database needed, the inventory is synthetic:
+    python -m benchmarks.bench_scan_snapshots --resources 20000 --scans 100 --churn 0.01
+
+Between two scans `churn` of the resources change, and as many appear as disappear.
+"""
+
+import argparse
+import random
+import time
+import orjson
+from core.config import SNAPSHOT_KEYFRAME_INTERVAL
+from services.scan_snapshot_service import encode_snapshot, replay_snapshots
+
+
+def make_detail(number: int, version: int) -> dict:
+    return {
+        'instance_id': f"i-{number:017x}",
+        'instance_type': random.choice(['t3.micro', 't3.large', 'm5.xlarge', 'c6g.2xlarge']),
+        'state': random.choice(['running', 'running', 'running', 'stopped']),
+        'launch_time': f"2025-{number % 12 + 1:02d}-{number % 28 + 1:02d}T10:00:00+00:00",
+        'private_ip': f"10.{number // 65536 % 256}.{number // 256 % 256}.{number % 256}",
+        'tags': {'Name': f"node-{number}", 'team': random.choice(['data', 'web', 'ml']), 'version': str(version)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resources', type=int, default=20000)
+    parser.add_argument('--scans', type=int, default=100)
+    parser.add_argument('--churn', type=float, default=0.01)
+    args = parser.parse_args()
+
+    random.seed(0)
+    inventory = {('ec2_instance', 'eu-west-3', f"i-{number}"): make_detail(number, 0) for number in range(args.resources)}
+    next_number = args.resources
+    changed = max(int(args.resources * args.churn), 1)
+
+    plain_bytes = stored_bytes = keyframes = 0
+    encode_seconds = 0.0
+    chain, snapshots = [], []
+    for scan in range(args.scans):
+        keys = random.sample(list(inventory), changed)
+        for key in keys[:changed // 2]:
+            inventory[key] = make_detail(int(key[2][2:]), scan)
+        for key in keys[changed // 2:]:
+            del inventory[key]
+            inventory[('ec2_instance', 'eu-west-3', f"i-{next_number}")] = make_detail(next_number, scan)
+            next_number += 1
+
+        plain_bytes += len(orjson.dumps([[*key, detail] for key, detail in inventory.items()]))
+        started = time.perf_counter()
+        base = replay_snapshots(chain) if chain and len(chain) < SNAPSHOT_KEYFRAME_INTERVAL else None
+        snapshot, _, keyframe = encode_snapshot(inventory, base)
+        encode_seconds += time.perf_counter() - started
+
+        chain = [snapshot] if keyframe else chain + [snapshot]
+        snapshots.append(list(chain))
+        stored_bytes += len(snapshot)
+        keyframes += keyframe
+
+    print(f"{args.scans} scans of {args.resources} resources, {keyframes} keyframes")
+    print(f"plain JSON       : {plain_bytes / 1048576:8.2f} MiB")
+    print(f"snapshots (zstd) : {stored_bytes / 1048576:8.2f} MiB  ({plain_bytes / stored_bytes:.0f}x smaller)")
+    print(f"record           : {encode_seconds / args.scans * 1000:8.2f} ms per scan")
+
+    longest = max(snapshots, key=len)
+    started = time.perf_counter()
+    replay_snapshots(longest)
+    print(f"reconstruct      : {(time.perf_counter() - started) * 1000:8.2f} ms for a chain of {len(longest)}")
+
+
+if __name__ == "__main__":
+    main()
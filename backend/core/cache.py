@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from redis.exceptions import RedisError
+from typing import Any, Optional
+from core.config import USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS, USER_CACHE_REDIS_URL
+
+
+class TTLCache():
+    """
+    Bounded in-process LRU cache whose entries expire after ttl seconds
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+class UserCache():
+    """
+    Authenticated user snapshots keyed by email.
+    The in-process cache answers first, Redis (when USER_CACHE_REDIS_URL is set) is shared by every API worker.
+    Invalidation clears both, other workers keep their local copy for at most USER_CACHE_TTL_SECONDS.
+    Redis fails open: an unreachable server only costs the local cache and the database query.
+    """
+
+    def __init__(self, maxsize: int = USER_CACHE_MAX_SIZE, ttl: float = USER_CACHE_TTL_SECONDS, redis_url: Optional[str] = USER_CACHE_REDIS_URL):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.redis = None
+        if redis_url:
+            import redis
+            # Short timeouts, a Redis outage must not hold every authenticated request
+            self.redis = redis.Redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+
+    @staticmethod
+    def _redis_key(email: str) -> str:
+        return f"user_cache:{email}"
+
+    def get(self, email: str) -> Optional[dict]:
+        user = self.local.get(email)
+        if user is not None or self.redis is None:
+            return user
+        try:
+            raw = self.redis.get(self._redis_key(email))
+        except RedisError as e:
+            print(f"User cache Redis unavailable, falling back to the database :: {e}")
+            return None
+        if raw is None:
+            return None
+        user = json.loads(raw)
+        self.local.set(email, user)
+        return user
+
+    def set(self, email: str, user: dict):
+        self.local.set(email, user)
+        if self.redis is not None:
+            try:
+                self.redis.setex(self._redis_key(email), int(self.ttl), json.dumps(user, default=str))
+            except RedisError as e:
+                print(f"User cache Redis unavailable, user cached locally only :: {e}")
+
+    def invalidate(self, email: str):
+        self.local.delete(email)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self._redis_key(email))
+            except RedisError as e:
+                print(f"User cache Redis unavailable, {email} not invalidated in Redis :: {e}")
+
+
+user_cache = UserCache()
@@ -1,5 +1,9 @@
-from core.config import CELERY_BROKER_URL, CELERY_RESULT_BACKEND
+from core.config import CELERY_BROKER_URL, CELERY_RESULT_BACKEND, SCAN_SCHEDULE_MINUTES, COST_INGESTION_HOUR, SNAPSHOT_COMPACTION_HOUR, PARTITION_MAINTENANCE_HOUR, WORKER_METRICS_PORT
+from core.metrics import mark_process_dead, start_metrics_server
+from core.tracing import end_span, inject, setup_tracing, start_span
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_init, worker_process_shutdown
 
 
 # 2. On instancie l'application Celery
@@ -18,4 +22,60 @@ celery_app.conf.update(
     enable_utc=True,
     # Important : On dira à Celery où chercher les tâches plus tard
     include=["worker"] 
-)
\ No newline at end of file
+)
+
+# Periodic jobs, run by `celery -A core.celery_app beat`. Each one only enqueues, with jittered countdowns
+celery_app.conf.beat_schedule = {
+    'schedule-scans': {
+        'task': 'worker.task_schedule_scans',
+        'schedule': SCAN_SCHEDULE_MINUTES * 60,
+    },
+    'schedule-cost-ingestion': {
+        'task': 'worker.task_schedule_cost_ingestion',
+        'schedule': crontab(minute=0, hour=COST_INGESTION_HOUR),
+    },
+    'compact-scan-snapshots': {
+        'task': 'worker.task_compact_snapshots',
+        'schedule': crontab(minute=30, hour=SNAPSHOT_COMPACTION_HOUR),
+    },
+    'maintain-partitions': {
+        'task': 'worker.task_maintain_partitions',
+        'schedule': crontab(minute=0, hour=PARTITION_MAINTENANCE_HOUR),
+    },
+}
+
+# Trace headers of the W3C propagator, copied from the message to the task span
+TRACE_HEADERS = ('traceparent', 'tracestate', 'baggage')
+
+
+@worker_init.connect
+def start_worker_telemetry(**kwargs):
+    """
+    Prometheus endpoint on WORKER_METRICS_PORT, spans exported when OTEL_EXPORTER_OTLP_ENDPOINT is set
+    """
+    if WORKER_METRICS_PORT:
+        start_metrics_server(WORKER_METRICS_PORT)
+    setup_tracing('cloud-sentinel-worker')
+
+
+@worker_process_shutdown.connect
+def release_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid)
+
+
+@before_task_publish.connect
+def propagate_trace(headers=None, **kwargs):
+    # A task enqueued from an API request or another task continues its trace
+    if headers is not None:
+        inject(headers)
+
+
+@task_prerun.connect
+def start_task_span(task=None, **kwargs):
+    carrier = {key: getattr(task.request, key) for key in TRACE_HEADERS if getattr(task.request, key, None)}
+    task.request.trace_span = start_span(f"celery {task.name}", carrier, **{'celery.task_id': task.request.id})
+
+
+@task_postrun.connect
+def end_task_span(task=None, state=None, retval=None, **kwargs):
+    end_span(getattr(task.request, 'trace_span', None), error=retval if state == 'FAILURE' and isinstance(retval, BaseException) else None)
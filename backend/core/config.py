@@ -5,4 +5,86 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 ENCRYPTION_TYPE = os.getenv('ENCRYPTION_TYPE')
 ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
-CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
\ No newline at end of file
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
+
+# SCAN
+SCAN_BATCH_SIZE = int(os.getenv('SCAN_BATCH_SIZE', '500'))
+SCAN_MAX_PARALLELISM = int(os.getenv('SCAN_MAX_PARALLELISM', '8'))
+SCAN_LARGE_ACCOUNT_RESOURCES = int(os.getenv('SCAN_LARGE_ACCOUNT_RESOURCES', '10000'))
+SCAN_LARGE_QUEUE = os.getenv('SCAN_LARGE_QUEUE', 'scans_large')
+# 'chord' (one Celery subtask per service and region) or 'async' (AsyncScanEngine, many accounts per process)
+SCAN_ENGINE = os.getenv('SCAN_ENGINE', 'chord')
+SCAN_ASYNC_ACCOUNTS_PER_TASK = int(os.getenv('SCAN_ASYNC_ACCOUNTS_PER_TASK', '50'))
+SCAN_ASYNC_MAX_ACCOUNTS = int(os.getenv('SCAN_ASYNC_MAX_ACCOUNTS', '20'))
+SCAN_ASYNC_MAX_CALLS = int(os.getenv('SCAN_ASYNC_MAX_CALLS', '64'))
+SCAN_ASYNC_MAX_DB_WRITERS = int(os.getenv('SCAN_ASYNC_MAX_DB_WRITERS', '4'))
+
+# AUTH CACHE
+USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', '30'))
+USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', '10000'))
+USER_CACHE_REDIS_URL = os.getenv('USER_CACHE_REDIS_URL')
+
+# AWS CLIENTS
+AWS_CLIENT_POOL_SIZE = int(os.getenv('AWS_CLIENT_POOL_SIZE', '256'))
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '25'))
+AWS_MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', '10'))
+
+# AWS RATE LIMIT
+AWS_RATE_LIMIT_ENABLED = os.getenv('AWS_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+AWS_RATE_INITIAL = float(os.getenv('AWS_RATE_INITIAL', '10'))
+AWS_RATE_MIN = float(os.getenv('AWS_RATE_MIN', '0.5'))
+AWS_RATE_MAX = float(os.getenv('AWS_RATE_MAX', '100'))
+AWS_RATE_BURST = float(os.getenv('AWS_RATE_BURST', '20'))
+
+# COSTS
+COST_BACKFILL_DAYS = int(os.getenv('COST_BACKFILL_DAYS', '90'))
+COST_RESTATEMENT_DAYS = int(os.getenv('COST_RESTATEMENT_DAYS', '3'))
+# Monthly partitions of daily_costs older than this are dropped
+COST_RETENTION_MONTHS = int(os.getenv('COST_RETENTION_MONTHS', '36'))
+# End of month forecast: month to date plus the average daily cost of the last days for every day left
+COST_FORECAST_WINDOW_DAYS = int(os.getenv('COST_FORECAST_WINDOW_DAYS', '7'))
+
+# ANOMALIES
+ANOMALY_WINDOW_DAYS = int(os.getenv('ANOMALY_WINDOW_DAYS', '7'))
+ANOMALY_Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', '3.0'))
+ANOMALY_MIN_DELTA = float(os.getenv('ANOMALY_MIN_DELTA', '1.0'))
+ANOMALY_MIN_INCREASE_PCT = float(os.getenv('ANOMALY_MIN_INCREASE_PCT', '0.2'))
+ANOMALY_RETENTION_MONTHS = int(os.getenv('ANOMALY_RETENTION_MONTHS', '24'))
+
+# UTILIZATION
+UTILIZATION_WINDOW_DAYS = int(os.getenv('UTILIZATION_WINDOW_DAYS', '14'))
+IDLE_CPU_PERCENT = float(os.getenv('IDLE_CPU_PERCENT', '5.0'))
+IDLE_NETWORK_BYTES = float(os.getenv('IDLE_NETWORK_BYTES', '5242880'))
+
+# SCHEDULER
+SCHEDULER_REDIS_URL = os.getenv('SCHEDULER_REDIS_URL') or CELERY_BROKER_URL
+SCAN_SCHEDULE_MINUTES = int(os.getenv('SCAN_SCHEDULE_MINUTES', '360'))
+SCAN_JITTER_SECONDS = int(os.getenv('SCAN_JITTER_SECONDS', '900'))
+SCAN_LOCK_TTL_SECONDS = int(os.getenv('SCAN_LOCK_TTL_SECONDS', '3600'))
+SCAN_MAX_CONCURRENT = int(os.getenv('SCAN_MAX_CONCURRENT', '10'))
+COST_INGESTION_HOUR = int(os.getenv('COST_INGESTION_HOUR', '6'))
+
+# SCAN PROGRESS
+SCAN_PROGRESS_TTL_SECONDS = int(os.getenv('SCAN_PROGRESS_TTL_SECONDS', '3600'))
+SCAN_PROGRESS_LOG_SIZE = int(os.getenv('SCAN_PROGRESS_LOG_SIZE', '500'))
+SCAN_PROGRESS_HEARTBEAT_SECONDS = int(os.getenv('SCAN_PROGRESS_HEARTBEAT_SECONDS', '15'))
+
+# METRICS
+# Prometheus endpoint of each Celery worker, 0 disables it. The API serves /metrics on its own port
+WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '9100'))
+# Spans are exported over OTLP/HTTP when set and the OpenTelemetry SDK is installed
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')
+
+# SNAPSHOTS
+# A full snapshot every SNAPSHOT_KEYFRAME_INTERVAL scans of an account, deltas in between
+SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv('SNAPSHOT_KEYFRAME_INTERVAL', '20'))
+SNAPSHOT_ZSTD_LEVEL = int(os.getenv('SNAPSHOT_ZSTD_LEVEL', '9'))
+# Older snapshots are thinned to the last one of each day, then dropped after SNAPSHOT_RETENTION_DAYS
+SNAPSHOT_DAILY_AFTER_DAYS = int(os.getenv('SNAPSHOT_DAILY_AFTER_DAYS', '7'))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv('SNAPSHOT_RETENTION_DAYS', '90'))
+SNAPSHOT_COMPACTION_HOUR = int(os.getenv('SNAPSHOT_COMPACTION_HOUR', '3'))
+
+# PARTITIONS
+# Monthly partitions are created this many months ahead by the daily maintenance task
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+PARTITION_MAINTENANCE_HOUR = int(os.getenv('PARTITION_MAINTENANCE_HOUR', '1'))
\ No newline at end of file
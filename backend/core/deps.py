@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session, load_only
+from sqlalchemy import event, inspect
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from db.database import get_db
 from core.config import SECRET_KEY, ENCRYPTION_TYPE
+from core.cache import user_cache
 from typing import Annotated
+from uuid import UUID
 from models.user import User
 
 
@@ -24,10 +27,33 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or Expired Token"
         )
-    user = db.query(User).options(load_only(User.user_id, User.email, User.firstname)).filter(User.email == email).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-    return user
\ No newline at end of file
+    cached_user = user_cache.get(email)
+    if cached_user is None:
+        user = db.query(User).options(load_only(User.user_id, User.email, User.firstname, User.is_active)).filter(User.email == email).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        if user.is_active is False:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Inactive user"
+            )
+        cached_user = {'user_id': str(user.user_id), 'email': user.email, 'firstname': user.firstname, 'is_active': user.is_active}
+        user_cache.set(email, cached_user)
+    # Detached User built from the snapshot, routes only read its attributes
+    return User(**{**cached_user, 'user_id': UUID(cached_user['user_id'])})
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target: User):
+    """
+    Drop the cached snapshot when a user is updated (deactivated, renamed) or deleted through the ORM.
+    The previous email is dropped too when it changed.
+    """
+    emails = {target.email, *inspect(target).attrs.email.history.deleted}
+    for email in emails:
+        if email:
+            user_cache.invalidate(email)
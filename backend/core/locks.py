@@ -0,0 +1,158 @@
+import threading
+import time
+import redis
+from typing import List, Optional, Tuple
+from core.config import SCHEDULER_REDIS_URL, SCAN_LOCK_TTL_SECONDS, SCAN_MAX_CONCURRENT
+
+# Delete the key only when it still holds our token, a lock that expired and was taken over is left alone
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Push the expiry of a lock back only while it still holds our token
+EXTEND_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Sorted set of holders scored by expiry: expired holders (crashed workers) are dropped before counting
+ACQUIRE_SLOT_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZSCORE', KEYS[1], ARGV[3]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ARGV[3])
+    return 1
+end
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# Push the expiry of a slot back only while its holder has not expired
+EXTEND_SLOT_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score and tonumber(score) > tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], 'XX', tonumber(ARGV[2]) + tonumber(ARGV[3]), ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_redis: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(SCHEDULER_REDIS_URL, decode_responses=True)
+    return _redis
+
+
+class ScanLock():
+    """
+    One in-flight scan per (account, region), the lock value is the Celery task id holding it.
+    scan-all holds the '*' region.
+    """
+
+    def __init__(self, ttl: int = SCAN_LOCK_TTL_SECONDS):
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(account_id: str, region: str) -> str:
+        return f"scan_lock:{account_id}:{region}"
+
+    def acquire(self, account_id: str, region: str, task_id: str, ttl: Optional[int] = None) -> Optional[str]:
+        """
+        Take the lock for task_id, returns None on success or the task id of the scan already running
+        """
+        key = self._key(account_id, region)
+        client = get_redis()
+        if client.set(key, task_id, nx=True, ex=ttl or self.ttl):
+            return None
+        holder = client.get(key)
+        if holder is None:
+            # Released between SET and GET, try once more
+            return None if client.set(key, task_id, nx=True, ex=ttl or self.ttl) else client.get(key)
+        return holder
+
+    def extend(self, account_id: str, region: str, task_id: str, ttl: Optional[int] = None) -> bool:
+        """
+        Reset the TTL of a lock task_id still holds, False when it expired or was taken over
+        """
+        return bool(get_redis().eval(EXTEND_LOCK_SCRIPT, 1, self._key(account_id, region), task_id, (ttl or self.ttl) * 1000))
+
+    def release(self, account_id: str, region: str, task_id: str) -> bool:
+        return bool(get_redis().eval(RELEASE_LOCK_SCRIPT, 1, self._key(account_id, region), task_id))
+
+
+class ConcurrencyLimiter():
+    """
+    Global cap on the scans running at once across every worker, holders expire after ttl
+    """
+
+    def __init__(self, name: str, limit: int = SCAN_MAX_CONCURRENT, ttl: int = SCAN_LOCK_TTL_SECONDS):
+        self.key = f"slots:{name}"
+        self.limit = limit
+        self.ttl = ttl
+
+    def acquire(self, holder: str) -> bool:
+        return bool(get_redis().eval(ACQUIRE_SLOT_SCRIPT, 1, self.key, time.time(), self.limit, holder, self.ttl))
+
+    def extend(self, holder: str) -> bool:
+        return bool(get_redis().eval(EXTEND_SLOT_SCRIPT, 1, self.key, holder, time.time(), self.ttl))
+
+    def release(self, holder: str):
+        get_redis().zrem(self.key, holder)
+
+    def in_use(self) -> int:
+        client = get_redis()
+        client.zremrangebyscore(self.key, '-inf', time.time())
+        return client.zcard(self.key)
+
+
+scan_lock = ScanLock()
+scan_slots = ConcurrencyLimiter('scan')
+
+
+class ScanHeartbeat():
+    """
+    Context manager keeping the scan locks and the slot of a running scan alive: both are extended on entry,
+    then every third of their TTL from a daemon thread until the block exits
+    """
+
+    def __init__(self, task_id: str, locks: List[Tuple[str, str]], interval: Optional[float] = None):
+        self.task_id = task_id
+        self.locks = locks
+        self.interval = interval or scan_lock.ttl / 3
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def beat(self):
+        try:
+            scan_slots.extend(self.task_id)
+            for account_id, region in self.locks:
+                scan_lock.extend(account_id, region, self.task_id)
+        except redis.RedisError as e:
+            print(f"Error in scan heartbeat: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.beat()
+
+    def __enter__(self):
+        self.beat()
+        self._thread = threading.Thread(target=self._run, name=f"scan-heartbeat-{self.task_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
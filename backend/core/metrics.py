@@ -0,0 +1,114 @@
+import os
+import time
+from contextlib import contextmanager
+import shutil
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess, start_http_server
+from core.tracing import span
+
+# Seconds, from a single API page to a whole account scan
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SCAN_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+AWS_CALL_SECONDS = Histogram(
+    'cloud_sentinel_aws_call_seconds', 'AWS API call latency, retries and rate limiter waits included',
+    ['service', 'operation'], buckets=LATENCY_BUCKETS
+)
+AWS_CALLS = Counter(
+    'cloud_sentinel_aws_calls_total', 'AWS API calls, one per page of a paginated listing, outcome is ok or the error code',
+    ['service', 'operation', 'outcome']
+)
+AWS_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    'cloud_sentinel_aws_rate_limit_wait_seconds', 'Time an AWS request attempt waited on the shared token bucket',
+    ['service'], buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    'cloud_sentinel_stage_seconds', 'Time spent in one stage of the hot path (credential decryption, DB phases)',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+SCAN_SERVICE_SECONDS = Histogram(
+    'cloud_sentinel_scan_service_seconds', 'Collection and write of one (service, region) of a scan',
+    ['service', 'status'], buckets=SCAN_BUCKETS
+)
+SCAN_SECONDS = Histogram(
+    'cloud_sentinel_scan_seconds', 'Scan latency, from the start of the scan task to the recorded result',
+    ['status'], buckets=SCAN_BUCKETS
+)
+SCAN_RESOURCES = Counter(
+    'cloud_sentinel_scan_resources_total', 'Resources seen by scans, by outcome of the write',
+    ['resource_type', 'outcome']
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'cloud_sentinel_http_request_seconds', 'API request latency by route template',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS
+)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Registry to expose: the default one, or the merge of every process when PROMETHEUS_MULTIPROC_DIR
+    is set (Celery prefork children, uvicorn workers)
+    """
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def start_metrics_server(port: int):
+    """
+    Serve /metrics from a Celery worker main process, the files left by a previous run are cleared first
+    """
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+    start_http_server(port, registry=metrics_registry())
+
+
+def mark_process_dead(pid: int):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """
+    Time a hot path stage into STAGE_SECONDS, inside a span of the same name
+    """
+    with span(name, **attributes):
+        with STAGE_SECONDS.labels(name).time():
+            yield
+
+
+def record_scan_service(service: str, resource_type: str, status: str, seconds: float, counts: dict):
+    SCAN_SERVICE_SECONDS.labels(service, status).observe(seconds)
+    for outcome, count in counts.items():
+        SCAN_RESOURCES.labels(resource_type, outcome).inc(count)
+
+
+def instrument_client(client):
+    """
+    Time and count every API call of a boto3 or aiobotocore client
+    """
+    service = client.meta.service_model.service_name
+
+    def before_call(model, context, **kwargs):
+        context['metrics_call'] = (model.name, time.perf_counter())
+
+    def observe(context, outcome: str):
+        operation, started_at = context.pop('metrics_call', (None, None))
+        if operation is None:
+            return
+        AWS_CALL_SECONDS.labels(service, operation).observe(time.perf_counter() - started_at)
+        AWS_CALLS.labels(service, operation, outcome).inc()
+
+    def after_call(context, parsed=None, **kwargs):
+        observe(context, (parsed or {}).get('Error', {}).get('Code') or 'ok')
+
+    def after_call_error(context, exception=None, **kwargs):
+        observe(context, type(exception).__name__)
+
+    client.meta.events.register('before-call', before_call)
+    client.meta.events.register('after-call', after_call)
+    client.meta.events.register('after-call-error', after_call_error)
@@ -0,0 +1,115 @@
+import json
+import time
+import redis
+import redis.asyncio
+from typing import AsyncIterator, Optional
+from core.config import SCHEDULER_REDIS_URL, SCAN_PROGRESS_TTL_SECONDS, SCAN_PROGRESS_LOG_SIZE, SCAN_PROGRESS_HEARTBEAT_SECONDS
+from core.locks import get_redis
+
+# Numbered, logged and published in one step: a subscriber that replays the log after subscribing
+# gets every event, the ones seen twice are dropped by sequence number.
+# The event is spliced rather than decoded, cjson would turn empty objects into arrays
+PUBLISH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local encoded = '{"seq": ' .. seq .. ', ' .. string.sub(ARGV[1], 2)
+redis.call('RPUSH', KEYS[2], encoded)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('PUBLISH', KEYS[3], encoded)
+return seq
+"""
+
+# Last event of a scan, the stream closes after it
+SCAN_FINISHED = 'scan_finished'
+
+_async_redis: Optional[redis.asyncio.Redis] = None
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = redis.asyncio.Redis.from_url(SCHEDULER_REDIS_URL, decode_responses=True)
+    return _async_redis
+
+
+def _keys(task_id: str) -> list:
+    return [f"scan_progress_seq:{task_id}", f"scan_progress_log:{task_id}", f"scan_progress:{task_id}"]
+
+
+def _owner_key(task_id: str) -> str:
+    return f"scan_progress_owner:{task_id}"
+
+
+def set_progress_owner(task_id: str, user_id: str, ttl: int = SCAN_PROGRESS_TTL_SECONDS):
+    """
+    Only the user who started the scan may follow it
+    """
+    get_redis().set(_owner_key(task_id), user_id, ex=ttl)
+
+
+def get_progress_owner(task_id: str) -> Optional[str]:
+    return get_redis().get(_owner_key(task_id))
+
+
+async def get_progress_owner_async(task_id: str) -> Optional[str]:
+    return await get_async_redis().get(_owner_key(task_id))
+
+
+def publish_progress(task_id: str, event_type: str, **fields) -> Optional[int]:
+    """
+    Publish one progress event of the scan task_id, returns its sequence number.
+    Progress is best effort: a Redis error is logged and never fails the scan
+    """
+    event = {'type': event_type, 'at': time.time(), **fields}
+    try:
+        keys = _keys(task_id)
+        return get_redis().eval(PUBLISH_SCRIPT, len(keys), *keys, json.dumps(event, default=str), SCAN_PROGRESS_LOG_SIZE, SCAN_PROGRESS_TTL_SECONDS)
+    except redis.RedisError as e:
+        print(f"Error while publishing scan progress: {e}")
+        return None
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_progress(task_id: str, last_event_id: int = 0) -> AsyncIterator[str]:
+    """
+    Server-Sent Events of one scan: the logged events after last_event_id, then the live ones until scan_finished.
+    Comments are sent every SCAN_PROGRESS_HEARTBEAT_SECONDS so proxies keep the connection open,
+    the stream gives up after SCAN_PROGRESS_TTL_SECONDS without any event
+    """
+    client = get_async_redis()
+    seq_key, log_key, channel = _keys(task_id)
+    pubsub = client.pubsub()
+    # Subscribe before reading the log so nothing is published in between unseen
+    await pubsub.subscribe(channel)
+    try:
+        last_seq = last_event_id
+        for raw in await client.lrange(log_key, 0, -1):
+            event = json.loads(raw)
+            if event['seq'] <= last_seq:
+                continue
+            last_seq = event['seq']
+            yield _sse(event)
+            if event['type'] == SCAN_FINISHED:
+                return
+
+        idle_since = time.monotonic()
+        while time.monotonic() - idle_since < SCAN_PROGRESS_TTL_SECONDS:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=SCAN_PROGRESS_HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": heartbeat\n\n"
+                continue
+            event = json.loads(message['data'])
+            if event['seq'] <= last_seq:
+                continue
+            last_seq = event['seq']
+            idle_since = time.monotonic()
+            yield _sse(event)
+            if event['type'] == SCAN_FINISHED:
+                return
+    finally:
+        await pubsub.unsubscribe(channel)
+        await pubsub.aclose()
@@ -0,0 +1,14 @@
+from fastapi.responses import Response
+from typing import Any
+import orjson
+
+
+class FastJSONResponse(Response):
+    """
+    Serializes plain dicts/lists straight to bytes with orjson (UUID and datetime included),
+    for list endpoints whose rows are already built in the shape of their response model
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
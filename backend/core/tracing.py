@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from typing import Optional
+from core.config import OTEL_EXPORTER_OTLP_ENDPOINT
+
+# OpenTelemetry is optional: without it every helper below is a no-op
+try:
+    from opentelemetry import context as otel_context, propagate, trace
+except ImportError:
+    otel_context = propagate = trace = None
+
+tracer = trace.get_tracer('cloud_sentinel') if trace else None
+
+
+def setup_tracing(service_name: str):
+    """
+    Export spans over OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT, nothing is exported when it is unset.
+    Call it once per process, after the fork for Celery prefork children (the exporter runs a thread)
+    """
+    if trace is None or not OTEL_EXPORTER_OTLP_ENDPOINT:
+        return
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        print(f"Tracing disabled, OpenTelemetry SDK not installed: {e}")
+        return
+    provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Child span of the current one for the duration of the block
+    """
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def start_span(name: str, carrier: Optional[dict] = None, **attributes):
+    """
+    Span made current until end_span, the parent comes from `carrier` (W3C traceparent headers) when given.
+    Returns an opaque handle for end_span, None without OpenTelemetry
+    """
+    if tracer is None:
+        return None
+    parent = propagate.extract(carrier) if carrier is not None else None
+    current = tracer.start_span(name, context=parent, attributes=attributes)
+    token = otel_context.attach(trace.set_span_in_context(current))
+    return current, token
+
+
+def end_span(handle, error: Optional[BaseException] = None, name: Optional[str] = None, **attributes):
+    if handle is None:
+        return
+    current, token = handle
+    if name:
+        current.update_name(name)
+    current.set_attributes(attributes)
+    if error is not None:
+        current.record_exception(error)
+        current.set_status(trace.Status(trace.StatusCode.ERROR, str(error)))
+    current.end()
+    otel_context.detach(token)
+
+
+def inject(carrier: dict):
+    """
+    Write the current trace context into carrier (HTTP or Celery message headers)
+    """
+    if propagate is not None:
+        propagate.inject(carrier)
@@ -0,0 +1,114 @@
+"""
+Monthly range partitions of daily_costs and anomalies.
+
+Partitions are named <table>_YYYY_MM and cover [first day of the month, first day of the next one) in UTC.
+They are created for the whole retention window when the table is created, then kept
+PARTITION_MONTHS_AHEAD months ahead and dropped past their retention by maintain_partitions (daily beat task).
+"""
+
+import re
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from core.config import COST_RETENTION_MONTHS, ANOMALY_RETENTION_MONTHS, PARTITION_MONTHS_AHEAD
+from typing import Dict, List, Optional
+
+# Partitioned table -> months of data kept
+PARTITIONED_TABLES = {
+    'daily_costs': COST_RETENTION_MONTHS,
+    'anomalies': ANOMALY_RETENTION_MONTHS,
+}
+
+PARTITION_NAME = re.compile(r'^(?P<table>\w+)_(?P<year>\d{4})_(?P<month>\d{2})$')
+
+CHILDREN_SQL = """
+SELECT child.relname
+FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = :table
+"""
+
+
+def utc_today() -> date:
+    """
+    Current day in UTC, partitions and cost dates use it whatever the server time zone
+    """
+    return datetime.now(timezone.utc).date()
+
+
+def month_start(day: date, months: int = 0) -> date:
+    """
+    First day of the month of `day`, shifted by `months`
+    """
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def retention_start(table: str, today: Optional[date] = None) -> date:
+    """
+    Oldest day still kept in table, rows before it have no partition
+    """
+    return month_start(today or utc_today(), -PARTITIONED_TABLES[table])
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def existing_partitions(connection: Connection, table: str) -> Dict[str, date]:
+    partitions = {}
+    for (name,) in connection.execute(text(CHILDREN_SQL), {'table': table}):
+        match = PARTITION_NAME.match(name)
+        if match and match['table'] == table:
+            partitions[name] = date(int(match['year']), int(match['month']), 1)
+    return partitions
+
+
+def ensure_partitions(connection: Connection, table: str, today: Optional[date] = None) -> List[str]:
+    """
+    Create the missing partitions from the retention start to PARTITION_MONTHS_AHEAD months ahead
+    """
+    today = today or utc_today()
+    existing = existing_partitions(connection, table)
+    created = []
+    month = retention_start(table, today)
+    last = month_start(today, PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        name = partition_name(table, month)
+        if name not in existing:
+            # Explicit UTC bounds, a timestamptz bound would otherwise follow the session time zone
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{month_start(month, 1).isoformat()} 00:00:00+00')"
+            ))
+            created.append(name)
+        month = month_start(month, 1)
+    return created
+
+
+def drop_expired_partitions(connection: Connection, table: str, today: Optional[date] = None) -> List[str]:
+    """
+    Drop the partitions entirely before the retention start, instead of a DELETE of their rows
+    """
+    oldest = retention_start(table, today)
+    dropped = []
+    for name, month in sorted(existing_partitions(connection, table).items()):
+        if month < oldest:
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(connection: Connection, today: Optional[date] = None) -> Dict[str, dict]:
+    return {
+        table: {'created': ensure_partitions(connection, table, today), 'dropped': drop_expired_partitions(connection, table, today)}
+        for table in PARTITIONED_TABLES
+    }
+
+
+def create_partitions(target, connection: Connection, **kw):
+    """
+    after_create listener of the partitioned tables
+    """
+    ensure_partitions(connection, target.name)
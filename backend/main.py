@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from core.config import ENVIRONMENT
+from core.metrics import HTTP_REQUEST_SECONDS, metrics_registry
+from core.tracing import end_span, setup_tracing, start_span
 from dotenv import load_dotenv
 from db.database import engine
 from models import Base
@@ -12,6 +16,8 @@ Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
 
+setup_tracing('cloud-sentinel-api')
+
 allowed_origins = (['https://cloud-sentinel.herense.com'] if ENVIRONMENT == 'PRODUCTION' else ['http://localhost:3000'])
 
 app.add_middleware(
@@ -21,6 +27,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """
+    Latency histogram per route template, and a span continuing the caller's trace (traceparent header)
+    """
+    span = start_span(request.method, dict(request.headers), **{'http.method': request.method})
+    started_at = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        route_path = route.path if route else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(request.method, route_path, status_code).observe(time.perf_counter() - started_at)
+        end_span(span, name=f"{request.method} {route_path}", **{'http.route': route_path, 'http.status_code': status_code})
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
 app.include_router(auth.router, prefix='/v1/auth', tags=['auth'])
 app.include_router(user.router, prefix='/v1/user', tags=['user'])
 app.include_router(accounts.router, prefix='/v1/account', tags=['account'])
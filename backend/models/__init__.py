@@ -4,6 +4,7 @@ from models.cloud_account import CloudAccount
 from models.daily_cost import DailyCost
 from models.anomaly import Anomaly
 from models.scan_result import ScanResult
+from models.cost_rollup import CostDailyTotal, CostMonthlyService, CostMonthlyTotal
 
 # Export all models for easy import
-__all__ = ["Base", "User", "CloudAccount", "DailyCost", "Anomaly", "ScanResult"]
+__all__ = ["Base", "User", "CloudAccount", "DailyCost", "Anomaly", "ScanResult", "CostDailyTotal", "CostMonthlyService", "CostMonthlyTotal"]
@@ -1,8 +1,9 @@
 from db.database import Base
-from sqlalchemy import Column, Numeric, String, ForeignKey, DateTime, Integer, Enum, UniqueConstraint
+from sqlalchemy import Column, Numeric, String, ForeignKey, DateTime, Integer, Enum, UniqueConstraint, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from db.partitions import create_partitions
 import enum
 
 class SeverityEnum(str, enum.Enum):
@@ -16,11 +17,14 @@ class StatusEnum(str, enum.Enum):
     FIXED = 'FIXED'
 
 class Anomaly(Base):
+    """
+    Range partitioned by month on detected_at (db.partitions), the primary key and unique constraint include it
+    """
     __tablename__ = "anomalies"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     account_id = Column(UUID(as_uuid=True), ForeignKey("cloud_accounts.id"), nullable=False)
-    detected_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    detected_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False)
     resource_id = Column(String, nullable=False)
     severity = Column(Enum(SeverityEnum), nullable=False, default=SeverityEnum.LOW)
     issue_type = Column(String, nullable=False)
@@ -31,4 +35,8 @@ class Anomaly(Base):
 
     __table_args__ = (
          UniqueConstraint('account_id', 'resource_id', 'issue_type', 'detected_at', name='_unique_anomaly_uc'),
-     )
\ No newline at end of file
+         {'postgresql_partition_by': 'RANGE (detected_at)'},
+     )
+
+
+event.listen(Anomaly.__table__, 'after_create', create_partitions)
@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, String, ForeignKey, DateTime, Date, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from db.database import Base
@@ -23,6 +23,8 @@ class CloudAccount(Base):
     cloud_secret_encrypted = Column(String, nullable=False)
     last_scan_status = Column(Enum(ScanStatusEnum), default=ScanStatusEnum.PENDING)
     last_scan_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    costs_ingested_until = Column(Date, nullable=True)
+    anomalies_detected_until = Column(Date, nullable=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
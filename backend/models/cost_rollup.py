@@ -0,0 +1,39 @@
+from db.database import Base
+from sqlalchemy import Column, String, Date, DateTime, Numeric, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+# Rollups of daily_costs rebuilt by CostRollupService for the months touched by each ingestion,
+# dashboards read them instead of aggregating raw rows
+
+
+class CostDailyTotal(Base):
+    __tablename__ = "cost_daily_totals"
+
+    account_id = Column(UUID(as_uuid=True), ForeignKey("cloud_accounts.id", ondelete='CASCADE'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    cost = Column(Numeric(16, 5), nullable=False)
+
+
+class CostMonthlyService(Base):
+    __tablename__ = "cost_monthly_services"
+
+    account_id = Column(UUID(as_uuid=True), ForeignKey("cloud_accounts.id", ondelete='CASCADE'), primary_key=True)
+    # First day of the month
+    month = Column(Date, primary_key=True)
+    service_name = Column(String, primary_key=True)
+    cost = Column(Numeric(16, 5), nullable=False)
+    last_date = Column(Date, nullable=False)
+
+
+class CostMonthlyTotal(Base):
+    __tablename__ = "cost_monthly_totals"
+
+    account_id = Column(UUID(as_uuid=True), ForeignKey("cloud_accounts.id", ondelete='CASCADE'), primary_key=True)
+    month = Column(Date, primary_key=True)
+    # Month to date until the month is over
+    cost = Column(Numeric(16, 5), nullable=False)
+    last_date = Column(Date, nullable=False)
+    # cost plus the average of the last COST_FORECAST_WINDOW_DAYS for every day left after last_date
+    forecast = Column(Numeric(16, 5), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
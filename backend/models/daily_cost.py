@@ -1,15 +1,19 @@
 from db.database import Base
-from sqlalchemy import Column, String, Date, Numeric, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, String, Date, Numeric, ForeignKey, UniqueConstraint, event
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from sqlalchemy.orm import relationship
+from db.partitions import create_partitions
 
 class DailyCost(Base):
+    """
+    Range partitioned by month on date (db.partitions), the primary key and unique constraint include it
+    """
     __tablename__ = "daily_costs"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     account_id = Column(UUID(as_uuid=True), ForeignKey("cloud_accounts.id"), nullable=False)
-    date = Column(Date, nullable=False, index=True)
+    date = Column(Date, primary_key=True, nullable=False, index=True)
     service_name = Column(String, nullable=False)
     cost = Column(Numeric(14, 5), nullable=False, default=0.0)
     currency = Column(String, nullable=False, default="USD")
@@ -18,4 +22,9 @@ class DailyCost(Base):
 
     __table_args__ = (
         UniqueConstraint('account_id', 'date', 'service_name', name='_account_date_service_uc'),
+        {'postgresql_partition_by': 'RANGE (date)'},
     )
+
+
+event.listen(DailyCost.__table__, 'after_create', create_partitions)
+
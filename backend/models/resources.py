@@ -1,13 +1,25 @@
 from db.database import Base
-from sqlalchemy import Column, String, ForeignKey, DateTime
+from sqlalchemy import Column, String, ForeignKey, DateTime, DDL, Index, event, literal_column, text, type_coerce
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-import uuid
+from datetime import datetime
+from typing import List
+import re
+
+# Keys are inlined in SQL by detail_field, only plain identifiers are accepted
+DETAIL_FIELD_PATTERN = re.compile(r'^[A-Za-z0-9_]+$')
+# Rows whose valid_to is NULL are the current inventory, the indexes serving it only cover them
+CURRENT_VERSION = text('valid_to IS NULL')
 
 class CloudResource(Base):
+    """
+    One version of a resource: a scan that sees a new detail closes the current version (valid_to)
+    and opens a new one, resources that disappeared are closed. Nothing is ever deleted,
+    so storage only grows with actual churn
+    """
     __tablename__ = "resource"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text('gen_random_uuid()'), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     cloud_account_id = Column(UUID(as_uuid=True), ForeignKey('cloud_accounts.id'), nullable=False)
     resource_type = Column(String)
@@ -15,5 +27,63 @@ class CloudResource(Base):
     region = Column(String)
 
     detail = Column(JSONB)
+    detail_hash = Column(String(64))
+    valid_from = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    valid_to = Column(DateTime(timezone=True))
+    # CloudWatch summaries written by UtilizationService, kept out of detail so they never change detail_hash
+    utilization = Column(JSONB)
+    utilization_updated_at = Column(DateTime(timezone=True))
 
     cloud_account = relationship('CloudAccount', back_populates='resource')
+
+    __table_args__ = (
+        # One current version per resource, also serves the keyset pagination order and the resource_type / region filters
+        Index('_resource_identity_current', 'cloud_account_id', 'resource_type', 'region', 'resource_id', unique=True, postgresql_where=CURRENT_VERSION),
+        Index('ix_resource_account_region', 'cloud_account_id', 'region', postgresql_where=CURRENT_VERSION),
+        Index('ix_resource_account_state', 'cloud_account_id', text("(COALESCE(detail ->> 'state', detail ->> 'resource_status'))"), postgresql_where=CURRENT_VERSION),
+        Index('ix_resource_account_instance_type', 'cloud_account_id', text("(detail ->> 'instance_type')"), postgresql_where=CURRENT_VERSION),
+        Index('ix_resource_tags', text("(detail -> 'tags')"), postgresql_using='gin', postgresql_where=CURRENT_VERSION),
+        # Point-in-time lookups: tstzrange(valid_from, valid_to) @> as_of for one account (btree_gist for the UUID)
+        Index('ix_resource_history', 'cloud_account_id', text("tstzrange(valid_from, valid_to)"), postgresql_using='gist'),
+    )
+
+
+event.listen(CloudResource.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS btree_gist'))
+
+
+def detail_field(name: str, as_text: bool = True):
+    """
+    detail ->> 'name' (or -> for JSONB) with the key inlined, so the expression matches the index definitions
+    """
+    if not DETAIL_FIELD_PATTERN.match(name):
+        raise ValueError(f"Invalid detail field :: {name}")
+    if as_text:
+        return CloudResource.detail.op('->>')(literal_column(f"'{name}'"))
+    return type_coerce(CloudResource.detail.op('->')(literal_column(f"'{name}'")), JSONB)
+
+def detail_projection(fields: List[str]):
+    """
+    jsonb_build_object of the requested detail keys, the rest of detail never leaves the database
+    """
+    pairs = []
+    for field in fields:
+        pairs += [literal_column(f"'{field}'"), detail_field(field, as_text=False)]
+    return type_coerce(func.jsonb_build_object(*pairs), JSONB)
+
+def resource_current():
+    """
+    Current versions only, matches the partial indexes
+    """
+    return CloudResource.valid_to.is_(None)
+
+def resource_valid_at(as_of: datetime):
+    """
+    Versions valid at as_of, matches ix_resource_history
+    """
+    return func.tstzrange(CloudResource.valid_from, CloudResource.valid_to).op('@>')(as_of)
+
+def resource_state():
+    """
+    EC2 instances report 'state', RDS instances 'resource_status', matches ix_resource_account_state
+    """
+    return func.coalesce(detail_field('state'), detail_field('resource_status'))
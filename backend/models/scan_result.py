@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, DateTime, Column, ForeignKey, Enum
+from sqlalchemy import Integer, DateTime, Column, ForeignKey, Enum, LargeBinary, Index
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 import enum
 from sqlalchemy.sql import func
@@ -18,4 +18,15 @@ class ScanResult(Base):
     status = Column(Enum(StatusEnum), default=StatusEnum.SUCCESS)
     raw_data = Column(JSONB, nullable=False)
 
+    # Inventory left by the scan, zstd-compressed JSON written by ScanSnapshotService:
+    # a keyframe when snapshot_base_id is null, else a delta against the snapshot of that scan
+    snapshot = Column(LargeBinary)
+    snapshot_base_id = Column(Integer, ForeignKey('scan_results.id', ondelete='SET NULL'))
+    snapshot_resources = Column(Integer)
+    snapshot_bytes = Column(Integer)
+
     cloud_account = relationship("CloudAccount", back_populates='scan_results')
+
+    __table_args__ = (
+        Index('ix_scan_results_account', 'account_id', 'id'),
+    )
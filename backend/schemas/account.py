@@ -35,6 +35,9 @@ class CloudResourcesResponse(BaseModel):
     resource_id: str
     region: str
     detail: Dict[str, Any]
+    utilization: Optional[Dict[str, Any]] = None
+    valid_from: Optional[datetime] = None
+    valid_to: Optional[datetime] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -7,6 +7,9 @@ class StandardResponse(BaseModel, Generic[T]):
     message: str
     data: Optional[T] = None
 
+class PaginatedResponse(StandardResponse[T], Generic[T]):
+    next_cursor: Optional[str] = None
+
 class UserCreate(BaseModel):
     email: str
     password: str
@@ -0,0 +1,166 @@
+import numpy as np
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.anomaly import Anomaly, SeverityEnum
+from models.cloud_account import CloudAccount
+from models.daily_cost import DailyCost
+from core.config import ANOMALY_WINDOW_DAYS, ANOMALY_Z_THRESHOLD, ANOMALY_MIN_DELTA, ANOMALY_MIN_INCREASE_PCT, COST_RESTATEMENT_DAYS
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+COST_SPIKE = 'COST_SPIKE'
+
+
+def detect_cost_anomalies(costs: np.ndarray, window: int = ANOMALY_WINDOW_DAYS, evaluate_days: int = 1,
+                          z_threshold: float = ANOMALY_Z_THRESHOLD, min_delta: float = ANOMALY_MIN_DELTA,
+                          min_increase_pct: float = ANOMALY_MIN_INCREASE_PCT, from_days: Optional[np.ndarray] = None,
+                          until_days: Optional[np.ndarray] = None) -> dict:
+    """
+    Flag cost spikes on the last evaluate_days columns of a (series x days) cost matrix.
+    A day is a spike when it is z_threshold standard deviations above the mean of the previous
+    `window` days, at least min_delta above the day before and min_increase_pct above it (+X% vs J-1).
+    Everything is computed for all series at once, the matrix needs window + evaluate_days columns.
+    from_days / until_days (column index per series) restrict each series to its own evaluated days.
+    Returns the flagged (series, day) indices with their z-score, day-over-day change, baseline and severity.
+    """
+    n_series, n_days = costs.shape
+    first_day = n_days - evaluate_days
+    if first_day < window or first_day < 1:
+        raise ValueError(f"Need at least {window + evaluate_days} days of history, got {n_days}")
+
+    # Rolling mean and std of the `window` days before each evaluated day, from cumulative sums
+    padded = np.zeros((n_series, n_days + 1))
+    padded[:, 1:] = np.cumsum(costs, axis=1)
+    padded_sq = np.zeros((n_series, n_days + 1))
+    padded_sq[:, 1:] = np.cumsum(costs ** 2, axis=1)
+    days = np.arange(first_day, n_days)
+    window_sum = padded[:, days] - padded[:, days - window]
+    window_sq = padded_sq[:, days] - padded_sq[:, days - window]
+    mean = window_sum / window
+    std = np.sqrt(np.maximum(window_sq / window - mean ** 2, 0.0))
+
+    current = costs[:, days]
+    previous = costs[:, days - 1]
+    delta = current - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_score = np.where(std > 0, (current - mean) / std, np.where(current > mean, np.inf, 0.0))
+        increase_pct = np.where(previous > 0, delta / previous, np.where(current > 0, np.inf, 0.0))
+
+    flagged = (z_score >= z_threshold) & (delta >= min_delta) & (increase_pct >= min_increase_pct)
+    if from_days is not None:
+        flagged &= days >= from_days[:, None]
+    if until_days is not None:
+        flagged &= days <= until_days[:, None]
+    series_idx, day_offset = np.nonzero(flagged)
+
+    severity = np.select(
+        [z_score[flagged] >= 2 * z_threshold, (increase_pct[flagged] >= 1.0) | (z_score[flagged] >= 1.5 * z_threshold)],
+        [SeverityEnum.HIGH.value, SeverityEnum.MEDIUM.value],
+        default=SeverityEnum.LOW.value
+    )
+    return {
+        'series': series_idx,
+        'day': days[day_offset],
+        'z_score': z_score[flagged],
+        'increase_pct': increase_pct[flagged],
+        'baseline': mean[flagged],
+        'cost': current[flagged],
+        'severity': severity,
+    }
+
+
+class AnomalyService():
+    """
+    Loads daily_costs as one (account x service, day) matrix, runs detect_cost_anomalies over it
+    and bulk inserts the findings, _unique_anomaly_uc drops the ones already recorded.
+    Each account is evaluated up to its own last ingested day, from its CloudAccount.anomalies_detected_until
+    watermark minus the COST_RESTATEMENT_DAYS that ingestion may have rewritten since.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_cost_matrix(self, start: date, end: date, account_ids: Optional[List[UUID]] = None) -> tuple:
+        query = self.db.query(DailyCost.account_id, DailyCost.service_name, DailyCost.date, DailyCost.cost)\
+            .filter(DailyCost.date >= start, DailyCost.date <= end)
+        if account_ids:
+            query = query.filter(DailyCost.account_id.in_(account_ids))
+        rows = query.all()
+
+        n_days = (end - start).days + 1
+        if not rows:
+            return [], np.zeros((0, n_days))
+
+        account_col, service_col, date_col, cost_col = zip(*rows)
+        keys = np.array([f"{account}|{service}" for account, service in zip(account_col, service_col)])
+        series_keys, series_idx = np.unique(keys, return_inverse=True)
+        day_idx = (np.array(date_col, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(int)
+
+        costs = np.zeros((len(series_keys), n_days))
+        costs[series_idx, day_idx] = np.array(cost_col, dtype=float)
+        series = [tuple(key.split('|', 1)) for key in series_keys]
+        return series, costs
+
+    def evaluation_windows(self, account_ids: Optional[List[UUID]] = None, end: Optional[date] = None,
+                           evaluate_days: Optional[int] = None) -> Dict[str, Tuple[date, date]]:
+        """
+        account_id -> (first, last) day to evaluate. last is the account's own last ingested day (at most `end`),
+        first follows the watermark unless evaluate_days asks for a fixed number of days
+        """
+        query = self.db.query(CloudAccount.id, CloudAccount.anomalies_detected_until, func.max(DailyCost.date))\
+            .join(DailyCost, DailyCost.account_id == CloudAccount.id)
+        if account_ids:
+            query = query.filter(CloudAccount.id.in_(account_ids))
+        if end:
+            query = query.filter(DailyCost.date <= end)
+        windows = {}
+        for account_id, watermark, last in query.group_by(CloudAccount.id).all():
+            if evaluate_days:
+                first = last - timedelta(days=evaluate_days - 1)
+            else:
+                first = min(watermark or last, last) - timedelta(days=COST_RESTATEMENT_DAYS)
+            windows[str(account_id)] = (first, last)
+        return windows
+
+    def detect(self, account_ids: Optional[List[UUID]] = None, end: Optional[date] = None, evaluate_days: Optional[int] = None) -> int:
+        windows = self.evaluation_windows(account_ids, end, evaluate_days)
+        if not windows:
+            return 0
+        first = min(first for first, _ in windows.values())
+        end = max(last for _, last in windows.values())
+        start = first - timedelta(days=ANOMALY_WINDOW_DAYS)
+        series, costs = self.load_cost_matrix(start, end, [UUID(account_id) for account_id in windows])
+        self.db.query(CloudAccount).filter(CloudAccount.id.in_([UUID(account_id) for account_id in windows])).update(
+            {'anomalies_detected_until': case({UUID(account_id): last for account_id, (_, last) in windows.items()}, value=CloudAccount.id)},
+            synchronize_session=False
+        )
+        if not series:
+            return 0
+
+        # Days after an account's last ingested one are zero-filled columns, never evaluated
+        from_days = np.array([(windows[account_id][0] - start).days for account_id, _ in series])
+        until_days = np.array([(windows[account_id][1] - start).days for account_id, _ in series])
+        findings = detect_cost_anomalies(
+            costs, evaluate_days=(end - first).days + 1, from_days=from_days, until_days=until_days
+        )
+        rows = []
+        for series_idx, day, baseline, cost, severity in zip(findings['series'], findings['day'], findings['baseline'], findings['cost'], findings['severity']):
+            account_id, service_name = series[series_idx]
+            detected_day = start + timedelta(days=int(day))
+            rows.append({
+                'account_id': UUID(account_id),
+                # One finding per service and day, midnight keeps detected_at stable across runs
+                'detected_at': datetime.combine(detected_day, time.min, tzinfo=timezone.utc),
+                'resource_id': service_name,
+                'issue_type': COST_SPIKE,
+                'severity': SeverityEnum(severity),
+                'estimated_waste': Decimal(str(round(float(cost - baseline), 2))),
+            })
+        if not rows:
+            return 0
+
+        stmt = insert(Anomaly).values(rows).on_conflict_do_nothing(constraint='_unique_anomaly_uc')
+        return self.db.execute(stmt).rowcount
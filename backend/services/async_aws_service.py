@@ -0,0 +1,218 @@
+import asyncio
+from aiobotocore.config import AioConfig
+from aiobotocore.session import AioSession, get_session
+from botocore.exceptions import ClientError
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional
+from core.config import SCAN_BATCH_SIZE, UTILIZATION_WINDOW_DAYS, AWS_MAX_ATTEMPTS, AWS_MAX_POOL_CONNECTIONS
+from core.metrics import instrument_client
+from services.aws_rate_limiter import aws_rate_limiter
+from services.aws_service import AwsService
+
+
+class AsyncAwsService():
+    """
+    Coroutine twin of AwsService on aiobotocore, collectors have the same names and yield the same records.
+    Every AWS call waits on `call_slots`, the semaphore bounding the requests in flight of the whole process.
+    Clients are created once per (service, region) and closed with the root service (async with).
+    """
+
+    def __init__(self, access_key: str, secret_key: str, region: str, call_slots: asyncio.Semaphore, session: Optional[AioSession] = None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.call_slots = call_slots
+        self.session = session or get_session()
+        self.config = AioConfig(
+            max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+            retries={'mode': 'adaptive', 'max_attempts': AWS_MAX_ATTEMPTS}
+        )
+        self._clients = {}
+        self._client_locks = defaultdict(asyncio.Lock)
+        self._stack = AsyncExitStack()
+
+    async def __aenter__(self) -> 'AsyncAwsService':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._stack.aclose()
+
+    def for_region(self, region: str) -> 'AsyncAwsService':
+        # Same clients and exit stack, only the default region changes
+        service = AsyncAwsService(self.access_key, self.secret_key, region, self.call_slots, self.session)
+        service._clients = self._clients
+        service._client_locks = self._client_locks
+        service._stack = self._stack
+        service.config = self.config
+        return service
+
+    async def client(self, service: str, region: Optional[str] = None):
+        key = (service, region or self.region)
+        # Collectors of the same region ask for the same client at once, only the first one creates it
+        async with self._client_locks[key]:
+            if key in self._clients:
+                return self._clients[key]
+            client = await self._stack.enter_async_context(self.session.create_client(
+                service,
+                region_name=key[1],
+                aws_access_key_id=self.access_key,
+                aws_secret_access_key=self.secret_key,
+                config=self.config
+            ))
+            aws_rate_limiter.attach_async(client, self.access_key, service, key[1])
+            instrument_client(client)
+            self._clients[key] = client
+            return client
+
+    async def _call(self, method, **kwargs) -> dict:
+        async with self.call_slots:
+            return await method(**kwargs)
+
+    async def _paginate(self, method, input_token: str, output_token: str, **kwargs) -> AsyncIterator[dict]:
+        """
+        Follow a pagination token by hand so the semaphore is held for one page at a time
+        """
+        while True:
+            page = await self._call(method, **kwargs)
+            yield page
+            if not page.get(output_token):
+                break
+            kwargs[input_token] = page[output_token]
+
+    async def _batched(self, records: AsyncIterator[dict], batch_size: int) -> AsyncIterator[List[dict]]:
+        batch = []
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def get_enabled_regions(self) -> List[str]:
+        ec2_client = await self.client('ec2')
+        try:
+            res = await self._call(
+                ec2_client.describe_regions,
+                Filters=[{'Name': 'opt-in-status', 'Values': ['opt-in-not-required', 'opted-in']}]
+            )
+            return [region.get('RegionName') for region in res.get('Regions', [])]
+        except ClientError as e:
+            raise ValueError(f"AWS Error while listing enabled regions :: {e}")
+
+    async def _paginate_ec2_instances(self) -> AsyncIterator[dict]:
+        ec2_client = await self.client('ec2')
+        async for page in self._paginate(ec2_client.describe_instances, 'NextToken', 'NextToken'):
+            for reservation in page.get('Reservations', []):
+                for instance in reservation.get('Instances', []):
+                    yield AwsService._normalize_ec2_instance(instance)
+
+    async def iter_ec2_instances(self, batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+        try:
+            async for batch in self._batched(self._paginate_ec2_instances(), batch_size):
+                yield batch
+        except ClientError as e:
+            raise ValueError(f"AWS Error while scanning EC2 instances :: {e}")
+        except Exception as e:
+            raise ValueError(f"Error scanning EC2 instances :: {e}")
+
+    async def _resolve_bucket_region(self, s3_client, bucket: dict) -> str:
+        if bucket.get('BucketRegion'):
+            return bucket['BucketRegion']
+        location = (await self._call(s3_client.get_bucket_location, Bucket=bucket.get('Name'))).get('LocationConstraint')
+        return location or 'us-east-1'
+
+    async def _paginate_s3_buckets(self) -> AsyncIterator[dict]:
+        s3_client = await self.client('s3')
+        async for page in self._paginate(s3_client.list_buckets, 'ContinuationToken', 'ContinuationToken'):
+            for bucket in page.get('Buckets', []):
+                yield AwsService._normalize_s3_bucket(bucket, await self._resolve_bucket_region(s3_client, bucket))
+
+    async def iter_s3_buckets(self, batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+        try:
+            async for batch in self._batched(self._paginate_s3_buckets(), batch_size):
+                yield AwsService._apply_s3_sizes(batch, await self.get_s3_bucket_sizes(batch))
+        except ClientError as e:
+            raise ValueError(f"AWS Error while scanning S3 buckets :: {e}")
+        except Exception as e:
+            raise ValueError(f"Error scanning S3 buckets :: {e}")
+
+    async def get_s3_bucket_sizes(self, buckets: List[dict]) -> Dict[str, dict]:
+        """
+        Same GetMetricData requests as AwsService.get_s3_bucket_sizes, the regions are queried concurrently
+        """
+        sizes = {bucket['name']: {'size_bytes': 0.0, 'size_by_storage_type': {}, 'object_count': 0} for bucket in buckets}
+        now = datetime.now(timezone.utc)
+
+        async def fetch(region: str, queries: List[dict], query_targets: dict):
+            cw_client = await self.client('cloudwatch', region=region)
+            request = {'MetricDataQueries': queries, 'StartTime': now - timedelta(days=2), 'EndTime': now, 'ScanBy': 'TimestampDescending'}
+            async for page in self._paginate(cw_client.get_metric_data, 'NextToken', 'NextToken', **request):
+                AwsService._apply_s3_size_results(sizes, query_targets, page.get('MetricDataResults', []))
+
+        await asyncio.gather(*(fetch(*request) for request in AwsService._s3_size_requests(buckets)))
+        return sizes
+
+    async def _paginate_rds_instances(self) -> AsyncIterator[dict]:
+        rds_client = await self.client('rds')
+        async for page in self._paginate(rds_client.describe_db_instances, 'Marker', 'Marker'):
+            for instance in page.get('DBInstances', []):
+                yield AwsService._normalize_rds_instance(instance, self.region)
+
+    async def iter_rds_instances(self, batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+        try:
+            async for batch in self._batched(self._paginate_rds_instances(), batch_size):
+                yield batch
+        except ClientError as e:
+            raise ValueError(f"AWS Error while scanning RDS instances :: {e}")
+        except Exception as e:
+            raise ValueError(f"Error scanning RDS instances :: {e}")
+
+    async def _paginate_ebs_volumes(self) -> AsyncIterator[dict]:
+        ec2_client = await self.client('ec2')
+        async for page in self._paginate(ec2_client.describe_volumes, 'NextToken', 'NextToken'):
+            for volume in page.get('Volumes', []):
+                yield AwsService._normalize_ebs_volume(volume, self.region)
+
+    async def iter_ebs_volumes(self, batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+        try:
+            async for batch in self._batched(self._paginate_ebs_volumes(), batch_size):
+                yield batch
+        except ClientError as e:
+            raise ValueError(f"AWS Error while scanning EBS volumes :: {e}")
+        except Exception as e:
+            raise ValueError(f"Error scanning EBS volumes :: {e}")
+
+    async def iter_elastic_ips(self, batch_size: int = SCAN_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+        try:
+            ec2_client = await self.client('ec2')
+            res = await self._call(ec2_client.describe_addresses)
+            addresses = [AwsService._normalize_elastic_ip(address, self.region) for address in res.get('Addresses', [])]
+        except ClientError as e:
+            raise ValueError(f"AWS Error while scanning Elastic IPs :: {e}")
+        except Exception as e:
+            raise ValueError(f"Error scanning Elastic IPs :: {e}")
+        for start in range(0, len(addresses), batch_size):
+            yield addresses[start:start + batch_size]
+
+    async def get_utilization(self, resources: List[dict], days: int = UTILIZATION_WINDOW_DAYS) -> Dict[tuple, dict]:
+        """
+        Same GetMetricData requests as AwsService.get_utilization, sent concurrently
+        """
+        now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        hourly: Dict[tuple, List[float]] = defaultdict(list)
+        maximums: Dict[tuple, float] = {}
+        cw_client = await self.client('cloudwatch')
+
+        async def fetch(queries: List[dict], query_targets: dict):
+            request = {'MetricDataQueries': queries, 'StartTime': now - timedelta(days=days), 'EndTime': now}
+            async for page in self._paginate(cw_client.get_metric_data, 'NextToken', 'NextToken', **request):
+                AwsService._collect_utilization_results(hourly, maximums, query_targets, page.get('MetricDataResults', []))
+
+        try:
+            await asyncio.gather(*(fetch(*request) for request in AwsService._utilization_requests(resources, days)))
+        except ClientError as e:
+            raise ValueError(f"AWS Error while collecting CloudWatch utilization :: {e}")
+        return AwsService._summarize_utilization(hourly, maximums)
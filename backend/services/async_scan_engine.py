@@ -0,0 +1,110 @@
+import asyncio
+import time
+from aiobotocore.session import get_session
+from core.config import SCAN_ASYNC_MAX_ACCOUNTS, SCAN_ASYNC_MAX_CALLS, SCAN_ASYNC_MAX_DB_WRITERS
+from core.metrics import record_scan_service, stage
+from db.database import SessionLocal
+from models.scan_result import StatusEnum as ScanResultStatus
+from services.async_aws_service import AsyncAwsService
+from services.resource_sync_service import ResourceSliceWriter
+from typing import AsyncIterator, Dict, List, Optional
+from uuid import UUID
+
+
+class AsyncScanEngine():
+    """
+    Scans many accounts concurrently from a single process. Collectors run as coroutines, bounded by
+    three semaphores: accounts scanned at once, AWS requests in flight, slices written to the database at once.
+    Each batch is written from a thread as soon as it arrives while the next one is collected, so a slice holds
+    at most two batches in memory. A slice takes its database slot when its first batch is ready.
+    Results have the shape task_merge_scan records: {'service', 'region', 'status', 'counts', 'error'}
+    """
+
+    def __init__(self, collectors: Dict[str, tuple], global_services: set, max_accounts: int = SCAN_ASYNC_MAX_ACCOUNTS,
+                 max_calls: int = SCAN_ASYNC_MAX_CALLS, max_db_writers: int = SCAN_ASYNC_MAX_DB_WRITERS, persist: bool = True):
+        self.collectors = collectors
+        self.global_services = global_services
+        self.account_slots = asyncio.Semaphore(max_accounts)
+        self.call_slots = asyncio.Semaphore(max_calls)
+        self.db_slots = asyncio.Semaphore(max_db_writers)
+        self.persist = persist
+        self.session = get_session()
+
+    @staticmethod
+    def _commit_slice(db, writer: ResourceSliceWriter) -> Dict[str, int]:
+        counts = writer.finish()
+        with stage('db_commit'):
+            db.commit()
+        return counts
+
+    async def _write_slice(self, account_id: str, service: str, region: str, batches: AsyncIterator[List[dict]]) -> Dict[str, int]:
+        """
+        Stream the batches of one collector into a ResourceSliceWriter, the write of a batch overlaps the
+        collection of the next one. Nothing is removed nor committed unless the whole listing was seen
+        """
+        resource_type, _, id_key = self.collectors[service]
+        first = await anext(batches, None)
+        async with self.db_slots:
+            db = SessionLocal()
+            writing = None
+            try:
+                writer = ResourceSliceWriter(
+                    db, UUID(account_id), resource_type, region, id_key,
+                    remove_region=None if service in self.global_services else region
+                )
+                if first is not None:
+                    writing = asyncio.ensure_future(asyncio.to_thread(writer.write, first))
+                    async for batch in batches:
+                        await writing
+                        writing = asyncio.ensure_future(asyncio.to_thread(writer.write, batch))
+                    await writing
+                return await asyncio.to_thread(self._commit_slice, db, writer)
+            except Exception:
+                # The session may still be busy in the writer thread, wait for it before rolling back
+                if writing is not None and not writing.done():
+                    await asyncio.gather(writing, return_exceptions=True)
+                await asyncio.to_thread(db.rollback)
+                raise
+            finally:
+                await asyncio.to_thread(db.close)
+
+    async def _scan_slice(self, aws: AsyncAwsService, account_id: str, service: str, region: str) -> dict:
+        result = {'service': service, 'region': region}
+        started_at = time.perf_counter()
+        try:
+            batches = getattr(aws, self.collectors[service][1])()
+            if self.persist:
+                counts = await self._write_slice(account_id, service, region, batches)
+            else:
+                counts = {'collected': 0}
+                async for batch in batches:
+                    counts['collected'] += len(batch)
+            result.update(status=ScanResultStatus.SUCCESS.value, counts=counts, error=None)
+        except Exception as e:
+            print(f"Error in async scan ({account_id} {service} / {region}): {e}")
+            result.update(status=ScanResultStatus.FAILED.value, counts={}, error=str(e))
+        record_scan_service(service, self.collectors[service][0], result['status'], time.perf_counter() - started_at, result['counts'])
+        return result
+
+    async def scan_account(self, account_id: str, credentials: dict, regions: Optional[List[str]] = None) -> List[dict]:
+        """
+        Every collector of every enabled region (or `regions`) of one account, concurrently
+        """
+        async with self.account_slots:
+            async with AsyncAwsService(credentials['access_key_public'], credentials['secret_key'], 'us-east-1', self.call_slots, self.session) as aws:
+                try:
+                    regions = regions or await aws.get_enabled_regions()
+                except Exception as e:
+                    return [{'service': '*', 'region': '*', 'status': ScanResultStatus.FAILED.value, 'counts': {}, 'error': str(e)}]
+
+                # Regional services run once per enabled region, global ones once per account
+                jobs = [(service, region) for region in regions for service in self.collectors if service not in self.global_services]
+                jobs += [(service, aws.region) for service in self.global_services]
+                return list(await asyncio.gather(*(
+                    self._scan_slice(aws.for_region(region), account_id, service, region) for service, region in jobs
+                )))
+
+    async def scan_accounts(self, credentials_by_account: Dict[str, dict]) -> Dict[str, List[dict]]:
+        account_ids = list(credentials_by_account)
+        results = await asyncio.gather(*(self.scan_account(account_id, credentials_by_account[account_id]) for account_id in account_ids))
+        return dict(zip(account_ids, results))
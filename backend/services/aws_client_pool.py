@@ -0,0 +1,75 @@
+import hashlib
+import threading
+import boto3
+from botocore.config import Config
+from collections import OrderedDict
+from core.config import AWS_CLIENT_POOL_SIZE, AWS_MAX_POOL_CONNECTIONS, AWS_MAX_ATTEMPTS
+from core.metrics import instrument_client
+from services.aws_rate_limiter import aws_rate_limiter
+
+
+class AwsClientPool():
+    """
+    Process-wide pool of boto3 clients keyed by (access key, region, service).
+    Every client comes from one shared boto3 Session with the credentials passed per client, so the
+    loader and the service models are shared by every account, and clients are reused across tasks so their
+    keep-alive connections survive. Least recently used clients are evicted past max_clients.
+    A new secret for a known access key means the credentials rotated, every client of that key is then dropped.
+    Dropped clients are never closed, another thread may still be using them: they go with their last reference.
+    Clients retry in adaptive mode (exponential backoff with jitter plus client side rate limiting)
+    and every attempt goes through the shared aws_rate_limiter bucket of its (access key, service, region).
+    """
+
+    def __init__(self, max_clients: int = AWS_CLIENT_POOL_SIZE, max_pool_connections: int = AWS_MAX_POOL_CONNECTIONS):
+        self.max_clients = max_clients
+        self.config = Config(
+            max_pool_connections=max_pool_connections,
+            retries={'mode': 'adaptive', 'max_attempts': AWS_MAX_ATTEMPTS}
+        )
+        self.hits = 0
+        self.misses = 0
+        self._session = boto3.Session()
+        # (access key, region, service) -> (secret fingerprint, client)
+        self._clients: OrderedDict = OrderedDict()
+        # boto3 sessions are not thread safe, clients are created under this lock
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _fingerprint(secret_key: str) -> str:
+        return hashlib.sha256(secret_key.encode()).hexdigest()
+
+    def get_client(self, access_key: str, secret_key: str, service: str, region: str):
+        key = (access_key, region, service)
+        fingerprint = self._fingerprint(secret_key)
+        with self._lock:
+            cached = self._clients.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                self.invalidate(access_key)
+
+            self.misses += 1
+            client = self._session.client(
+                service, region_name=region, config=self.config,
+                aws_access_key_id=access_key, aws_secret_access_key=secret_key
+            )
+            aws_rate_limiter.attach(client, access_key, service, region)
+            instrument_client(client)
+            self._clients[key] = (fingerprint, client)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def invalidate(self, access_key: str):
+        with self._lock:
+            for key in [key for key in self._clients if key[0] == access_key]:
+                del self._clients[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'clients': len(self._clients), 'hits': self.hits, 'misses': self.misses}
+
+
+aws_client_pool = AwsClientPool()
@@ -0,0 +1,198 @@
+import asyncio
+import random
+import time
+from redis.exceptions import RedisError
+from core.config import AWS_RATE_LIMIT_ENABLED, AWS_RATE_INITIAL, AWS_RATE_MIN, AWS_RATE_MAX, AWS_RATE_BURST
+from core.locks import get_redis
+from core.metrics import AWS_RATE_LIMIT_WAIT_SECONDS
+from typing import Dict, List
+
+# Error codes AWS answers with when a caller exceeds its API rate
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'TransactionInProgressException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'RequestThrottled',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException',
+}
+
+# Refill the bucket, reserve one token and return how long the caller has to wait for it.
+# Every granted call nudges the rate up, the bucket state and the wait metrics live in two hashes
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local rate = tonumber(state[3]) or tonumber(ARGV[2])
+local burst = tonumber(ARGV[4])
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - 1
+local wait = 0
+if tokens < 0 then
+    wait = -tokens / rate
+end
+rate = math.min(tonumber(ARGV[3]), rate + tonumber(ARGV[5]))
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate)
+redis.call('EXPIRE', KEYS[1], 3600)
+redis.call('HINCRBY', KEYS[2], 'calls', 1)
+if wait > 0 then
+    redis.call('HINCRBY', KEYS[2], 'waited_calls', 1)
+    redis.call('HINCRBYFLOAT', KEYS[2], 'wait_seconds', wait)
+    if wait > (tonumber(redis.call('HGET', KEYS[2], 'max_wait_seconds')) or 0) then
+        redis.call('HSET', KEYS[2], 'max_wait_seconds', wait)
+    end
+end
+redis.call('EXPIRE', KEYS[2], 86400)
+return tostring(wait)
+"""
+
+# Multiplicative decrease, at most once per second so a burst of throttled calls from every worker counts once.
+# The bucket is emptied but keeps its debt: tokens already reserved by waiting callers (tokens < 0) stay reserved
+THROTTLE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('HINCRBY', KEYS[2], 'throttles', 1)
+redis.call('EXPIRE', KEYS[2], 86400)
+local state = redis.call('HMGET', KEYS[1], 'rate', 'cut_ts', 'tokens', 'ts')
+if now - (tonumber(state[2]) or 0) < 1 then
+    return tostring(state[1])
+end
+local current_rate = tonumber(state[1]) or tonumber(ARGV[2])
+local ts = tonumber(state[4]) or now
+-- Refill up to now at the rate in force before the cut, so ts = now stays consistent with tokens
+local tokens = (tonumber(state[3]) or 0) + math.max(0, now - ts) * current_rate
+local rate = math.max(tonumber(ARGV[3]), current_rate * tonumber(ARGV[4]))
+redis.call('HSET', KEYS[1], 'rate', rate, 'cut_ts', now, 'tokens', math.min(tokens, 0), 'ts', now)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(rate)
+"""
+
+
+class AwsRateLimiter():
+    """
+    Token bucket per (access key, service, region) shared by every worker process through Redis.
+    The rate follows AIMD: each granted call adds `increase` requests/s up to max_rate, a throttling
+    error multiplies it by `decrease`, so throughput settles just under what AWS accepts.
+    Waits carry a small jitter so workers released together do not hit AWS in lockstep.
+    The limiter fails open, a Redis outage never blocks a scan.
+    """
+
+    def __init__(self, enabled: bool = AWS_RATE_LIMIT_ENABLED, initial_rate: float = AWS_RATE_INITIAL, min_rate: float = AWS_RATE_MIN,
+                 max_rate: float = AWS_RATE_MAX, burst: float = AWS_RATE_BURST, increase: float = 0.05, decrease: float = 0.7):
+        self.enabled = enabled
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+
+    @staticmethod
+    def _keys(access_key: str, service: str, region: str) -> List[str]:
+        bucket = f"{access_key}:{service}:{region}"
+        return [f"aws_bucket:{bucket}", f"aws_bucket_stats:{bucket}"]
+
+    def reserve(self, access_key: str, service: str, region: str) -> float:
+        """
+        Reserve the next token of the bucket, returns the seconds to wait (jitter included) before using it
+        """
+        try:
+            wait = float(get_redis().eval(
+                ACQUIRE_SCRIPT, 2, *self._keys(access_key, service, region),
+                time.time(), self.initial_rate, self.max_rate, self.burst, self.increase
+            ))
+        except RedisError as e:
+            print(f"AWS rate limiter unavailable, call not limited :: {e}")
+            return 0.0
+        if wait > 0:
+            wait += random.uniform(0, min(wait, 1.0) * 0.1)
+        return wait
+
+    def acquire(self, access_key: str, service: str, region: str) -> float:
+        """
+        Block until the bucket grants a call, returns the seconds waited
+        """
+        wait = self.reserve(access_key, service, region)
+        AWS_RATE_LIMIT_WAIT_SECONDS.labels(service).observe(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self, access_key: str, service: str, region: str):
+        try:
+            get_redis().eval(
+                THROTTLE_SCRIPT, 2, *self._keys(access_key, service, region),
+                time.time(), self.initial_rate, self.min_rate, self.decrease
+            )
+        except RedisError as e:
+            print(f"AWS rate limiter unavailable, throttle not recorded :: {e}")
+
+    def attach(self, client, access_key: str, service: str, region: str):
+        """
+        Rate limit every attempt of a boto3 client, retries included, and report throttling errors
+        """
+        if not self.enabled:
+            return
+
+        def before_send(**kwargs):
+            self.acquire(access_key, service, region)
+
+        def needs_retry(response=None, **kwargs):
+            if response is not None and response[1].get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+                self.throttled(access_key, service, region)
+
+        client.meta.events.register('before-send', before_send)
+        client.meta.events.register('needs-retry', needs_retry)
+
+    def attach_async(self, client, access_key: str, service: str, region: str):
+        """
+        Same as attach for aiobotocore clients, the Redis round trip and the wait run off the event loop
+        """
+        if not self.enabled:
+            return
+
+        async def before_send(**kwargs):
+            wait = await asyncio.to_thread(self.reserve, access_key, service, region)
+            AWS_RATE_LIMIT_WAIT_SECONDS.labels(service).observe(wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        async def needs_retry(response=None, **kwargs):
+            if response is not None and response[1].get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+                await asyncio.to_thread(self.throttled, access_key, service, region)
+
+        client.meta.events.register('before-send', before_send)
+        client.meta.events.register('needs-retry', needs_retry)
+
+    def stats(self, access_key: str) -> Dict[str, dict]:
+        """
+        Current rate and wait metrics of every bucket of an access key, keyed by 'service:region'
+        """
+        client = get_redis()
+        prefix = f"aws_bucket_stats:{access_key}:"
+        buckets = {}
+        for stats_key in client.scan_iter(match=f"{prefix}*"):
+            bucket = stats_key[len(prefix):]
+            stats = client.hgetall(stats_key)
+            calls = int(stats.get('calls', 0))
+            wait_seconds = float(stats.get('wait_seconds', 0))
+            buckets[bucket] = {
+                'rate': float(client.hget(f"aws_bucket:{access_key}:{bucket}", 'rate') or self.initial_rate),
+                'calls': calls,
+                'waited_calls': int(stats.get('waited_calls', 0)),
+                'wait_seconds': wait_seconds,
+                'avg_wait_seconds': wait_seconds / calls if calls else 0.0,
+                'max_wait_seconds': float(stats.get('max_wait_seconds', 0)),
+                'throttles': int(stats.get('throttles', 0)),
+            }
+        return buckets
+
+
+aws_rate_limiter = AwsRateLimiter()
@@ -1,17 +1,64 @@
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional
+from core.config import SCAN_BATCH_SIZE, UTILIZATION_WINDOW_DAYS
+import numpy as np
+from services.aws_client_pool import aws_client_pool
+
+# GetMetricData accepts at most 500 queries per call
+CW_MAX_QUERIES_PER_CALL = 500
+
+# Every StorageType dimension S3 publishes BucketSizeBytes under
+S3_STORAGE_TYPES = [
+    'StandardStorage',
+    'IntelligentTieringFAStorage',
+    'IntelligentTieringIAStorage',
+    'IntelligentTieringAAStorage',
+    'IntelligentTieringAIAStorage',
+    'IntelligentTieringDAAStorage',
+    'StandardIAStorage',
+    'OneZoneIAStorage',
+    'ReducedRedundancyStorage',
+    'GlacierInstantRetrievalStorage',
+    'GlacierStorage',
+    'DeepArchiveStorage',
+    'ExpressOneZone',
+]
+
+# resource_type -> (CloudWatch namespace, dimension holding the resource id, metrics summarized per resource)
+UTILIZATION_METRICS = {
+    'ec2_instance': ('AWS/EC2', 'InstanceId', ['CPUUtilization', 'NetworkIn', 'NetworkOut']),
+    'rds_instance': ('AWS/RDS', 'DBInstanceIdentifier', ['CPUUtilization', 'DatabaseConnections']),
+}
+
+
+def batched(items: Iterable[dict], batch_size: int) -> Iterator[List[dict]]:
+    """
+    Group an iterable into lists of at most batch_size items
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
 class AwsService():
     def __init__(self, access_key: str, secret_key: str, region: str):
-        self.session = boto3.Session(
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+
+    def client(self, service: str, region: Optional[str] = None):
+        return aws_client_pool.get_client(self.access_key, self.secret_key, service, region or self.region)
 
     def test_connectivity(self):
-        sts_client = self.session.client('sts')
+        sts_client = self.client('sts')
         try:
             account_infos = sts_client.get_caller_identity()
             return account_infos
@@ -19,118 +66,401 @@ class AwsService():
             raise ValueError(f"AWS Error: {e}")
         except NoCredentialsError as e:
             raise ValueError("Invalid Credentials")
-        
-    def scan_ec2_instances(self):
-        ec2_client = self.session.client('ec2')
+
+    def for_region(self, region: str) -> 'AwsService':
+        return AwsService(self.access_key, self.secret_key, region=region)
+
+    def get_enabled_regions(self) -> List[str]:
+        ec2_client = self.client('ec2')
         try:
-            res = ec2_client.describe_instances()
-            instances = []
+            res = ec2_client.describe_regions(
+                Filters=[{'Name': 'opt-in-status', 'Values': ['opt-in-not-required', 'opted-in']}]
+            )
+            return [region.get('RegionName') for region in res.get('Regions', [])]
+        except ClientError as e:
+            raise ValueError(f"AWS Error while listing enabled regions :: {e}")
+
+    @staticmethod
+    def _normalize_ec2_instance(instance: dict) -> dict:
+        return {
+            'instance_id': instance.get('InstanceId'),
+            'instance_type': instance.get('InstanceType'),
+            'state': instance.get('State', {}).get('Name'),
+            'state_code': instance.get('State', {}).get('Code'),
+            'architecture': instance.get('Architecture'),
+            'launch_time': instance.get('LaunchTime').isoformat() if instance.get('LaunchTime') else None,
+            'availability_zone': instance.get('Placement', {}).get('AvailabilityZone'),
+            'vpc_id': instance.get('VpcId'),
+            'subnet_id': instance.get('SubnetId'),
+            'private_ip_address': instance.get('PrivateIpAddress'),
+            'public_ip_address': instance.get('PublicIpAddress'),
+            'private_dns_name': instance.get('PrivateDnsName'),
+            'public_dns_name': instance.get('PublicDnsName'),
+            'key_name': instance.get('KeyName'),
+            'security_groups': [
+                {'group_id': sg.get('GroupId'), 'group_name': sg.get('GroupName')}
+                for sg in instance.get('SecurityGroups', [])
+            ],
+            'iam_instance_profile': instance.get('IamInstanceProfile', {}).get('Arn'),
+            'monitoring': instance.get('Monitoring', {}).get('State'),
+            'tags': {tag.get('Key'): tag.get('Value') for tag in instance.get('Tags', [])},
+            'platform': instance.get('PlatformDetails'),
+            'ebs_optimized': instance.get('EbsOptimized'),
+            'root_device_type': instance.get('RootDeviceType'),
+            'virtualization_type': instance.get('VirtualizationType')
+        }
 
-            for reservation in res.get('Reservations', []):
+    def _paginate_ec2_instances(self) -> Iterator[dict]:
+        ec2_client = self.client('ec2')
+        paginator = ec2_client.get_paginator('describe_instances')
+        for page in paginator.paginate():
+            for reservation in page.get('Reservations', []):
                 for instance in reservation.get('Instances', []):
-                    instance_info = {
-                        'instance_id': instance.get('InstanceId'),
-                        'instance_type': instance.get('InstanceType'),
-                        'state': instance.get('State', {}).get('Name'),
-                        'state_code': instance.get('State', {}).get('Code'),
-                        'architecture': instance.get('Architecture'),
-                        'launch_time': instance.get('LaunchTime').isoformat() if instance.get('LaunchTime') else None,
-                        'availability_zone': instance.get('Placement', {}).get('AvailabilityZone'),
-                        'vpc_id': instance.get('VpcId'),
-                        'subnet_id': instance.get('SubnetId'),
-                        'private_ip_address': instance.get('PrivateIpAddress'),
-                        'public_ip_address': instance.get('PublicIpAddress'),
-                        'private_dns_name': instance.get('PrivateDnsName'),
-                        'public_dns_name': instance.get('PublicDnsName'),
-                        'key_name': instance.get('KeyName'),
-                        'security_groups': [
-                            {'group_id': sg.get('GroupId'), 'group_name': sg.get('GroupName')}
-                            for sg in instance.get('SecurityGroups', [])
-                        ],
-                        'iam_instance_profile': instance.get('IamInstanceProfile', {}).get('Arn'),
-                        'monitoring': instance.get('Monitoring', {}).get('State'),
-                        'tags': {tag.get('Key'): tag.get('Value') for tag in instance.get('Tags', [])},
-                        'platform': instance.get('PlatformDetails'),
-                        'ebs_optimized': instance.get('EbsOptimized'),
-                        'root_device_type': instance.get('RootDeviceType'),
-                        'virtualization_type': instance.get('VirtualizationType')
-                    }
-                    instances.append(instance_info)
-            return instances
+                    yield self._normalize_ec2_instance(instance)
+
+    def iter_ec2_instances(self, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[List[dict]]:
+        """
+        Walk every describe_instances page and yield normalized instances in batches of at most batch_size
+        """
+        try:
+            yield from batched(self._paginate_ec2_instances(), batch_size)
         except ClientError as e:
             raise ValueError(f"AWS Error while scanning EC2 instances :: {e}")
         except Exception as e:
             raise ValueError(f"Error scanning EC2 instances :: {e}")
 
+    def scan_ec2_instances(self):
+        return [instance for batch in self.iter_ec2_instances() for instance in batch]
+
+    @staticmethod
+    def _normalize_s3_bucket(bucket: dict, region: str) -> dict:
+        return {
+            'resource_id': bucket.get('Name'),
+            'name': bucket.get('Name'),
+            'creation_date': bucket.get('CreationDate').isoformat() if bucket.get('CreationDate') else None,
+            'region': region,
+            'arn': bucket.get('BucketArn', f"arn:aws:s3:::{bucket.get('Name')}")
+        }
 
-    def scan_s3_bucket(self):
-        s3_client = self.session.client('s3')
+    def _resolve_bucket_region(self, s3_client, bucket: dict) -> str:
+        if bucket.get('BucketRegion'):
+            return bucket['BucketRegion']
+        # Older list_buckets responses do not carry the region, ask S3 for it
+        location = s3_client.get_bucket_location(Bucket=bucket.get('Name')).get('LocationConstraint')
+        return location or 'us-east-1'
 
+    def _paginate_s3_buckets(self) -> Iterator[dict]:
+        s3_client = self.client('s3')
+        paginator = s3_client.get_paginator('list_buckets')
+        for page in paginator.paginate():
+            for bucket in page.get('Buckets', []):
+                yield self._normalize_s3_bucket(bucket, self._resolve_bucket_region(s3_client, bucket))
+
+    def iter_s3_buckets(self, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[List[dict]]:
+        """
+        Walk every list_buckets page and yield buckets in batches of at most batch_size,
+        each batch is sized with a handful of GetMetricData calls
+        """
         try:
-            res_bucket = s3_client.list_buckets()
-            buckets = list()
-            for bucket in res_bucket.get('Buckets', []):
-                size_bytes = self.get_s3_bucket_size(bucket_name=bucket.get('Name'), region=self.session.region_name)
-                size_gb = size_bytes / (1024 ** 3)
-                buckets.append({
-                    'resource_id': bucket.get('Name'),
-                    'name': bucket.get('Name'),
-                    'creation_date': bucket.get('CreationDate').isoformat() if bucket.get('CreationDate') else None,
-                    'region': bucket.get('BucketRegion', 'global'),
-                    'size' : size_gb,
-                    'arn': bucket.get('BucketArn', f"arn:aws:s3:::{bucket.get('Name')}")
-                })
-            return buckets
+            for batch in batched(self._paginate_s3_buckets(), batch_size):
+                yield self._apply_s3_sizes(batch, self.get_s3_bucket_sizes(batch))
         except ClientError as e:
             raise ValueError(f"AWS Error while scanning S3 buckets :: {e}")
         except Exception as e:
             raise ValueError(f"Error scanning S3 buckets :: {e}")
 
-    def scan_rds_instance(self):
-        rds_client = self.session.client('rds')
+    @staticmethod
+    def _apply_s3_sizes(batch: List[dict], sizes: Dict[str, dict]) -> List[dict]:
+        for bucket in batch:
+            bucket_size = sizes[bucket['name']]
+            bucket['size'] = bucket_size['size_bytes'] / (1024 ** 3)
+            bucket['size_by_storage_type'] = bucket_size['size_by_storage_type']
+            bucket['object_count'] = bucket_size['object_count']
+        return batch
+
+    def scan_s3_bucket(self):
+        return [bucket for batch in self.iter_s3_buckets() for bucket in batch]
+
+    @staticmethod
+    def _normalize_rds_instance(instance: dict, region: str) -> dict:
+        return {
+            'resource_id': instance.get('DBInstanceIdentifier'),
+            'resource_class': instance.get('DBInstanceClass'),
+            'engine': instance.get('Engine'),
+            'resource_status': instance.get('DBInstanceStatus'),
+            'allocated_storage': instance.get('AllocatedStorage'),
+            'address': instance.get('Endpoint', {}).get('Address'),
+            'creation_date': instance.get('InstanceCreateTime').isoformat() if instance.get('InstanceCreateTime') else None,
+            'storage_type': instance.get('StorageType'),
+            'region': region
+        }
+
+    def _paginate_rds_instances(self) -> Iterator[dict]:
+        rds_client = self.client('rds')
+        paginator = rds_client.get_paginator('describe_db_instances')
+        for page in paginator.paginate():
+            for instance in page.get('DBInstances', []):
+                yield self._normalize_rds_instance(instance, self.region)
+
+    def iter_rds_instances(self, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[List[dict]]:
+        """
+        Walk every describe_db_instances page and yield RDS instances in batches of at most batch_size
+        """
         try:
-            res = rds_client.describe_db_instances()
-            instances_list = list()
-            for instance in res.get('DBInstances', []):
-                instances_list.append({
-                    'resource_id': instance.get('DBInstanceIdentifier'),
-                    'resource_class': instance.get('DBInstanceClass'),
-                    'engine': instance.get('Engine'),
-                    'resource_status': instance.get('DBInstanceStatus'),
-                    'allocated_storage': instance.get('AllocatedStorage'),
-                    'address': instance.get('Endpoint', {}).get('Address'),
-                    'creation_date': instance.get('InstanceCreateTime').isoformat() if instance.get('InstanceCreateTime') else None,
-                    'storage_type': instance.get('StorageType'),
-                    'region': self.session.region_name
-                })
-            return instances_list
+            yield from batched(self._paginate_rds_instances(), batch_size)
         except ClientError as e:
             raise ValueError(f"AWS Error while scanning RDS instances :: {e}")
         except Exception as e:
             raise ValueError(f"AWS Error while scanning RDS instances :: {e}")
 
+    def scan_rds_instance(self):
+        return [instance for batch in self.iter_rds_instances() for instance in batch]
+
+    @staticmethod
+    def _normalize_ebs_volume(volume: dict, region: str) -> dict:
+        return {
+            'resource_id': volume.get('VolumeId'),
+            'volume_type': volume.get('VolumeType'),
+            'size': volume.get('Size'),
+            'iops': volume.get('Iops'),
+            'state': volume.get('State'),
+            'encrypted': volume.get('Encrypted'),
+            'availability_zone': volume.get('AvailabilityZone'),
+            'create_time': volume.get('CreateTime').isoformat() if volume.get('CreateTime') else None,
+            'attachments': [
+                {'instance_id': attachment.get('InstanceId'), 'state': attachment.get('State'), 'device': attachment.get('Device')}
+                for attachment in volume.get('Attachments', [])
+            ],
+            'tags': {tag.get('Key'): tag.get('Value') for tag in volume.get('Tags', [])},
+            'region': region
+        }
+
+    def _paginate_ebs_volumes(self) -> Iterator[dict]:
+        ec2_client = self.client('ec2')
+        paginator = ec2_client.get_paginator('describe_volumes')
+        for page in paginator.paginate():
+            for volume in page.get('Volumes', []):
+                yield self._normalize_ebs_volume(volume, self.region)
+
+    def iter_ebs_volumes(self, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[List[dict]]:
+        """
+        Walk every describe_volumes page and yield EBS volumes in batches of at most batch_size
+        """
+        try:
+            yield from batched(self._paginate_ebs_volumes(), batch_size)
+        except ClientError as e:
+            raise ValueError(f"AWS Error while scanning EBS volumes :: {e}")
+        except Exception as e:
+            raise ValueError(f"Error scanning EBS volumes :: {e}")
+
+    @staticmethod
+    def _normalize_elastic_ip(address: dict, region: str) -> dict:
+        return {
+            'resource_id': address.get('AllocationId') or address.get('PublicIp'),
+            'public_ip': address.get('PublicIp'),
+            'allocation_id': address.get('AllocationId'),
+            'association_id': address.get('AssociationId'),
+            'instance_id': address.get('InstanceId'),
+            'network_interface_id': address.get('NetworkInterfaceId'),
+            'domain': address.get('Domain'),
+            'tags': {tag.get('Key'): tag.get('Value') for tag in address.get('Tags', [])},
+            'region': region
+        }
+
+    def _list_elastic_ips(self) -> Iterator[dict]:
+        # describe_addresses is not paginated, a region holds few Elastic IPs
+        ec2_client = self.client('ec2')
+        for address in ec2_client.describe_addresses().get('Addresses', []):
+            yield self._normalize_elastic_ip(address, self.region)
+
+    def iter_elastic_ips(self, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[List[dict]]:
+        try:
+            yield from batched(self._list_elastic_ips(), batch_size)
+        except ClientError as e:
+            raise ValueError(f"AWS Error while scanning Elastic IPs :: {e}")
+        except Exception as e:
+            raise ValueError(f"Error scanning Elastic IPs :: {e}")
+
+    def iter_daily_costs(self, start: date, end: date) -> Iterator[dict]:
+        """
+        Daily unblended cost per service between start (inclusive) and end (exclusive).
+        get_cost_and_usage has no botocore paginator, NextPageToken is followed by hand
+        """
+        ce_client = self.client('ce', region='us-east-1')
+        request = {
+            'TimePeriod': {'Start': start.isoformat(), 'End': end.isoformat()},
+            'Granularity': 'DAILY',
+            'Metrics': ['UnblendedCost'],
+            'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}],
+        }
+        try:
+            while True:
+                res = ce_client.get_cost_and_usage(**request)
+                for result in res.get('ResultsByTime', []):
+                    day = date.fromisoformat(result['TimePeriod']['Start'])
+                    for group in result.get('Groups', []):
+                        metric = group.get('Metrics', {}).get('UnblendedCost', {})
+                        yield {
+                            'date': day,
+                            'service_name': group['Keys'][0],
+                            'cost': Decimal(metric.get('Amount', '0')),
+                            'currency': metric.get('Unit', 'USD'),
+                        }
+                if not res.get('NextPageToken'):
+                    break
+                request['NextPageToken'] = res['NextPageToken']
+        except ClientError as e:
+            raise ValueError(f"AWS Error while fetching Cost Explorer data :: {e}")
+
+    @staticmethod
+    def _s3_size_requests(buckets: List[dict]) -> Iterator[tuple]:
+        """
+        Yield (region, queries, query_targets) GetMetricData requests sizing buckets ({'name', 'region'}),
+        buckets are grouped by region so each request hits the regional CloudWatch endpoint
+        """
+        by_region: Dict[str, List[str]] = defaultdict(list)
+        for bucket in buckets:
+            by_region[bucket['region']].append(bucket['name'])
+
+        queries_per_bucket = len(S3_STORAGE_TYPES) + 1
+        buckets_per_call = max(1, CW_MAX_QUERIES_PER_CALL // queries_per_bucket)
+
+        for region, bucket_names in by_region.items():
+            for start in range(0, len(bucket_names), buckets_per_call):
+                queries = []
+                query_targets = {}
+                for index, bucket_name in enumerate(bucket_names[start:start + buckets_per_call]):
+                    metrics = [('BucketSizeBytes', storage_type) for storage_type in S3_STORAGE_TYPES]
+                    metrics.append(('NumberOfObjects', 'AllStorageTypes'))
+                    for metric_index, (metric_name, storage_type) in enumerate(metrics):
+                        query_id = f"b{index}_{metric_index}"
+                        query_targets[query_id] = (bucket_name, metric_name, storage_type)
+                        queries.append({
+                            'Id': query_id,
+                            'MetricStat': {
+                                'Metric': {
+                                    'Namespace': 'AWS/S3',
+                                    'MetricName': metric_name,
+                                    'Dimensions': [
+                                        {'Name': 'BucketName', 'Value': bucket_name},
+                                        {'Name': 'StorageType', 'Value': storage_type}
+                                    ]
+                                },
+                                'Period': 86400,
+                                'Stat': 'Average'
+                            },
+                            'ReturnData': True
+                        })
+                yield region, queries, query_targets
+
+    @staticmethod
+    def _apply_s3_size_results(sizes: Dict[str, dict], query_targets: dict, results: List[dict]):
+        for result in results:
+            values = result.get('Values')
+            if not values:
+                continue
+            bucket_name, metric_name, storage_type = query_targets[result['Id']]
+            # Values are sorted newest first
+            if metric_name == 'NumberOfObjects':
+                sizes[bucket_name]['object_count'] = int(values[0])
+            else:
+                sizes[bucket_name]['size_by_storage_type'][storage_type] = values[0]
+                sizes[bucket_name]['size_bytes'] += values[0]
+
+    def get_s3_bucket_sizes(self, buckets: List[dict]) -> Dict[str, dict]:
+        """
+        Size a list of buckets ({'name', 'region'}) with GetMetricData, every storage type is summed into size_bytes
+        """
+        sizes = {bucket['name']: {'size_bytes': 0.0, 'size_by_storage_type': {}, 'object_count': 0} for bucket in buckets}
+        now = datetime.now(timezone.utc)
+
+        for region, queries, query_targets in self._s3_size_requests(buckets):
+            paginator = self.client('cloudwatch', region=region).get_paginator('get_metric_data')
+            for page in paginator.paginate(MetricDataQueries=queries, StartTime=now - timedelta(days=2), EndTime=now, ScanBy='TimestampDescending'):
+                self._apply_s3_size_results(sizes, query_targets, page.get('MetricDataResults', []))
+        return sizes
 
     def get_s3_bucket_size(self, bucket_name: str, region = 'eu-west-3'):
-        cw_client = self.session.client('cloudwatch')
-        now = datetime.now()
         try:
-            res = cw_client.get_metric_statistics(
-                Namespace='AWS/S3',
-                MetricName='BucketSizeBytes',
-                Dimensions=[
-                    {'Name': 'BucketName', 'Value': bucket_name},
-                    {'Name': 'StorageType', 'Value': 'StandardStorage'}
-                ],
-                StartTime=  now - timedelta(days=2),
-                EndTime=now,
-                Period=86400,
-                Statistics=['Average', 'Maximum']
-            )
-            datapoint = res.get('Datapoints')
-            if datapoint:
-                return datapoint[-1]['Average']
-            return 0.0
+            return self.get_s3_bucket_sizes([{'name': bucket_name, 'region': region}])[bucket_name]['size_bytes']
         except ClientError as e:
             raise ValueError(f"AWS Error while scanning S3 bucket size for bucket {bucket_name}:: {e}")
         except Exception as e:
-            raise ValueError(f"AWS Error while scanning S3 bucket size for bucket {bucket_name} :: {e}")
\ No newline at end of file
+            raise ValueError(f"AWS Error while scanning S3 bucket size for bucket {bucket_name} :: {e}")
+
+    @staticmethod
+    def _utilization_requests(resources: List[dict], days: int) -> Iterator[tuple]:
+        """
+        Yield (queries, query_targets) GetMetricData requests for the UTILIZATION_METRICS of resources.
+        Every metric is queried twice per resource, hourly averages for p50 / p95 and a single datapoint
+        for the maximum over the whole window, a request carries 250 such pairs
+        """
+        targets = []
+        for resource in resources:
+            namespace, dimension, metrics = UTILIZATION_METRICS[resource['resource_type']]
+            for metric_name in metrics:
+                targets.append((resource['resource_type'], resource['resource_id'], namespace, dimension, metric_name))
+
+        for chunk in batched(targets, CW_MAX_QUERIES_PER_CALL // 2):
+            queries = []
+            query_targets = {}
+            for index, (resource_type, resource_id, namespace, dimension, metric_name) in enumerate(chunk):
+                metric = {
+                    'Namespace': namespace,
+                    'MetricName': metric_name,
+                    'Dimensions': [{'Name': dimension, 'Value': resource_id}]
+                }
+                for kind, period, stat in (('avg', 3600, 'Average'), ('max', days * 86400, 'Maximum')):
+                    query_id = f"{kind}{index}"
+                    query_targets[query_id] = (kind, (resource_type, resource_id, metric_name))
+                    queries.append({
+                        'Id': query_id,
+                        'MetricStat': {'Metric': metric, 'Period': period, 'Stat': stat},
+                        'ReturnData': True
+                    })
+            yield queries, query_targets
+
+    @staticmethod
+    def _collect_utilization_results(hourly: Dict[tuple, List[float]], maximums: Dict[tuple, float], query_targets: dict, results: List[dict]):
+        for result in results:
+            values = result.get('Values')
+            if not values:
+                continue
+            kind, key = query_targets[result['Id']]
+            if kind == 'avg':
+                hourly[key].extend(values)
+            else:
+                maximums[key] = max(values)
+
+    @staticmethod
+    def _summarize_utilization(hourly: Dict[tuple, List[float]], maximums: Dict[tuple, float]) -> Dict[tuple, dict]:
+        summaries: Dict[tuple, dict] = defaultdict(dict)
+        for key, values in hourly.items():
+            resource_type, resource_id, metric_name = key
+            p50, p95 = np.percentile(values, [50, 95])
+            summaries[(resource_type, resource_id)][metric_name] = {
+                'p50': round(float(p50), 4),
+                'p95': round(float(p95), 4),
+                'max': round(float(maximums.get(key, max(values))), 4),
+                'datapoints': len(values),
+            }
+        return dict(summaries)
+
+    def get_utilization(self, resources: List[dict], days: int = UTILIZATION_WINDOW_DAYS) -> Dict[tuple, dict]:
+        """
+        Summarize the UTILIZATION_METRICS of resources ({'resource_type', 'resource_id'}) of this region
+        over the last `days` days with GetMetricData.
+        Returns {(resource_type, resource_id): {metric: {'p50', 'p95', 'max', 'datapoints'}}}
+        """
+        now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        hourly: Dict[tuple, List[float]] = defaultdict(list)
+        maximums: Dict[tuple, float] = {}
+        paginator = self.client('cloudwatch').get_paginator('get_metric_data')
+
+        try:
+            for queries, query_targets in self._utilization_requests(resources, days):
+                for page in paginator.paginate(MetricDataQueries=queries, StartTime=now - timedelta(days=days), EndTime=now):
+                    self._collect_utilization_results(hourly, maximums, query_targets, page.get('MetricDataResults', []))
+        except ClientError as e:
+            raise ValueError(f"AWS Error while collecting CloudWatch utilization :: {e}")
+        return self._summarize_utilization(hourly, maximums)
@@ -2,13 +2,46 @@ from sqlalchemy.orm import Session
 from cryptography.fernet import Fernet
 from models.cloud_account import CloudAccount
 from models.resources import CloudResource
-from schemas.account import CloudAccountCreate, CloudAccountResponse, CloudResourcesResponse
+from schemas.account import CloudAccountCreate, CloudAccountResponse
 from sqlalchemy.orm import load_only
 from cryptography.fernet import Fernet
 from core.security import encrypt_data, decrypt_data
+from core.metrics import stage
+from datetime import datetime, timezone
 from uuid import UUID
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import HTTPException, status
+from sqlalchemy import Float, cast, func, tuple_
+from models.resources import detail_field, detail_projection, resource_current, resource_state, resource_valid_at
+import base64
+import json
+
+
+def encode_cursor(*values: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != 3:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+# GROUPING(cloud_account_id, resource_type, region, state, instance_type) of each grouping set of get_summary,
+# a bit is set for every column the set does not group by
+SUMMARY_SETS = {
+    0b01111: 'accounts',
+    0b10111: 'by_resource_type',
+    0b11011: 'by_region',
+    0b10101: 'by_state',
+    0b11110: 'by_instance_type',
+    0b11111: 'total',
+}
 
 class CloudAccountService():
     
@@ -75,16 +108,133 @@ class CloudAccountService():
                 detail=f"Dabase error :: {e}"
             )
 
-    def get_resources(self, account_id: UUID) -> List[CloudResourcesResponse]:
+    def get_resources(self, account_id: UUID, user_id: UUID, limit: int = 100, cursor: Optional[str] = None,
+                      resource_type: Optional[str] = None, region: Optional[str] = None, state: Optional[str] = None,
+                      tag_key: Optional[str] = None, tag_value: Optional[str] = None,
+                      fields: Optional[List[str]] = None, as_of: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of resources ordered by (resource_type, region, resource_id), the order of _resource_identity_current.
+        Rows are plain dicts shaped like CloudResourcesResponse, with detail reduced to `fields` when given.
+        With as_of, the inventory as it was at that instant (ix_resource_history) instead of the current one.
+        Returns the page and the cursor of the next one, None on the last page
+        """
+        detail_column = detail_projection(fields) if fields else CloudResource.detail
+        if as_of and as_of.tzinfo is None:
+            as_of = as_of.replace(tzinfo=timezone.utc)
+        query = self.db.query(
+            CloudResource.id,
+            CloudResource.cloud_account_id,
+            CloudResource.resource_type,
+            CloudResource.resource_id,
+            CloudResource.region,
+            detail_column.label('detail'),
+            CloudResource.utilization,
+            CloudResource.valid_from,
+            CloudResource.valid_to
+        )\
+            .join(CloudAccount, CloudAccount.id == CloudResource.cloud_account_id)\
+            .filter(
+                CloudResource.cloud_account_id == account_id,
+                CloudAccount.user_id == user_id,
+                resource_valid_at(as_of) if as_of else resource_current()
+            )
+
+        if resource_type:
+            query = query.filter(CloudResource.resource_type == resource_type)
+        if region:
+            query = query.filter(CloudResource.region == region)
+        if state:
+            query = query.filter(resource_state() == state)
+        if tag_key and tag_value is not None:
+            query = query.filter(detail_field('tags', as_text=False).contains({tag_key: tag_value}))
+        elif tag_key:
+            query = query.filter(detail_field('tags', as_text=False).has_key(tag_key))
+        if cursor:
+            query = query.filter(
+                tuple_(CloudResource.resource_type, CloudResource.region, CloudResource.resource_id) > tuple_(*decode_cursor(cursor))
+            )
+
         try:
-            resources = self.db.query(CloudResource).filter(CloudResource.cloud_account_id == account_id).all()
-            return resources
+            resources = [
+                dict(row._mapping)
+                for row in query.order_by(CloudResource.resource_type, CloudResource.region, CloudResource.resource_id).limit(limit + 1)
+            ]
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Database error :: {e}"
             )
 
+        next_cursor = None
+        if len(resources) > limit:
+            resources = resources[:limit]
+            last = resources[-1]
+            next_cursor = encode_cursor(last['resource_type'], last['region'], last['resource_id'])
+        return resources, next_cursor
+
+    def get_summary(self, user_id: UUID, account_id: Optional[UUID] = None) -> dict:
+        """
+        Counts of the current inventory by resource_type, region, state (per resource_type) and EC2 instance_type,
+        with the total S3 size in GB, for one account or every account of the user (then also per account).
+        One GROUPING SETS query, nothing but the counts leaves the database
+        """
+        state = resource_state()
+        instance_type = detail_field('instance_type')
+        s3_size = func.sum(cast(detail_field('size'), Float)).filter(CloudResource.resource_type == 's3_bucket')
+        grouping_sets = [
+            tuple_(CloudResource.cloud_account_id),
+            tuple_(CloudResource.resource_type),
+            tuple_(CloudResource.region),
+            tuple_(CloudResource.resource_type, state),
+            tuple_(instance_type),
+            tuple_(),
+        ]
+
+        query = self.db.query(
+            func.grouping(CloudResource.cloud_account_id, CloudResource.resource_type, CloudResource.region, state, instance_type).label('grouping_set'),
+            CloudResource.cloud_account_id,
+            CloudResource.resource_type,
+            CloudResource.region,
+            state.label('state'),
+            instance_type.label('instance_type'),
+            func.count().label('count'),
+            s3_size.label('s3_size_gb')
+        )\
+            .join(CloudAccount, CloudAccount.id == CloudResource.cloud_account_id)\
+            .filter(CloudAccount.user_id == user_id, resource_current())
+        if account_id is not None:
+            self.check_account_owner(account_id, user_id)
+            query = query.filter(CloudResource.cloud_account_id == account_id)
+
+        summary = {'total_resources': 0, 's3_size_gb': 0.0, 'by_resource_type': {}, 'by_region': {}, 'by_state': {}, 'by_instance_type': {}, 'accounts': {}}
+        for row in query.group_by(func.grouping_sets(*grouping_sets)):
+            grouping_set = SUMMARY_SETS[row.grouping_set]
+            if grouping_set == 'total':
+                summary['total_resources'] = row.count
+                summary['s3_size_gb'] = row.s3_size_gb or 0.0
+            elif grouping_set == 'accounts' and account_id is None:
+                summary['accounts'][str(row.cloud_account_id)] = {'resources': row.count, 's3_size_gb': row.s3_size_gb or 0.0}
+            elif grouping_set == 'by_resource_type':
+                summary['by_resource_type'][row.resource_type] = row.count
+            elif grouping_set == 'by_region':
+                summary['by_region'][row.region] = row.count
+            elif grouping_set == 'by_state' and row.state is not None:
+                summary['by_state'].setdefault(row.resource_type, {})[row.state] = row.count
+            elif grouping_set == 'by_instance_type' and row.instance_type is not None:
+                summary['by_instance_type'][row.instance_type] = row.count
+        if account_id is not None:
+            del summary['accounts']
+        return summary
+
+    def check_account_owner(self, account_id: UUID, user_id: UUID):
+        account = self.db.query(CloudAccount.id, CloudAccount.access_key_public).filter(CloudAccount.id == account_id, CloudAccount.user_id == user_id).first()
+        if not account:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cloud Account not found"
+            )
+        return account
+
     def get_credentials_account(self, user_id: UUID, account_id: UUID):
         account_credentials = self.db.query(CloudAccount)\
             .options(load_only(CloudAccount.access_key_public, CloudAccount.dek_encrypted, CloudAccount.cloud_secret_encrypted))\
@@ -95,6 +245,7 @@ class CloudAccountService():
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Cloud Account not found"
             )
-        dek_decrypted: str = decrypt_data(account_credentials.dek_encrypted)
-        secret_key_decrypted: str = decrypt_data(account_credentials.cloud_secret_encrypted, dek_decrypted)
+        with stage('credentials_decrypt'):
+            dek_decrypted: str = decrypt_data(account_credentials.dek_encrypted)
+            secret_key_decrypted: str = decrypt_data(account_credentials.cloud_secret_encrypted, dek_decrypted)
         return {'access_key_public': account_credentials.access_key_public, 'secret_key': secret_key_decrypted}
\ No newline at end of file
@@ -0,0 +1,133 @@
+from datetime import date, timedelta
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from core.config import COST_FORECAST_WINDOW_DAYS
+from core.metrics import stage
+from db.partitions import month_start, utc_today
+from models.cost_rollup import CostDailyTotal, CostMonthlyService, CostMonthlyTotal
+from models.daily_cost import DailyCost
+from typing import List, Optional
+from uuid import UUID
+
+# Each statement covers whole months [:start, :end) of one account, daily_costs is pruned to their partitions
+DAILY_TOTALS_SQL = """
+INSERT INTO cost_daily_totals (account_id, date, cost)
+SELECT account_id, date, sum(cost)
+FROM daily_costs
+WHERE account_id = :account_id AND date >= :start AND date < :end
+GROUP BY account_id, date
+"""
+
+MONTHLY_SERVICES_SQL = """
+INSERT INTO cost_monthly_services (account_id, month, service_name, cost, last_date)
+SELECT account_id, CAST(date_trunc('month', date) AS DATE), service_name, sum(cost), max(date)
+FROM daily_costs
+WHERE account_id = :account_id AND date >= :start AND date < :end
+GROUP BY 1, 2, 3
+"""
+
+# Built from the daily totals just refreshed, a month that is over gets a forecast equal to its cost
+MONTHLY_TOTALS_SQL = """
+WITH months AS (
+    SELECT account_id, CAST(date_trunc('month', date) AS DATE) AS month, sum(cost) AS cost, max(date) AS last_date
+    FROM cost_daily_totals
+    WHERE account_id = :account_id AND date >= :start AND date < :end
+    GROUP BY 1, 2
+)
+INSERT INTO cost_monthly_totals (account_id, month, cost, last_date, forecast)
+SELECT months.account_id, months.month, months.cost, months.last_date,
+    months.cost + COALESCE(recent.daily_cost, 0) * (CAST(months.month + INTERVAL '1 month' AS DATE) - months.last_date - 1)
+FROM months
+LEFT JOIN LATERAL (
+    SELECT avg(cost) AS daily_cost
+    FROM cost_daily_totals
+    WHERE account_id = months.account_id AND date > months.last_date - :window AND date <= months.last_date
+) AS recent ON true
+"""
+
+
+class CostRollupService():
+    """
+    Daily totals, monthly totals per service and per account (month to date and forecast) of daily_costs.
+    refresh rebuilds the months touched by an ingestion, the read methods only touch rollup rows:
+    one per day, per month or per service and month
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def refresh(self, account_id: UUID, start: date, end: date) -> dict:
+        """
+        Rebuild every rollup row of the months overlapping [start, end)
+        """
+        params = {
+            'account_id': account_id,
+            'start': month_start(start),
+            'end': month_start(end - timedelta(days=1), 1),
+            'window': COST_FORECAST_WINDOW_DAYS,
+        }
+        with stage('db_cost_rollup'):
+            for model, column in ((CostDailyTotal, CostDailyTotal.date), (CostMonthlyService, CostMonthlyService.month), (CostMonthlyTotal, CostMonthlyTotal.month)):
+                self.db.query(model).filter(model.account_id == account_id, column >= params['start'], column < params['end'])\
+                    .delete(synchronize_session=False)
+            self.db.execute(text(DAILY_TOTALS_SQL), params)
+            self.db.execute(text(MONTHLY_SERVICES_SQL), params)
+            months = self.db.execute(text(MONTHLY_TOTALS_SQL), params).rowcount
+        return {'start': params['start'].isoformat(), 'end': params['end'].isoformat(), 'months': months}
+
+    def rebuild(self, account_id: UUID) -> Optional[dict]:
+        """
+        Every month of daily_costs, for data ingested before the rollups existed
+        """
+        first, last = self.db.query(func.min(DailyCost.date), func.max(DailyCost.date)).filter(DailyCost.account_id == account_id).one()
+        if first is None:
+            return None
+        return self.refresh(account_id, first, last + timedelta(days=1))
+
+    def summary(self, account_id: UUID, today: Optional[date] = None) -> dict:
+        """
+        Month to date, end of month forecast and cost per service of the current month, with the previous month total
+        """
+        month = month_start(today or utc_today())
+        totals = {
+            row.month: row for row in self.db.query(CostMonthlyTotal)
+            .filter(CostMonthlyTotal.account_id == account_id, CostMonthlyTotal.month.in_([month, month_start(month, -1)]))
+        }
+        current, previous = totals.get(month), totals.get(month_start(month, -1))
+        by_service = self.db.query(CostMonthlyService.service_name, CostMonthlyService.cost)\
+            .filter(CostMonthlyService.account_id == account_id, CostMonthlyService.month == month)\
+            .order_by(CostMonthlyService.cost.desc()).all()
+        return {
+            'month': month,
+            'month_to_date': float(current.cost) if current else 0.0,
+            'forecast': float(current.forecast) if current else 0.0,
+            'last_date': current.last_date if current else None,
+            'previous_month': float(previous.cost) if previous else 0.0,
+            'by_service': [{'service_name': service_name, 'cost': float(cost)} for service_name, cost in by_service],
+        }
+
+    def monthly(self, account_id: UUID, months: int = 12, by_service: bool = False, today: Optional[date] = None) -> List[dict]:
+        first = month_start(today or utc_today(), 1 - months)
+        if by_service:
+            rows = self.db.query(CostMonthlyService.month, CostMonthlyService.service_name, CostMonthlyService.cost)\
+                .filter(CostMonthlyService.account_id == account_id, CostMonthlyService.month >= first)\
+                .order_by(CostMonthlyService.month, CostMonthlyService.cost.desc())
+            return [{'month': row.month, 'service_name': row.service_name, 'cost': float(row.cost)} for row in rows]
+        rows = self.db.query(CostMonthlyTotal.month, CostMonthlyTotal.cost, CostMonthlyTotal.forecast, CostMonthlyTotal.last_date)\
+            .filter(CostMonthlyTotal.account_id == account_id, CostMonthlyTotal.month >= first)\
+            .order_by(CostMonthlyTotal.month)
+        return [{'month': row.month, 'cost': float(row.cost), 'forecast': float(row.forecast), 'last_date': row.last_date} for row in rows]
+
+    def daily(self, account_id: UUID, start: date, end: date, by_service: bool = False) -> List[dict]:
+        """
+        Cost per day of [start, end], per service from daily_costs itself (already one row per service and day)
+        """
+        if by_service:
+            rows = self.db.query(DailyCost.date, DailyCost.service_name, DailyCost.cost)\
+                .filter(DailyCost.account_id == account_id, DailyCost.date >= start, DailyCost.date <= end)\
+                .order_by(DailyCost.date, DailyCost.service_name)
+            return [{'date': row.date, 'service_name': row.service_name, 'cost': float(row.cost)} for row in rows]
+        rows = self.db.query(CostDailyTotal.date, CostDailyTotal.cost)\
+            .filter(CostDailyTotal.account_id == account_id, CostDailyTotal.date >= start, CostDailyTotal.date <= end)\
+            .order_by(CostDailyTotal.date)
+        return [{'date': row.date, 'cost': float(row.cost)} for row in rows]
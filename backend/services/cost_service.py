@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.cloud_account import CloudAccount
+from models.daily_cost import DailyCost
+from services.aws_service import AwsService
+from services.cost_rollup_service import CostRollupService
+from core.config import COST_BACKFILL_DAYS, COST_RESTATEMENT_DAYS
+from db.partitions import retention_start, utc_today
+from typing import Optional
+from uuid import UUID
+
+
+class CostService():
+    """
+    Incremental Cost Explorer ingestion into daily_costs.
+    CloudAccount.costs_ingested_until is the watermark, each run only asks for the days after it
+    plus a restatement window because AWS keeps adjusting the last few days.
+    The rollups of the months it touched are rebuilt in the same transaction.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def ingestion_window(watermark: Optional[date], today: date) -> tuple:
+        if watermark is None:
+            start = today - timedelta(days=COST_BACKFILL_DAYS)
+        else:
+            start = watermark - timedelta(days=COST_RESTATEMENT_DAYS)
+        # Days before the oldest partition of daily_costs could not be stored
+        start = max(start, retention_start('daily_costs', today))
+        # Cost Explorer end dates are exclusive, today is included and restated by the next runs
+        return start, today + timedelta(days=1)
+
+    def ingest_account_costs(self, account_id: UUID, aws_service: AwsService, today: Optional[date] = None) -> dict:
+        today = today or utc_today()
+        account = self.db.query(CloudAccount).filter(CloudAccount.id == account_id).first()
+        start, end = self.ingestion_window(account.costs_ingested_until, today)
+
+        rows = [
+            {'account_id': account_id, **cost}
+            for cost in aws_service.iter_daily_costs(start, end)
+        ]
+        if rows:
+            stmt = insert(DailyCost).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                constraint='_account_date_service_uc',
+                set_={'cost': stmt.excluded.cost, 'currency': stmt.excluded.currency}
+            )
+            self.db.execute(stmt)
+            CostRollupService(self.db).refresh(account_id, start, end)
+
+        account.costs_ingested_until = today
+        return {'start': start.isoformat(), 'end': end.isoformat(), 'rows': len(rows)}
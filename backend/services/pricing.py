@@ -0,0 +1,39 @@
+# On-demand prices (USD) used to estimate waste, mirrors frontend/lib/pricing.ts
+HOURS_PER_MONTH = 730
+
+EC2_HOURLY_PRICE = {
+    't2.micro': 0.0116,
+    't3.micro': 0.0104,
+    't3.medium': 0.0416,
+    'm5.large': 0.107,
+}
+
+RDS_HOURLY_PRICE = {
+    'db.t3.micro': 0.018,
+    'db.t3.medium': 0.072,
+    'db.m5.large': 0.154,
+}
+
+# Per GB-month
+EBS_GB_MONTH_PRICE = {
+    'gp2': 0.10,
+    'gp3': 0.08,
+    'io1': 0.125,
+    'io2': 0.125,
+    'st1': 0.045,
+    'sc1': 0.015,
+    'standard': 0.05,
+}
+
+# Public IPv4 addresses are billed per hour whether they are associated or not
+ELASTIC_IP_HOURLY_PRICE = 0.005
+
+
+def ebs_monthly_cost(volume_type: str, size_gb: float) -> float:
+    return EBS_GB_MONTH_PRICE.get(volume_type, EBS_GB_MONTH_PRICE['gp2']) * (size_gb or 0)
+
+def ec2_monthly_cost(instance_type: str) -> float:
+    return EC2_HOURLY_PRICE.get(instance_type, 0.0) * HOURS_PER_MONTH
+
+def rds_monthly_cost(instance_class: str) -> float:
+    return RDS_HOURLY_PRICE.get(instance_class, 0.0) * HOURS_PER_MONTH
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from db.database import SessionLocal
+from models.resources import CloudResource, detail_field, resource_current
+from typing import Iterator, List, Optional
+from uuid import UUID
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+EXPORT_PARTITION_SIZE = 1000
+BASE_COLUMNS = ['id', 'resource_type', 'resource_id', 'region']
+
+
+class ResourceExportService():
+    """
+    Streams an account inventory out of a server-side cursor, one partition of rows at a time.
+    Nothing but the current partition is ever held in memory.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _columns(self, fields: Optional[List[str]]) -> tuple:
+        columns = [CloudResource.id, CloudResource.resource_type, CloudResource.resource_id, CloudResource.region]
+        if not fields:
+            return columns + [CloudResource.detail], BASE_COLUMNS + ['detail']
+        # Only the requested detail keys leave the database
+        labels = [f"detail.{field}" for field in fields]
+        return columns + [detail_field(field, as_text=False).label(label) for field, label in zip(fields, labels)], BASE_COLUMNS + labels
+
+    def iter_rows(self, account_id: UUID, fields: Optional[List[str]] = None) -> Iterator[tuple]:
+        """
+        Yield (header, rows) once per partition fetched from the cursor
+        """
+        columns, header = self._columns(fields)
+        stmt = select(*columns)\
+            .where(CloudResource.cloud_account_id == account_id, resource_current())\
+            .order_by(CloudResource.resource_type, CloudResource.region, CloudResource.resource_id)\
+            .execution_options(yield_per=EXPORT_PARTITION_SIZE)
+        for partition in self.db.execute(stmt).partitions():
+            yield header, partition
+
+    def stream(self, account_id: UUID, export_format: str = 'ndjson', fields: Optional[List[str]] = None, compress: bool = False) -> Iterator[bytes]:
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        header_written = False
+
+        for header, partition in self.iter_rows(account_id, fields):
+            buffer = io.StringIO()
+            if export_format == 'csv':
+                writer = csv.writer(buffer)
+                if not header_written:
+                    writer.writerow(header)
+                for row in partition:
+                    writer.writerow([json.dumps(value, default=str) if isinstance(value, (dict, list)) else value for value in row])
+            else:
+                for row in partition:
+                    buffer.write(json.dumps(dict(zip(header, row)), default=str))
+                    buffer.write('\n')
+            header_written = True
+
+            chunk = buffer.getvalue().encode()
+            if compressor:
+                # Sync flush so every partition reaches the client as soon as it is read
+                chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield chunk
+
+        if export_format == 'csv' and not header_written:
+            empty_header = io.StringIO()
+            csv.writer(empty_header).writerow(self._columns(fields)[1])
+            chunk = empty_header.getvalue().encode()
+            yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
+
+
+def stream_resources_export(account_id: UUID, export_format: str, fields: Optional[List[str]], compress: bool) -> Iterator[bytes]:
+    """
+    Own session for the lifetime of the response, the request session is closed before the body is sent
+    """
+    db = SessionLocal()
+    try:
+        yield from ResourceExportService(db).stream(account_id, export_format, fields, compress)
+    finally:
+        db.close()
@@ -0,0 +1,166 @@
+import csv
+import hashlib
+import io
+import json
+from sqlalchemy import String, bindparam, func, not_, any_, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from core.metrics import stage
+from models.resources import CloudResource, resource_current
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+STAGING_TABLE = "resource_staging"
+STAGING_COLUMNS = ("resource_type", "resource_id", "region", "detail", "detail_hash")
+
+CREATE_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+    resource_type VARCHAR,
+    resource_id VARCHAR,
+    region VARCHAR,
+    detail JSONB,
+    detail_hash VARCHAR(64)
+)
+"""
+
+# Current versions whose detail changed are closed, the new versions are opened by INSERT_VERSIONS_SQL
+# in the same transaction so both share now() and the history has no gap
+CLOSE_CHANGED_SQL = f"""
+UPDATE resource SET valid_to = now()
+FROM {STAGING_TABLE} staged
+WHERE resource.cloud_account_id = CAST(:account_id AS UUID)
+    AND resource.resource_type = staged.resource_type
+    AND resource.region = staged.region
+    AND resource.resource_id = staged.resource_id
+    AND resource.valid_to IS NULL
+    AND resource.detail_hash IS DISTINCT FROM staged.detail_hash
+"""
+
+# A version is opened for every staged resource without a current one: new, reappeared or just closed.
+# Utilization is carried over from the version closed above, a concurrent scan of the slice is skipped by ON CONFLICT
+INSERT_VERSIONS_SQL = f"""
+INSERT INTO resource (id, cloud_account_id, resource_type, resource_id, region, detail, detail_hash, valid_from, utilization, utilization_updated_at)
+SELECT gen_random_uuid(), CAST(:account_id AS UUID), staged.resource_type, staged.resource_id, staged.region, staged.detail, staged.detail_hash,
+    now(), previous.utilization, previous.utilization_updated_at
+FROM {STAGING_TABLE} staged
+LEFT JOIN LATERAL (
+    SELECT utilization, utilization_updated_at FROM resource
+    WHERE resource.cloud_account_id = CAST(:account_id AS UUID)
+        AND resource.resource_type = staged.resource_type
+        AND resource.region = staged.region
+        AND resource.resource_id = staged.resource_id
+        AND resource.valid_to = now()
+    LIMIT 1
+) previous ON TRUE
+WHERE NOT EXISTS (
+    SELECT 1 FROM resource
+    WHERE resource.cloud_account_id = CAST(:account_id AS UUID)
+        AND resource.resource_type = staged.resource_type
+        AND resource.region = staged.region
+        AND resource.resource_id = staged.resource_id
+        AND resource.valid_to IS NULL
+)
+ON CONFLICT (cloud_account_id, resource_type, region, resource_id) WHERE valid_to IS NULL DO NOTHING
+"""
+
+
+class ResourceSyncService():
+    """
+    Diff-based sync of one (account, resource_type, region) slice of the resource history.
+    Batches are streamed with COPY into a temporary staging table, then one UPDATE closes the current
+    versions whose detail hash changed and one INSERT opens their new versions and the new resources.
+    Resources that were not seen during the scan are closed with a single update.
+    """
+
+    def __init__(self, db: Session, account_id: UUID):
+        self.db = db
+        self.account_id = account_id
+        self._staging_ready = False
+
+    def _copy_to_staging(self, rows: Iterable[tuple]):
+        if not self._staging_ready:
+            self.db.execute(text(CREATE_STAGING_SQL))
+            self._staging_ready = True
+        self.db.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(rows)
+        buffer.seek(0)
+
+        # COPY has to run on the session connection to see the staging table and stay in the transaction
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def upsert_batch(self, resource_type: str, region: str, batch: List[dict], id_key: str = 'resource_id') -> Dict[str, int]:
+        rows = {}
+        for item in batch:
+            item_region = item.get('region', region)
+            detail = json.dumps(item, sort_keys=True, default=str)
+            rows[(item_region, item.get(id_key))] = (
+                resource_type,
+                item.get(id_key),
+                item_region,
+                detail,
+                hashlib.sha256(detail.encode()).hexdigest(),
+            )
+        if not rows:
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        with stage('db_copy'):
+            self._copy_to_staging(rows.values())
+        params = {'account_id': str(self.account_id)}
+        with stage('db_merge'):
+            updated = self.db.execute(text(CLOSE_CHANGED_SQL), params).rowcount
+            opened = self.db.execute(text(INSERT_VERSIONS_SQL), params).rowcount
+        return {
+            'inserted': max(opened - updated, 0),
+            'updated': updated,
+            'unchanged': len(rows) - opened,
+        }
+
+    def remove_missing(self, resource_type: str, seen_ids: Iterable[str], region: Optional[str] = None) -> int:
+        """
+        Close the current versions of the slice that the scan did not return, region=None covers every region
+        """
+        query = self.db.query(CloudResource).filter(
+            CloudResource.cloud_account_id == self.account_id,
+            CloudResource.resource_type == resource_type,
+            resource_current(),
+            not_(CloudResource.resource_id == any_(bindparam('seen_ids', list(seen_ids), type_=ARRAY(String))))
+        )
+        if region is not None:
+            query = query.filter(CloudResource.region == region)
+        with stage('db_remove'):
+            return query.update({'valid_to': func.now()}, synchronize_session=False)
+
+
+class ResourceSliceWriter():
+    """
+    Writes the batches of one collector (one resource_type in one region) as they arrive and keeps the counts.
+    finish() removes what no batch contained, within remove_region (None for collectors listing every region)
+    """
+
+    def __init__(self, db: Session, account_id: UUID, resource_type: str, region: str, id_key: str = 'resource_id', remove_region: Optional[str] = None):
+        self.sync_service = ResourceSyncService(db, account_id)
+        self.resource_type = resource_type
+        self.region = region
+        self.id_key = id_key
+        self.remove_region = remove_region
+        self.counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+        self.seen_ids = set()
+
+    def write(self, batch: List[dict]):
+        for key, value in self.sync_service.upsert_batch(self.resource_type, self.region, batch, id_key=self.id_key).items():
+            self.counts[key] += value
+        self.seen_ids.update(item.get(self.id_key) for item in batch)
+
+    def finish(self) -> Dict[str, int]:
+        self.counts['removed'] = self.sync_service.remove_missing(self.resource_type, self.seen_ids, region=self.remove_region)
+        return self.counts
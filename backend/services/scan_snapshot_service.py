@@ -0,0 +1,183 @@
+import orjson
+import zstandard
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, text, update
+from sqlalchemy.orm import Session
+from core.config import SNAPSHOT_KEYFRAME_INTERVAL, SNAPSHOT_ZSTD_LEVEL, SNAPSHOT_DAILY_AFTER_DAYS, SNAPSHOT_RETENTION_DAYS
+from core.metrics import stage
+from models.resources import CloudResource, resource_current
+from models.scan_result import ScanResult
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+# (resource_type, region, resource_id) -> detail
+Inventory = Dict[Tuple[str, str, str], dict]
+
+# Payloads of a snapshot and the ones it is based on, from the keyframe to the requested scan
+CHAIN_SQL = """
+WITH RECURSIVE chain AS (
+    SELECT id, snapshot, snapshot_base_id, 0 AS depth
+    FROM scan_results
+    WHERE id = :scan_id AND account_id = :account_id AND snapshot IS NOT NULL
+    UNION ALL
+    SELECT s.id, s.snapshot, s.snapshot_base_id, c.depth + 1
+    FROM scan_results s
+    JOIN chain c ON s.id = c.snapshot_base_id
+)
+SELECT snapshot FROM chain ORDER BY depth DESC
+"""
+
+
+def encode_snapshot(inventory: Inventory, base: Optional[Inventory] = None) -> Tuple[bytes, int, bool]:
+    """
+    Compressed payload of inventory: a delta against base when given and smaller than half the inventory,
+    else a keyframe. Returns (payload, uncompressed size, is keyframe)
+    """
+    payload = None
+    if base is not None:
+        upsert = [[*key, detail] for key, detail in inventory.items() if base.get(key) != detail]
+        delete = [list(key) for key in base if key not in inventory]
+        if len(upsert) + len(delete) <= len(inventory) // 2:
+            payload = {'upsert': upsert, 'delete': delete}
+    if payload is None:
+        payload = {'resources': [[*key, detail] for key, detail in inventory.items()]}
+    raw = orjson.dumps(payload)
+    return zstandard.ZstdCompressor(level=SNAPSHOT_ZSTD_LEVEL).compress(raw), len(raw), 'resources' in payload
+
+
+def replay_snapshots(payloads: List[bytes]) -> Inventory:
+    """
+    Inventory at the last payload: the first one must be a keyframe, every following one a delta
+    """
+    decompressor = zstandard.ZstdDecompressor()
+    inventory: Inventory = {}
+    for position, blob in enumerate(payloads):
+        payload = orjson.loads(decompressor.decompress(blob))
+        if 'resources' in payload:
+            inventory = {tuple(record[:3]): record[3] for record in payload['resources']}
+            continue
+        if position == 0:
+            raise ValueError("Snapshot chain does not start with a keyframe")
+        for record in payload['delete']:
+            inventory.pop(tuple(record), None)
+        for record in payload['upsert']:
+            inventory[tuple(record[:3])] = record[3]
+    return inventory
+
+
+class ScanSnapshotService():
+    """
+    Stores the inventory left by each scan in scan_results.snapshot, mostly as deltas against the previous
+    scan of the account with a keyframe every SNAPSHOT_KEYFRAME_INTERVAL scans, and rebuilds any of them
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def current_inventory(self, account_id: UUID) -> Inventory:
+        rows = self.db.query(CloudResource.resource_type, CloudResource.region, CloudResource.resource_id, CloudResource.detail)\
+            .filter(CloudResource.cloud_account_id == account_id, resource_current())
+        return {(row.resource_type, row.region, row.resource_id): row.detail for row in rows}
+
+    def _chain(self, account_id: UUID, scan_id: int) -> List[bytes]:
+        return [row.snapshot for row in self.db.execute(text(CHAIN_SQL), {'scan_id': scan_id, 'account_id': account_id})]
+
+    def reconstruct(self, account_id: UUID, scan_id: int) -> Optional[Inventory]:
+        """
+        Inventory recorded by a scan of the account, None when the scan has no snapshot (failed or expired)
+        """
+        chain = self._chain(account_id, scan_id)
+        return replay_snapshots(chain) if chain else None
+
+    def record(self, scan_result: ScanResult) -> bool:
+        """
+        Snapshot the current inventory of the account on a flushed ScanResult, returns True for a keyframe
+        """
+        with stage('db_snapshot'):
+            inventory = self.current_inventory(scan_result.account_id)
+            previous_id = self.db.query(func.max(ScanResult.id))\
+                .filter(ScanResult.account_id == scan_result.account_id, ScanResult.id < scan_result.id, ScanResult.snapshot.isnot(None))\
+                .scalar()
+            chain = self._chain(scan_result.account_id, previous_id) if previous_id else []
+            base = replay_snapshots(chain) if chain and len(chain) < SNAPSHOT_KEYFRAME_INTERVAL else None
+
+            snapshot, raw_bytes, keyframe = encode_snapshot(inventory, base)
+            scan_result.snapshot = snapshot
+            scan_result.snapshot_base_id = None if keyframe else previous_id
+            scan_result.snapshot_resources = len(inventory)
+            scan_result.snapshot_bytes = raw_bytes
+            return keyframe
+
+    def list_scans(self, account_id: UUID, limit: int = 50, before: Optional[int] = None) -> List[dict]:
+        query = self.db.query(
+            ScanResult.id,
+            ScanResult.created_at,
+            ScanResult.status,
+            ScanResult.raw_data['regions'].label('regions'),
+            ScanResult.raw_data['counts'].label('counts'),
+            ScanResult.snapshot_base_id,
+            ScanResult.snapshot_resources,
+            ScanResult.snapshot_bytes,
+            func.octet_length(ScanResult.snapshot).label('snapshot_compressed_bytes')
+        ).filter(ScanResult.account_id == account_id)
+        if before is not None:
+            query = query.filter(ScanResult.id < before)
+        return [dict(row._mapping) for row in query.order_by(ScanResult.id.desc()).limit(limit)]
+
+    def compact(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Keep every snapshot of the last SNAPSHOT_DAILY_AFTER_DAYS, then the last one of each day until
+        SNAPSHOT_RETENTION_DAYS. Deltas based on a dropped snapshot are rewritten against the nearest kept one first.
+        The latest snapshot of an account is always kept, the next scan is based on it
+        """
+        now = now or datetime.now(timezone.utc)
+        daily_cutoff = now - timedelta(days=SNAPSHOT_DAILY_AFTER_DAYS)
+        retention_cutoff = now - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+        account_ids = [row.account_id for row in self.db.query(ScanResult.account_id)
+                       .filter(ScanResult.snapshot.isnot(None), ScanResult.created_at < daily_cutoff).distinct()]
+
+        totals = {'accounts': len(account_ids), 'dropped': 0, 'rebased': 0}
+        for account_id in account_ids:
+            dropped, rebased = self._compact_account(account_id, daily_cutoff, retention_cutoff)
+            self.db.commit()
+            totals['dropped'] += dropped
+            totals['rebased'] += rebased
+        return totals
+
+    def _compact_account(self, account_id: UUID, daily_cutoff: datetime, retention_cutoff: datetime) -> Tuple[int, int]:
+        rows = self.db.query(ScanResult.id, ScanResult.created_at, ScanResult.snapshot_base_id)\
+            .filter(ScanResult.account_id == account_id, ScanResult.snapshot.isnot(None))\
+            .order_by(ScanResult.id).all()
+        last_of_day = {}
+        for row in rows:
+            last_of_day[row.created_at.astimezone(timezone.utc).date()] = row.id
+        dropped = {
+            row.id for row in rows[:-1]
+            if row.created_at < retention_cutoff or (row.created_at < daily_cutoff and last_of_day[row.created_at.astimezone(timezone.utc).date()] != row.id)
+        }
+        if not dropped:
+            return 0, 0
+
+        bases = {row.id: row.snapshot_base_id for row in rows}
+        rebased = 0
+        for row in rows:
+            if row.id in dropped or row.snapshot_base_id not in dropped:
+                continue
+            ancestor = row.snapshot_base_id
+            while ancestor in dropped:
+                ancestor = bases.get(ancestor)
+            inventory = self.reconstruct(account_id, row.id)
+            snapshot, raw_bytes, keyframe = encode_snapshot(inventory, self.reconstruct(account_id, ancestor) if ancestor else None)
+            base_id = None if keyframe else ancestor
+            self.db.execute(
+                update(ScanResult).where(ScanResult.id == row.id)
+                .values(snapshot=snapshot, snapshot_base_id=base_id, snapshot_bytes=raw_bytes)
+            )
+            bases[row.id] = base_id
+            rebased += 1
+
+        self.db.execute(
+            update(ScanResult).where(ScanResult.id.in_(dropped))
+            .values(snapshot=None, snapshot_base_id=None, snapshot_resources=None, snapshot_bytes=None)
+        )
+        return len(dropped), rebased
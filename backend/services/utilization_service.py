@@ -0,0 +1,56 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from core.metrics import stage
+from models.resources import CloudResource, resource_current, resource_state
+from services.aws_service import UTILIZATION_METRICS
+from typing import Dict, List, Optional
+from uuid import UUID
+
+# Only resources that are billed for compute are worth measuring
+RUNNING_STATES = ['running', 'available']
+
+
+class UtilizationService():
+    """
+    Reads the running instances of an account grouped by region and stores the CloudWatch
+    summaries returned by AwsService.get_utilization next to each resource
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def running_resources(self, account_id: UUID, regions: Optional[List[str]] = None) -> Dict[str, List[dict]]:
+        query = self.db.query(CloudResource.id, CloudResource.resource_type, CloudResource.resource_id, CloudResource.region)\
+            .filter(
+                CloudResource.cloud_account_id == account_id,
+                resource_current(),
+                CloudResource.resource_type.in_(list(UTILIZATION_METRICS)),
+                resource_state().in_(RUNNING_STATES)
+            )
+        if regions:
+            query = query.filter(CloudResource.region.in_(regions))
+
+        by_region: Dict[str, List[dict]] = defaultdict(list)
+        for row in query:
+            by_region[row.region].append(dict(row._mapping))
+        return dict(by_region)
+
+    def store(self, resources: List[dict], summaries: Dict[tuple, dict]) -> int:
+        """
+        One executemany UPDATE by primary key, resources without datapoints get an empty summary
+        """
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                'id': resource['id'],
+                'utilization': summaries.get((resource['resource_type'], resource['resource_id']), {}),
+                'utilization_updated_at': now,
+            }
+            for resource in resources
+        ]
+        if rows:
+            with stage('db_utilization'):
+                self.db.execute(update(CloudResource), rows)
+        return len(rows)
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.anomaly import Anomaly, SeverityEnum
+from models.resources import CloudResource, resource_current
+from db.partitions import utc_today
+from core.config import IDLE_CPU_PERCENT, IDLE_NETWORK_BYTES, UTILIZATION_WINDOW_DAYS
+from services.pricing import ELASTIC_IP_HOURLY_PRICE, HOURS_PER_MONTH, ebs_monthly_cost, ec2_monthly_cost, rds_monthly_cost
+from typing import Callable, Dict, Iterable, List, Optional
+from uuid import UUID
+
+
+# Resource types the InventoryIndex reads, loaded even when no rule targets them
+INDEXED_TYPES = {'ec2_instance', 'ebs_volume', 'elastic_ip'}
+
+
+class InventoryIndex():
+    """
+    Lookups built in one pass over the inventory so every rule is a dict access, not a query
+    """
+
+    def __init__(self):
+        self.instance_state: Dict[str, str] = {}
+        self.volume_attachments: Dict[str, List[str]] = {}
+        self.eip_association: Dict[str, Optional[str]] = {}
+        self.utilization: Dict[str, dict] = {}
+
+    def add(self, resource_type: str, resource_id: str, detail: dict, utilization: Optional[dict] = None):
+        if utilization:
+            self.utilization[resource_id] = utilization
+        if resource_type == 'ec2_instance':
+            self.instance_state[resource_id] = detail.get('state')
+        elif resource_type == 'ebs_volume':
+            self.volume_attachments[resource_id] = [attachment.get('instance_id') for attachment in detail.get('attachments', [])]
+        elif resource_type == 'elastic_ip':
+            # Instance, or network interface when the address is not attached to an instance, None when unassociated
+            self.eip_association[resource_id] = (detail.get('instance_id') or detail.get('network_interface_id') or detail.get('association_id')) \
+                if detail.get('association_id') else None
+
+    def all_stopped(self, instance_ids: Iterable[str]) -> bool:
+        states = [self.instance_state.get(instance_id) for instance_id in instance_ids]
+        return bool(states) and all(state == 'stopped' for state in states)
+
+    def p95_below(self, resource_id: str, thresholds: Dict[str, float]) -> bool:
+        """
+        True when every metric of `thresholds` has a p95 under its limit, with at least half
+        of the window covered so freshly launched resources are never reported
+        """
+        utilization = self.utilization.get(resource_id, {})
+        for metric_name, threshold in thresholds.items():
+            summary = utilization.get(metric_name)
+            if not summary or summary['datapoints'] < UTILIZATION_WINDOW_DAYS * 12 or summary['p95'] >= threshold:
+                return False
+        return True
+
+
+class WasteRule():
+    """
+    A waste finding for one resource type: `check(resource_id, detail, index)` returns the estimated monthly waste or None
+    """
+
+    def __init__(self, issue_type: str, resource_type: str, severity: SeverityEnum, check: Callable[[str, dict, InventoryIndex], Optional[float]]):
+        self.issue_type = issue_type
+        self.resource_type = resource_type
+        self.severity = severity
+        self.check = check
+
+
+WASTE_RULES = [
+    WasteRule(
+        'ZOMBIE_VOLUME', 'ebs_volume', SeverityEnum.HIGH,
+        lambda resource_id, detail, index: ebs_monthly_cost(detail.get('volume_type'), detail.get('size'))
+        if detail.get('state') == 'available' and not index.volume_attachments[resource_id] else None
+    ),
+    WasteRule(
+        'VOLUME_ON_STOPPED_INSTANCE', 'ebs_volume', SeverityEnum.LOW,
+        lambda resource_id, detail, index: ebs_monthly_cost(detail.get('volume_type'), detail.get('size'))
+        if index.all_stopped(index.volume_attachments[resource_id]) else None
+    ),
+    WasteRule(
+        'ORPHAN_EIP', 'elastic_ip', SeverityEnum.MEDIUM,
+        lambda resource_id, detail, index: ELASTIC_IP_HOURLY_PRICE * HOURS_PER_MONTH if not index.eip_association[resource_id] else None
+    ),
+    WasteRule(
+        'EIP_ON_STOPPED_INSTANCE', 'elastic_ip', SeverityEnum.LOW,
+        lambda resource_id, detail, index: ELASTIC_IP_HOURLY_PRICE * HOURS_PER_MONTH
+        if index.eip_association[resource_id] and index.all_stopped([index.eip_association[resource_id]]) else None
+    ),
+    WasteRule(
+        'IDLE_INSTANCE', 'ec2_instance', SeverityEnum.MEDIUM,
+        lambda resource_id, detail, index: ec2_monthly_cost(detail.get('instance_type'))
+        if detail.get('state') == 'running' and index.p95_below(
+            resource_id,
+            {'CPUUtilization': IDLE_CPU_PERCENT, 'NetworkIn': IDLE_NETWORK_BYTES, 'NetworkOut': IDLE_NETWORK_BYTES}
+        ) else None
+    ),
+    WasteRule(
+        'IDLE_DATABASE', 'rds_instance', SeverityEnum.MEDIUM,
+        lambda resource_id, detail, index: rds_monthly_cost(detail.get('resource_class'))
+        if detail.get('resource_status') == 'available' and index.p95_below(
+            resource_id,
+            {'CPUUtilization': IDLE_CPU_PERCENT, 'DatabaseConnections': 1}
+        ) else None
+    ),
+]
+
+
+class WasteService():
+    """
+    Evaluates WASTE_RULES against an account inventory: one pass builds the InventoryIndex,
+    one pass runs the rules registered for each resource type, findings are bulk inserted as anomalies
+    """
+
+    def __init__(self, db: Session, rules: List[WasteRule] = WASTE_RULES):
+        self.db = db
+        self.rules_by_type: Dict[str, List[WasteRule]] = defaultdict(list)
+        for rule in rules:
+            self.rules_by_type[rule.resource_type].append(rule)
+
+    def evaluate(self, inventory: List[tuple]) -> List[dict]:
+        index = InventoryIndex()
+        for resource_type, resource_id, detail, utilization in inventory:
+            index.add(resource_type, resource_id, detail, utilization)
+
+        findings = []
+        for resource_type, resource_id, detail, utilization in inventory:
+            for rule in self.rules_by_type.get(resource_type, []):
+                waste = rule.check(resource_id, detail, index)
+                if waste is not None:
+                    findings.append({'resource_id': resource_id, 'issue_type': rule.issue_type, 'severity': rule.severity, 'estimated_waste': waste})
+        return findings
+
+    def detect(self, account_id: UUID, today: Optional[date] = None) -> int:
+        today = today or utc_today()
+        inventory = self.db.query(CloudResource.resource_type, CloudResource.resource_id, CloudResource.detail, CloudResource.utilization)\
+            .filter(CloudResource.cloud_account_id == account_id, resource_current(), CloudResource.resource_type.in_(INDEXED_TYPES | set(self.rules_by_type)))\
+            .all()
+
+        findings = self.evaluate(inventory)
+        if not findings:
+            return 0
+
+        # Midnight of the detection day, a resource is reported at most once per issue and day
+        detected_at = datetime.combine(today, time.min, tzinfo=timezone.utc)
+        rows = [
+            {
+                'account_id': account_id,
+                'detected_at': detected_at,
+                'resource_id': finding['resource_id'],
+                'issue_type': finding['issue_type'],
+                'severity': finding['severity'],
+                'estimated_waste': Decimal(str(round(finding['estimated_waste'], 2))),
+            }
+            for finding in findings
+        ]
+        stmt = insert(Anomaly).values(rows).on_conflict_do_nothing(constraint='_unique_anomaly_uc')
+        return self.db.execute(stmt).rowcount
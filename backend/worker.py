@@ -1,77 +1,546 @@
 from core.celery_app import celery_app
+import asyncio
+import random
+import time
+from contextlib import nullcontext
+from celery import chord, group
+from celery.exceptions import Ignore
+from core.config import SCAN_MAX_PARALLELISM, SCAN_JITTER_SECONDS, SCAN_LOCK_TTL_SECONDS, SCAN_LARGE_ACCOUNT_RESOURCES, SCAN_LARGE_QUEUE, \
+    SCAN_ENGINE, SCAN_ASYNC_ACCOUNTS_PER_TASK, SCAN_PROGRESS_TTL_SECONDS
+from core.locks import scan_lock, scan_slots, ScanHeartbeat
+from core.progress import publish_progress, get_progress_owner, set_progress_owner, SCAN_FINISHED
+from core.metrics import SCAN_SECONDS, record_scan_service, stage
 from services.aws_service import AwsService
 from db.database import SessionLocal
+from db.partitions import maintain_partitions
 from services.cloud_account_service import CloudAccountService
-from uuid import UUID
-from models.resources import CloudResource
+from uuid import UUID, uuid4
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from services.resource_sync_service import ResourceSliceWriter
+from services.cost_service import CostService
+from services.cost_rollup_service import CostRollupService
+from services.anomaly_service import AnomalyService
+from services.waste_service import WasteService
+from services.utilization_service import UtilizationService
+from services.scan_snapshot_service import ScanSnapshotService
+from services.async_scan_engine import AsyncScanEngine
+from models.cloud_account import CloudAccount, ScanStatusEnum
+from models.resources import CloudResource, resource_current
+from models.scan_result import ScanResult, StatusEnum as ScanResultStatus
+
+# service -> (resource_type, AwsService collector, id field in the collected record)
+SCAN_COLLECTORS = {
+    'ec2': ('ec2_instance', 'iter_ec2_instances', 'instance_id'),
+    's3': ('s3_bucket', 'iter_s3_buckets', 'resource_id'),
+    'rds': ('rds_instance', 'iter_rds_instances', 'resource_id'),
+    'ebs': ('ebs_volume', 'iter_ebs_volumes', 'resource_id'),
+    'eip': ('elastic_ip', 'iter_elastic_ips', 'resource_id'),
+}
+# Services whose listing is the same from every region, collected once per account
+GLOBAL_SERVICES = {'s3'}
+# Lock region held by scan-all
+ALL_REGIONS = '*'
+# Queue of the celery worker started without -Q
+SCAN_DEFAULT_QUEUE = 'celery'
+# Seconds a scan waits before asking again for a slot when SCAN_MAX_CONCURRENT scans are running
+SCAN_SLOT_RETRY_SECONDS = (10, 60)
+
+
+def _sync_service(db: Session, account_id: UUID, service: str, aws_service: AwsService, region: str,
+                  on_batch: Optional[Callable[[int, Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """
+    Stream a collector into the resource table batch by batch, only changed rows are written
+    and resources that disappeared are removed once the whole listing has been seen.
+    on_batch(resources collected so far, counts so far) is called after each batch
+    """
+    resource_type, collector, id_key = SCAN_COLLECTORS[service]
+    writer = ResourceSliceWriter(db, account_id, resource_type, region, id_key, remove_region=None if service in GLOBAL_SERVICES else region)
+    collected = 0
+    for batch in getattr(aws_service, collector)():
+        writer.write(batch)
+        collected += len(batch)
+        if on_batch:
+            on_batch(collected, writer.counts)
+    return writer.finish()
+
+def _add_counts(total: Dict[str, int], counts: Dict[str, int]):
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
+
+def _collect_service(account_id: UUID, service: str, aws_service: AwsService, region: str,
+                     on_batch: Optional[Callable[[int, Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """
+    Run one region x service collector in its own DB session, each scan subtask commits on its own
+    """
+    db = SessionLocal()
+    try:
+        counts = _sync_service(db, account_id, service, aws_service, region, on_batch)
+        with stage('db_commit'):
+            db.commit()
+        return counts
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def async_progress_id(task_id: str, account_id: str) -> str:
+    """
+    Progress stream of one account of a task_scan_accounts_async batch, the batch covers accounts of several users
+    """
+    return f"{task_id}:{account_id}"
+
+def _hold_scan_slot(task, locks: List[Tuple[str, str]], batched: bool = False) -> List[Tuple[str, str]]:
+    """
+    Take one of the SCAN_MAX_CONCURRENT global slots, the task is retried with jitter while the fleet is saturated.
+    The (account_id, region) locks of the task are extended on every attempt so a long wait never lets a second
+    scan in, a lock that expired is taken again when free. Returns the locks still held, the task is dropped without any.
+    Progress goes to the stream of the task, or of each account for a batched task
+    """
+    def stream(account_id: str) -> str:
+        return async_progress_id(task.request.id, account_id) if batched else task.request.id
+
+    held = []
+    for account_id, region in locks:
+        if scan_lock.extend(account_id, region, task.request.id, ttl=SCAN_LOCK_TTL_SECONDS + SCAN_SLOT_RETRY_SECONDS[1]) \
+                or not scan_lock.acquire(account_id, region, task.request.id):
+            held.append((account_id, region))
+        else:
+            publish_progress(stream(account_id), SCAN_FINISHED, status=ScanResultStatus.FAILED.value, error='Another scan of this account is running')
+    if not held:
+        raise Ignore()
+    if not scan_slots.acquire(task.request.id):
+        for progress_id in {stream(account_id) for account_id, _ in held}:
+            publish_progress(progress_id, 'scan_waiting', reason='Every scan slot is in use')
+        raise task.retry(countdown=random.uniform(*SCAN_SLOT_RETRY_SECONDS))
+    return held
+
+def _release_scan(scan_task_id: str, account_id: str, region: str):
+    scan_slots.release(scan_task_id)
+    scan_lock.release(account_id, region, scan_task_id)
+
+def _fail_scan(scan_task_id: str, account_id: str, region: str, error: Exception):
+    """
+    The scan stopped before its chord was started: free it and close the progress stream
+    """
+    _release_scan(scan_task_id, account_id, region)
+    publish_progress(scan_task_id, SCAN_FINISHED, status=ScanResultStatus.FAILED.value, error=str(error))
+
+def _get_credentials(account_id: str, user_id: str) -> dict:
+    db = SessionLocal()
+    try:
+        return CloudAccountService(db).get_credentials_account(UUID(user_id), UUID(account_id))
+    finally:
+        db.close()
+
+def _scan_queue(account_id: str) -> str:
+    """
+    Accounts whose last scan stored SCAN_LARGE_ACCOUNT_RESOURCES resources or more go to their own queue
+    """
+    db = SessionLocal()
+    try:
+        resources = db.query(func.count(CloudResource.id)).filter(CloudResource.cloud_account_id == UUID(account_id), resource_current()).scalar()
+    finally:
+        db.close()
+    return SCAN_LARGE_QUEUE if resources >= SCAN_LARGE_ACCOUNT_RESOURCES else SCAN_DEFAULT_QUEUE
+
+def _scan_chord(account_id: str, user_id: str, jobs: List[tuple], lock_region: str, scan_task_id: str, started_at: float):
+    """
+    One task_scan_service per (service, region) in parallel on any worker, task_merge_scan once they all returned.
+    Each of them keeps the scan lock and slot alive while it runs
+    """
+    queue = _scan_queue(account_id)
+    header = group([
+        task_scan_service.si(account_id, user_id, service, region, scan_task_id, lock_region).set(queue=queue) for service, region in jobs
+    ])
+    publish_progress(scan_task_id, 'scan_started', jobs=[{'service': service, 'region': region} for service, region in jobs])
+    return chord(header, task_merge_scan.s(account_id, user_id, lock_region, scan_task_id, started_at).set(queue=queue))
+
+@celery_app.task(bind=True, max_retries=None)
+def task_scan_account(self, account_id: str, user_id: str, region: str):
+    _hold_scan_slot(self, [(account_id, region)])
+    started_at = time.time()
+    try:
+        scan = _scan_chord(account_id, user_id, [(service, region) for service in SCAN_COLLECTORS], region, self.request.id, started_at)
+    except Exception as e:
+        _fail_scan(self.request.id, account_id, region, e)
+        raise
+    # The chord takes over this task id, its result is the one of task_merge_scan
+    return self.replace(scan)
+
+@celery_app.task(bind=True, max_retries=None)
+def task_scan_account_all_regions(self, account_id: str, user_id: str):
+    _hold_scan_slot(self, [(account_id, ALL_REGIONS)])
+    started_at = time.time()
+    try:
+        credentials = _get_credentials(account_id, user_id)
+        aws_service = AwsService(credentials['access_key_public'], credentials['secret_key'], region='us-east-1')
+        regions = aws_service.get_enabled_regions()
+
+        # Regional services run once per enabled region, global ones once per account
+        jobs = [(service, region) for region in regions for service in SCAN_COLLECTORS if service not in GLOBAL_SERVICES]
+        jobs += [(service, aws_service.region) for service in GLOBAL_SERVICES]
+        scan = _scan_chord(account_id, user_id, jobs, ALL_REGIONS, self.request.id, started_at)
+    except Exception as e:
+        _fail_scan(self.request.id, account_id, ALL_REGIONS, e)
+        raise
+    return self.replace(scan)
 
 @celery_app.task
-def task_scan_account(account_id: str, user_id: str, region: str):
+def task_scan_service(account_id: str, user_id: str, service: str, region: str, scan_task_id: Optional[str] = None,
+                      lock_region: Optional[str] = None) -> dict:
+    """
+    One region x service collector committed on its own. Failures are returned to task_merge_scan
+    instead of raised, so one service never discards the work of the others.
+    Progress goes to the stream of scan_task_id when given, its lock on lock_region is kept alive meanwhile
+    """
+    result = {'service': service, 'region': region}
+
+    def progress(event_type: str, **fields):
+        if scan_task_id:
+            publish_progress(scan_task_id, event_type, service=service, region=region, **fields)
+
+    progress('service_started')
+    started_at = time.perf_counter()
     try:
-        db = SessionLocal()
-        cloud_account_service = CloudAccountService(db)
-        credentials = cloud_account_service.get_credentials_account(UUID(user_id), UUID(account_id))
-        aws_service = AwsService(credentials['access_key_public'], credentials['secret_key'], region=region)
-        instances = aws_service.scan_ec2_instances()
-        buckets = aws_service.scan_s3_bucket()
-        rds_instances = aws_service.scan_rds_instance()
-
-        # Delete old resources
-        db.query(CloudResource).filter(
-            CloudResource.cloud_account_id == UUID(account_id),
-            CloudResource.resource_type == 'ec2_instance',
-            CloudResource.region == region
-        ).delete()
-        db.query(CloudResource).filter(
-            CloudResource.cloud_account_id == UUID(account_id),
-            CloudResource.resource_type == 'rds_instance',
-            CloudResource.region == region
-        ).delete()
-        db.query(CloudResource).filter(
-            CloudResource.cloud_account_id == UUID(account_id),
-            CloudResource.resource_type == 's3_bucket'
-        ).delete()
-
-        new_resources = []
-        # Add EC2 instances
-        for instance in instances:
-            instance_resource = CloudResource(
-                cloud_account_id=UUID(account_id),
-                resource_type='ec2_instance',
-                resource_id=instance.get('instance_id'),
-                region=region,
-                detail=instance
+        with ScanHeartbeat(scan_task_id, [(account_id, lock_region)] if lock_region else []) if scan_task_id else nullcontext():
+            credentials = _get_credentials(account_id, user_id)
+            aws_service = AwsService(credentials['access_key_public'], credentials['secret_key'], region=region)
+            counts = _collect_service(
+                UUID(account_id), service, aws_service, region,
+                on_batch=lambda collected, counts: progress('batch_written', collected=collected, counts=counts)
             )
-            new_resources.append(instance_resource)
-
-        # Add S3 buckets
-        for bucket in buckets:
-            bucket_resource = CloudResource(
-                cloud_account_id=UUID(account_id),
-                resource_type='s3_bucket',
-                resource_id=bucket.get('resource_id'),
-                region=bucket.get('region'),
-                detail=bucket
+        result.update(status=ScanResultStatus.SUCCESS.value, counts=counts, error=None)
+        progress('service_finished', counts=counts)
+    except Exception as e:
+        print(f"Error in worker ({service} / {region}): {e}")
+        result.update(status=ScanResultStatus.FAILED.value, counts={}, error=str(e))
+        progress('service_failed', error=str(e))
+    record_scan_service(service, SCAN_COLLECTORS[service][0], result['status'], time.perf_counter() - started_at, result['counts'])
+    return result
+
+def _record_scan(results: List[dict], account_id: str, user_id: str, scan_task_id: str) -> dict:
+    """
+    Record every (service, region) outcome and a snapshot of the inventory in a ScanResult,
+    update the account scan status, then collect utilization for the regions that were scanned
+    """
+    counts = {}
+    for result in results:
+        _add_counts(counts, result['counts'])
+    failed = [f"{result['service']}/{result['region']}: {result['error']}" for result in results if result['status'] == ScanResultStatus.FAILED.value]
+    succeeded_regions = sorted({result['region'] for result in results if result['status'] == ScanResultStatus.SUCCESS.value})
+
+    db = SessionLocal()
+    try:
+        with stage('db_record_scan'):
+            scan_result = ScanResult(
+                account_id=UUID(account_id),
+                status=ScanResultStatus.FAILED if failed else ScanResultStatus.SUCCESS,
+                raw_data={'task_id': scan_task_id, 'regions': sorted({result['region'] for result in results}), 'counts': counts, 'services': results}
             )
-            new_resources.append(bucket_resource)
-
-        # Add RDS instances
-        for rds_instance in rds_instances:
-            rds_resource = CloudResource(
-                cloud_account_id=UUID(account_id),
-                resource_type='rds_instance',
-                resource_id=rds_instance.get('resource_id'),
-                region=rds_instance.get('region'),
-                detail=rds_instance
+            db.add(scan_result)
+            db.flush()
+            ScanSnapshotService(db).record(scan_result)
+            db.query(CloudAccount).filter(CloudAccount.id == UUID(account_id)).update(
+                {'last_scan_status': ScanStatusEnum.FAILED if failed else ScanStatusEnum.SUCCESS, 'last_scan_at': func.now()},
+                synchronize_session=False
             )
-            new_resources.append(rds_resource)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error in worker: {e}")
+        raise
+    finally:
+        db.close()
+
+    if succeeded_regions:
+        task_collect_utilization.delay(account_id, user_id, succeeded_regions)
+    return {'status': 'FAILED' if failed else 'SUCCESS', 'counts': counts, 'regions': len(succeeded_regions), 'failed': failed}
 
-        db.add_all(new_resources)
+@celery_app.task
+def task_merge_scan(results: List[dict], account_id: str, user_id: str, lock_region: str, scan_task_id: str, started_at: Optional[float] = None):
+    """
+    Chord callback: record the scan, then free the scan lock and slot and close the progress stream
+    """
+    try:
+        with ScanHeartbeat(scan_task_id, [(account_id, lock_region)]):
+            summary = _record_scan(results, account_id, user_id, scan_task_id)
+    except Exception as e:
+        _release_scan(scan_task_id, account_id, lock_region)
+        publish_progress(scan_task_id, SCAN_FINISHED, status=ScanResultStatus.FAILED.value, error=str(e))
+        raise
+    _release_scan(scan_task_id, account_id, lock_region)
+    if started_at:
+        SCAN_SECONDS.labels(summary['status']).observe(time.time() - started_at)
+    publish_progress(scan_task_id, SCAN_FINISHED, **summary)
+    return summary
+
+@celery_app.task(bind=True, max_retries=None)
+def task_scan_accounts_async(self, accounts: List[List[str]]):
+    """
+    Scan every enabled region of several accounts ([[account_id, user_id], ...]) concurrently from this
+    process with AsyncScanEngine. The whole batch takes one scan slot, the scheduler holds the '*' lock
+    of each account with this task id, accounts whose lock was lost while waiting are left out.
+    Each account gets its own progress stream (async_progress_id), from scan_started to scan_finished
+    """
+    held = _hold_scan_slot(self, [(account_id, ALL_REGIONS) for account_id, _ in accounts], batched=True)
+    accounts = [[account_id, user_id] for account_id, user_id in accounts if (account_id, ALL_REGIONS) in held]
+    finished = set()
+    try:
+        for account_id, _ in accounts:
+            publish_progress(async_progress_id(self.request.id, account_id), 'scan_started')
+        results = {}
+        credentials = {}
+        for account_id, user_id in accounts:
+            try:
+                credentials[account_id] = _get_credentials(account_id, user_id)
+            except Exception as e:
+                results[account_id] = [{'service': '*', 'region': '*', 'status': ScanResultStatus.FAILED.value, 'counts': {}, 'error': str(e)}]
+
+        with ScanHeartbeat(self.request.id, held):
+            results.update(asyncio.run(AsyncScanEngine(SCAN_COLLECTORS, GLOBAL_SERVICES).scan_accounts(credentials)))
+            summaries = {}
+            for account_id, user_id in accounts:
+                summaries[account_id] = _record_scan(results[account_id], account_id, user_id, self.request.id)
+                publish_progress(async_progress_id(self.request.id, account_id), SCAN_FINISHED, **summaries[account_id])
+                finished.add(account_id)
+            return summaries
+    except Exception as e:
+        for account_id, _ in accounts:
+            if account_id not in finished:
+                publish_progress(async_progress_id(self.request.id, account_id), SCAN_FINISHED, status=ScanResultStatus.FAILED.value, error=str(e))
+        raise
+    finally:
+        scan_slots.release(self.request.id)
+        for account_id, _ in accounts:
+            scan_lock.release(account_id, ALL_REGIONS, self.request.id)
+
+def enqueue_scan(account_id: str, user_id: str, region: Optional[str] = None, countdown: float = 0) -> Tuple[str, bool]:
+    """
+    Start a scan of one region (every enabled region when None) unless one is already in flight for it.
+    Returns (task_id, True) for a new scan, (progress id of the running scan, False) otherwise
+    """
+    task_id = str(uuid4())
+    lock_region = region or ALL_REGIONS
+    running_task_id = scan_lock.acquire(account_id, lock_region, task_id, ttl=SCAN_LOCK_TTL_SECONDS + int(countdown))
+    if running_task_id:
+        # A scheduled async batch publishes the progress of this account on its own stream
+        if lock_region == ALL_REGIONS and get_progress_owner(async_progress_id(running_task_id, account_id)):
+            return async_progress_id(running_task_id, account_id), False
+        return running_task_id, False
+    try:
+        set_progress_owner(task_id, user_id, ttl=SCAN_PROGRESS_TTL_SECONDS + int(countdown))
+        if region:
+            task_scan_account.apply_async((account_id, user_id, region), task_id=task_id, countdown=countdown)
+        else:
+            task_scan_account_all_regions.apply_async((account_id, user_id), task_id=task_id, countdown=countdown)
+    except Exception:
+        scan_lock.release(account_id, lock_region, task_id)
+        raise
+    return task_id, True
+
+def enqueue_async_scans(accounts: List[tuple]) -> int:
+    """
+    Spread accounts over task_scan_accounts_async batches of SCAN_ASYNC_ACCOUNTS_PER_TASK,
+    accounts with a scan in flight are left out. Returns the number of accounts enqueued
+    """
+    started = 0
+    for start in range(0, len(accounts), SCAN_ASYNC_ACCOUNTS_PER_TASK):
+        task_id = str(uuid4())
+        countdown = random.uniform(0, SCAN_JITTER_SECONDS)
+        batch = [
+            [str(account_id), str(user_id)]
+            for account_id, user_id in accounts[start:start + SCAN_ASYNC_ACCOUNTS_PER_TASK]
+            if not scan_lock.acquire(str(account_id), ALL_REGIONS, task_id, ttl=SCAN_LOCK_TTL_SECONDS + int(countdown))
+        ]
+        if not batch:
+            continue
+        try:
+            for account_id, user_id in batch:
+                set_progress_owner(async_progress_id(task_id, account_id), user_id, ttl=SCAN_PROGRESS_TTL_SECONDS + int(countdown))
+            task_scan_accounts_async.apply_async((batch,), task_id=task_id, countdown=countdown)
+        except Exception:
+            for account_id, _ in batch:
+                scan_lock.release(account_id, ALL_REGIONS, task_id)
+            raise
+        started += len(batch)
+    return started
+
+def _aws_accounts() -> List[tuple]:
+    db = SessionLocal()
+    try:
+        return db.query(CloudAccount.id, CloudAccount.user_id).filter(CloudAccount.provider == 'AWS').all()
+    finally:
+        db.close()
+
+@celery_app.task
+def task_schedule_scans():
+    """
+    Beat entry point: scan-all for every AWS account, start times spread over SCAN_JITTER_SECONDS.
+    With SCAN_ENGINE='async' accounts are batched into task_scan_accounts_async instead of one chord each
+    """
+    accounts = _aws_accounts()
+    if SCAN_ENGINE == 'async':
+        return {'accounts': len(accounts), 'started': enqueue_async_scans(accounts)}
+    started = 0
+    for account_id, user_id in accounts:
+        _, created = enqueue_scan(str(account_id), str(user_id), countdown=random.uniform(0, SCAN_JITTER_SECONDS))
+        started += created
+    return {'accounts': len(accounts), 'started': started}
+
+@celery_app.task
+def task_schedule_cost_ingestion():
+    """
+    Beat entry point: daily cost ingestion for every AWS account, anomaly detection follows each ingestion
+    """
+    accounts = _aws_accounts()
+    for account_id, user_id in accounts:
+        task_ingest_costs.apply_async((str(account_id), str(user_id)), countdown=random.uniform(0, SCAN_JITTER_SECONDS))
+    return {'accounts': len(accounts)}
+
+@celery_app.task
+def task_compact_snapshots():
+    """
+    Beat entry point: thin and expire the scan snapshots of every account
+    """
+    db = SessionLocal()
+    try:
+        return ScanSnapshotService(db).compact()
+    except Exception as e:
+        db.rollback()
+        print(f"Error in worker: {e}")
+        raise
+    finally:
+        db.close()
+
+@celery_app.task
+def task_maintain_partitions():
+    """
+    Beat entry point: create the monthly partitions ahead, drop the ones past their retention
+    """
+    db = SessionLocal()
+    try:
+        result = maintain_partitions(db.connection())
+        db.commit()
+        return result
+    except Exception as e:
+        db.rollback()
+        print(f"Error in worker: {e}")
+        raise
+    finally:
+        db.close()
+
+@celery_app.task
+def task_ingest_costs(account_id: str, user_id: str):
+    db = SessionLocal()
+    try:
+        cloud_account_service = CloudAccountService(db)
+        credentials = cloud_account_service.get_credentials_account(UUID(user_id), UUID(account_id))
+        aws_service = AwsService(credentials['access_key_public'], credentials['secret_key'], region='us-east-1')
+        result = CostService(db).ingest_account_costs(UUID(account_id), aws_service)
+        db.commit()
+        task_detect_cost_anomalies.delay([account_id])
+        return result
+    except Exception as e:
+        db.rollback()
+        print(f"Error in worker: {e}")
+        raise
+    finally:
+        db.close()
+
+@celery_app.task
+def task_rebuild_cost_rollups(account_ids: Optional[List[str]] = None):
+    """
+    Rollups of every month of daily_costs, for costs ingested before the rollups existed
+    """
+    db = SessionLocal()
+    try:
+        account_ids = account_ids or [str(account_id) for account_id, _ in _aws_accounts()]
+        rollup_service = CostRollupService(db)
+        for account_id in account_ids:
+            rollup_service.rebuild(UUID(account_id))
+            db.commit()
+        return {'accounts': len(account_ids)}
+    except Exception as e:
+        db.rollback()
+        print(f"Error in worker: {e}")
+        raise
+    finally:
+        db.close()
+
+@celery_app.task
+def task_detect_cost_anomalies(account_ids: Optional[List[str]] = None):
+    db = SessionLocal()
+    try:
+        inserted = AnomalyService(db).detect([UUID(account_id) for account_id in account_ids] if account_ids else None)
+        db.commit()
+        return {'anomalies': inserted}
+    except Exception as e:
+        db.rollback()
+        print(f"Error in worker: {e}")
+        raise
+    finally:
+        db.close()
+
+@celery_app.task
+def task_collect_utilization(account_id: str, user_id: str, regions: Optional[List[str]] = None, max_parallelism: int = SCAN_MAX_PARALLELISM):
+    """
+    CloudWatch summaries for every running instance of the account, one GetMetricData
+    collector per region in parallel, then waste detection on the fresh numbers
+    """
+    db = SessionLocal()
+    try:
+        credentials = CloudAccountService(db).get_credentials_account(UUID(user_id), UUID(account_id))
+        utilization_service = UtilizationService(db)
+        by_region = utilization_service.running_resources(UUID(account_id), regions)
+
+        aws_service = AwsService(credentials['access_key_public'], credentials['secret_key'], region='us-east-1')
+        summaries = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max_parallelism) as executor:
+            futures = {
+                executor.submit(aws_service.for_region(region).get_utilization, resources): region
+                for region, resources in by_region.items()
+            }
+            for future in as_completed(futures):
+                region = futures[future]
+                try:
+                    summaries.update(future.result())
+                except Exception as e:
+                    print(f"Error in worker ({region}): {e}")
+                    errors[region] = e
+
+        # Regions that failed keep their previous summaries
+        stored = utilization_service.store(
+            [resource for region, resources in by_region.items() if region not in errors for resource in resources],
+            summaries
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error in worker: {e}")
+        raise
+    finally:
+        db.close()
+
+    task_detect_waste.delay(account_id)
+    if errors:
+        raise ValueError(f"Utilization collected for {stored} resources, {len(errors)} regions failed :: {'; '.join(f'{region}: {e}' for region, e in errors.items())}")
+    return {'resources': stored, 'regions': len(by_region)}
+
+@celery_app.task
+def task_detect_waste(account_id: str):
+    db = SessionLocal()
+    try:
+        inserted = WasteService(db).detect(UUID(account_id))
         db.commit()
-        return f"Scan finished: {len(new_resources)} resources saved."
+        return {'findings': inserted}
     except Exception as e:
         db.rollback()
         print(f"Error in worker: {e}")
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
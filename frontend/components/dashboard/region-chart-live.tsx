@@ -24,24 +24,11 @@ export function RegionChartLive() {
 
     setLoading(true)
     try {
-      const response = await accountAPI.getAccountResources(selectedAccount.id)
-      const resources = response.data
-
-      // Group by region and count
-      const resourcesByRegion: Record<string, number> = {}
-
-      resources.forEach((resource) => {
-        const region = resource.region || 'unknown'
-
-        if (resourcesByRegion[region]) {
-          resourcesByRegion[region] += 1
-        } else {
-          resourcesByRegion[region] = 1
-        }
-      })
+      // Counts per region come from the account summary, the inventory is not downloaded
+      const response = await accountAPI.getAccountSummary(selectedAccount.id)
 
       // Convert to chart data format
-      const data = Object.entries(resourcesByRegion)
+      const data = Object.entries(response.data.by_region)
         .map(([name, value], index) => ({
           name,
           value,
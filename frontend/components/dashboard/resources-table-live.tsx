@@ -4,14 +4,27 @@ import { useState, useMemo, useEffect } from 'react'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Badge } from '@/components/ui/badge'
 import { Button } from '@/components/ui/button'
-import { ArrowUpDown, RefreshCw } from 'lucide-react'
+import { Input } from '@/components/ui/input'
+import {
+  Select,
+  SelectContent,
+  SelectItem,
+  SelectTrigger,
+  SelectValue,
+} from '@/components/ui/select'
+import { ArrowUpDown, ChevronLeft, ChevronRight, RefreshCw } from 'lucide-react'
 import { cn, formatCurrency } from '@/lib/utils'
 import { accountAPI } from '@/lib/api'
 import { useAccountStore } from '@/lib/store'
 import { getEC2Price, getRDSPrice, getS3PricePerGBHour } from '@/lib/pricing'
-import type { Resource } from '@/types'
+import type { AccountSummary, Resource, ResourceQuery } from '@/types'
 
 type SortField = 'resource_type' | 'resource_id' | 'cost_per_hour' | 'cost_current' | 'cost_mtd'
+type ResourceFilters = Pick<ResourceQuery, 'resource_type' | 'region' | 'state' | 'tag_key' | 'tag_value'>
+
+const PAGE_SIZE = 100
+// Radix Select items cannot have an empty value
+const ALL = 'all'
 
 export function ResourcesTableLive() {
   const { selectedAccount } = useAccountStore()
@@ -19,28 +32,86 @@ export function ResourcesTableLive() {
   const [loading, setLoading] = useState(false)
   const [sortField, setSortField] = useState<SortField>('cost_current')
   const [sortDirection, setSortDirection] = useState<'asc' | 'desc'>('desc')
+  const [summary, setSummary] = useState<AccountSummary | null>(null)
+  const [filters, setFilters] = useState<ResourceFilters>({})
+  const [tagKey, setTagKey] = useState('')
+  const [tagValue, setTagValue] = useState('')
+  // Cursor of every page visited so far, cursors[page] loads the current one
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined])
+  const [page, setPage] = useState(0)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [accountId, setAccountId] = useState(selectedAccount?.id)
+
+  // Reset during render so the page load below never runs with the filters or cursors of the previous account
+  if (selectedAccount?.id !== accountId) {
+    setAccountId(selectedAccount?.id)
+    setFilters({})
+    setTagKey('')
+    setTagValue('')
+    setCursors([undefined])
+    setPage(0)
+    setSummary(null)
+  }
 
   useEffect(() => {
     if (selectedAccount) {
-      loadResources()
+      accountAPI.getAccountSummary(selectedAccount.id)
+        .then((response) => setSummary(response.data))
+        .catch((error) => console.error('Failed to load resource summary:', error))
     }
   }, [selectedAccount])
 
+  useEffect(() => {
+    if (selectedAccount) {
+      loadResources()
+    }
+  }, [selectedAccount, filters, page])
+
   const loadResources = async () => {
     if (!selectedAccount) return
 
     setLoading(true)
     try {
-      const response = await accountAPI.getAccountResources(selectedAccount.id)
+      const response = await accountAPI.getAccountResourcesPage(selectedAccount.id, {
+        ...filters,
+        limit: PAGE_SIZE,
+        cursor: cursors[page],
+      })
       setResources(response.data)
+      setNextCursor(response.next_cursor)
     } catch (error) {
       console.error('Failed to load resources:', error)
       setResources([])
+      setNextCursor(null)
     } finally {
       setLoading(false)
     }
   }
 
+  const applyFilters = (changes: ResourceFilters) => {
+    setFilters((current) => ({ ...current, ...changes }))
+    setCursors([undefined])
+    setPage(0)
+  }
+
+  const goToNextPage = () => {
+    if (!nextCursor) return
+    setCursors([...cursors.slice(0, page + 1), nextCursor])
+    setPage(page + 1)
+  }
+
+  const goToPreviousPage = () => {
+    if (page > 0) setPage(page - 1)
+  }
+
+  const stateOptions = useMemo(() => {
+    if (!summary) return []
+    const states = filters.resource_type
+      ? Object.keys(summary.by_state[filters.resource_type] || {})
+      : Object.values(summary.by_state).flatMap((byState) => Object.keys(byState))
+    return Array.from(new Set(states)).sort()
+  }, [summary, filters.resource_type])
+
   const calculateCostPerHour = (resource: Resource): number => {
     const detail = resource.detail
 
@@ -278,7 +349,8 @@ export function ResourcesTableLive() {
         <div>
           <CardTitle>Ressources Actives</CardTitle>
           <CardDescription>
-            {resources.length} ressource{resources.length !== 1 ? 's' : ''} trouvée{resources.length !== 1 ? 's' : ''}
+            Page {page + 1} · {resources.length} ressource{resources.length !== 1 ? 's' : ''}
+            {summary ? ` sur ${summary.total_resources} dans le compte` : ''}
           </CardDescription>
         </div>
         <Button
@@ -292,13 +364,78 @@ export function ResourcesTableLive() {
         </Button>
       </CardHeader>
       <CardContent>
+        <div className="grid grid-cols-1 md:grid-cols-5 gap-3 mb-4">
+          <Select
+            value={filters.resource_type || ALL}
+            onValueChange={(value) => applyFilters({ resource_type: value === ALL ? undefined : value, state: undefined })}
+          >
+            <SelectTrigger>
+              <SelectValue placeholder="Service" />
+            </SelectTrigger>
+            <SelectContent>
+              <SelectItem value={ALL}>Tous les services</SelectItem>
+              {Object.keys(summary?.by_resource_type || {}).sort().map((resourceType) => (
+                <SelectItem key={resourceType} value={resourceType}>
+                  {resourceType}
+                </SelectItem>
+              ))}
+            </SelectContent>
+          </Select>
+          <Select
+            value={filters.region || ALL}
+            onValueChange={(value) => applyFilters({ region: value === ALL ? undefined : value })}
+          >
+            <SelectTrigger>
+              <SelectValue placeholder="Région" />
+            </SelectTrigger>
+            <SelectContent>
+              <SelectItem value={ALL}>Toutes les régions</SelectItem>
+              {Object.keys(summary?.by_region || {}).sort().map((region) => (
+                <SelectItem key={region} value={region}>
+                  {region}
+                </SelectItem>
+              ))}
+            </SelectContent>
+          </Select>
+          <Select
+            value={filters.state || ALL}
+            onValueChange={(value) => applyFilters({ state: value === ALL ? undefined : value })}
+          >
+            <SelectTrigger>
+              <SelectValue placeholder="Status" />
+            </SelectTrigger>
+            <SelectContent>
+              <SelectItem value={ALL}>Tous les status</SelectItem>
+              {stateOptions.map((state) => (
+                <SelectItem key={state} value={state}>
+                  {state}
+                </SelectItem>
+              ))}
+            </SelectContent>
+          </Select>
+          <form
+            className="md:col-span-2 flex space-x-2"
+            onSubmit={(event) => {
+              event.preventDefault()
+              applyFilters({ tag_key: tagKey.trim() || undefined, tag_value: tagKey.trim() && tagValue.trim() ? tagValue.trim() : undefined })
+            }}
+          >
+            <Input placeholder="Tag (clé)" value={tagKey} onChange={(event) => setTagKey(event.target.value)} />
+            <Input placeholder="Valeur" value={tagValue} onChange={(event) => setTagValue(event.target.value)} />
+            <Button type="submit" variant="outline">
+              Filtrer
+            </Button>
+          </form>
+        </div>
         {loading && resources.length === 0 ? (
           <div className="text-center py-8 text-gray-500">
             Chargement des ressources...
           </div>
         ) : resources.length === 0 ? (
           <div className="text-center py-8 text-gray-500">
-            Aucune ressource trouvée. Lancez un scan pour découvrir vos ressources.
+            {Object.values(filters).some(Boolean) || page > 0
+              ? 'Aucune ressource ne correspond à ces filtres.'
+              : 'Aucune ressource trouvée. Lancez un scan pour découvrir vos ressources.'}
           </div>
         ) : (
           <div className="overflow-x-auto">
@@ -401,6 +538,16 @@ export function ResourcesTableLive() {
             </table>
           </div>
         )}
+        <div className="flex items-center justify-end space-x-2 mt-4">
+          <Button variant="outline" size="sm" onClick={goToPreviousPage} disabled={loading || page === 0}>
+            <ChevronLeft className="w-4 h-4 mr-1" />
+            Précédent
+          </Button>
+          <Button variant="outline" size="sm" onClick={goToNextPage} disabled={loading || !nextCursor}>
+            Suivant
+            <ChevronRight className="w-4 h-4 ml-1" />
+          </Button>
+        </div>
       </CardContent>
     </Card>
   )
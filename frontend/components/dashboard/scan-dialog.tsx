@@ -1,6 +1,6 @@
 'use client'
 
-import { useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import {
   Dialog,
   DialogContent,
@@ -22,6 +22,7 @@ import {
 import { scanAPI } from '@/lib/api'
 import { formatErrorMessage } from '@/lib/utils'
 import { Play, Loader2, CheckCircle, XCircle } from 'lucide-react'
+import type { ScanProgressEvent } from '@/types'
 
 interface ScanDialogProps {
   accountId: string
@@ -46,38 +47,102 @@ export function ScanDialog({ accountId, accountName }: ScanDialogProps) {
   const [scanResult, setScanResult] = useState<'success' | 'error' | null>(null)
   const [error, setError] = useState('')
   const [taskId, setTaskId] = useState<string | null>(null)
+  const [progress, setProgress] = useState({ jobs: 0, done: 0, resources: 0, current: '' })
+  const [streamLost, setStreamLost] = useState(false)
+  const streamRef = useRef<AbortController | null>(null)
+
+  // Stop following the scan when the dialog is unmounted
+  useEffect(() => () => streamRef.current?.abort(), [])
+
+  const onProgress = (event: ScanProgressEvent) => {
+    setProgress((previous) => {
+      switch (event.type) {
+        case 'scan_waiting':
+          return { ...previous, current: 'En attente d\'un créneau de scan...' }
+        case 'scan_started':
+          return { ...previous, jobs: event.jobs?.length ?? 0 }
+        case 'service_started':
+          return { ...previous, current: `${event.service} / ${event.region}` }
+        case 'batch_written':
+          return { ...previous, current: `${event.service} / ${event.region}: ${event.collected} ressources` }
+        case 'service_finished':
+        case 'service_failed':
+          return {
+            ...previous,
+            done: previous.done + 1,
+            resources: previous.resources + (event.counts?.inserted ?? 0) + (event.counts?.updated ?? 0) + (event.counts?.unchanged ?? 0),
+          }
+        default:
+          return previous
+      }
+    })
+    if (event.type === 'scan_finished') {
+      if (event.status === 'FAILED') {
+        setScanResult('error')
+        setError(event.error || 'Échec du scan')
+      }
+      setScanning(false)
+    }
+  }
 
   const handleScan = async () => {
     setScanning(true)
     setScanResult(null)
     setError('')
     setTaskId(null)
+    setStreamLost(false)
+    setProgress({ jobs: 0, done: 0, resources: 0, current: '' })
 
+    let scanTaskId: string
     try {
       const response = await scanAPI.startScan(accountId, region)
-      setTaskId(response.data.task_id)
+      scanTaskId = response.data.task_id
+      setTaskId(scanTaskId)
       setScanResult('success')
+    } catch (err: any) {
+      setScanResult('error')
+      setError(formatErrorMessage(err) || 'Échec du scan')
+      setScanning(false)
+      return
+    }
 
-      // Auto-close after showing success
+    let succeeded = false
+    try {
+      streamRef.current = new AbortController()
+      await scanAPI.streamProgress(
+        scanTaskId,
+        (event) => {
+          succeeded = succeeded || (event.type === 'scan_finished' && event.status === 'SUCCESS')
+          onProgress(event)
+        },
+        streamRef.current.signal,
+      )
+    } catch (err: any) {
+      // The scan keeps running without the stream, only its progress is lost
+      if (err?.name === 'AbortError') return
+      setStreamLost(true)
+    } finally {
+      setScanning(false)
+    }
+
+    if (succeeded) {
+      // Refresh the resources list once the scan is recorded
       setTimeout(() => {
         setOpen(false)
         resetForm()
-        // Optionally refresh the resources list here
         window.location.reload()
       }, 2000)
-    } catch (err: any) {
-      setScanResult('error')
-      setError(formatErrorMessage(err) || 'Échec du scan')
-    } finally {
-      setScanning(false)
     }
   }
 
   const resetForm = () => {
+    streamRef.current?.abort()
     setRegion('eu-west-3')
     setScanResult(null)
     setError('')
     setTaskId(null)
+    setStreamLost(false)
+    setProgress({ jobs: 0, done: 0, resources: 0, current: '' })
   }
 
   return (
@@ -131,7 +196,18 @@ export function ScanDialog({ accountId, accountName }: ScanDialogProps) {
             <div className="text-sm text-green-700 bg-green-50 p-3 rounded-md flex items-center space-x-2">
               <CheckCircle className="w-4 h-4" />
               <div>
-                <p className="font-semibold">Scan lancé avec succès!</p>
+                <p className="font-semibold">{scanning ? 'Scan en cours' : 'Scan lancé avec succès!'}</p>
+                {progress.jobs > 0 && (
+                  <p className="text-xs mt-1">
+                    {progress.done} / {progress.jobs} services, {progress.resources} ressources
+                  </p>
+                )}
+                {scanning && progress.current && <p className="text-xs mt-1">{progress.current}</p>}
+                {streamLost && (
+                  <p className="text-xs mt-1">
+                    Suivi indisponible : le scan continue en arrière-plan, actualisez la page une fois terminé.
+                  </p>
+                )}
                 <p className="text-xs mt-1">Task ID: {taskId}</p>
               </div>
             </div>
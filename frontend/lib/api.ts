@@ -7,7 +7,14 @@ import type {
   CloudAccount,
   CreateAccountData,
   Resource,
+  ResourcePage,
+  ResourceQuery,
+  AccountSummary,
+  CostSummary,
+  MonthlyCost,
+  DailyCost,
   ScanTask,
+  ScanProgressEvent,
   ConnectionTestResponse,
 } from '@/types'
 
@@ -83,8 +90,46 @@ export const accountAPI = {
     return response.data
   },
 
-  getAccountResources: async (accountId: string): Promise<{ message: string; data: Resource[] }> => {
-    const response = await api.get(`/account/${accountId}/resources`)
+  getAccountResourcesPage: async (accountId: string, params: ResourceQuery = {}): Promise<ResourcePage> => {
+    const response = await api.get(`/account/${accountId}/resources`, { params })
+    return response.data
+  },
+
+  getAccountResources: async (accountId: string, params: ResourceQuery = {}): Promise<{ message: string; data: Resource[] }> => {
+    // Follows the cursors until the last page, only for views that need the whole inventory (cost estimates)
+    const page = await accountAPI.getAccountResourcesPage(accountId, { limit: 1000, ...params })
+    const resources = [...page.data]
+    let cursor = page.next_cursor
+    while (cursor) {
+      const next = await accountAPI.getAccountResourcesPage(accountId, { limit: 1000, ...params, cursor })
+      resources.push(...next.data)
+      cursor = next.next_cursor
+    }
+    return { message: page.message, data: resources }
+  },
+
+  getAccountSummary: async (accountId: string): Promise<{ message: string; data: AccountSummary }> => {
+    const response = await api.get(`/account/${accountId}/summary`)
+    return response.data
+  },
+
+  getAccountsSummary: async (): Promise<{ message: string; data: AccountSummary }> => {
+    const response = await api.get('/account/summary')
+    return response.data
+  },
+
+  getCostSummary: async (accountId: string): Promise<{ message: string; data: CostSummary }> => {
+    const response = await api.get(`/account/${accountId}/costs/summary`)
+    return response.data
+  },
+
+  getMonthlyCosts: async (accountId: string, params: { months?: number; by_service?: boolean } = {}): Promise<{ message: string; data: MonthlyCost[] }> => {
+    const response = await api.get(`/account/${accountId}/costs/monthly`, { params })
+    return response.data
+  },
+
+  getDailyCosts: async (accountId: string, params: { start?: string; end?: string; by_service?: boolean } = {}): Promise<{ message: string; data: DailyCost[] }> => {
+    const response = await api.get(`/account/${accountId}/costs/daily`, { params })
     return response.data
   },
 
@@ -104,6 +149,36 @@ export const scanAPI = {
     const response = await api.get(`/scan/task/${taskId}`)
     return response.data
   },
+
+  // Server-Sent Events read with fetch, EventSource cannot send the Authorization header
+  streamProgress: async (
+    taskId: string,
+    onEvent: (event: ScanProgressEvent) => void,
+    signal?: AbortSignal,
+  ): Promise<void> => {
+    const token = localStorage.getItem('access_token')
+    const response = await fetch(`${API_URL}/scan/task/${taskId}/events`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+      signal,
+    })
+    if (!response.ok || !response.body) {
+      throw new Error(`Progress stream unavailable (${response.status})`)
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) return
+      buffer += value
+      const messages = buffer.split('\n\n')
+      buffer = messages.pop() ?? ''
+      for (const message of messages) {
+        const data = message.split('\n').find((line) => line.startsWith('data: '))
+        if (data) onEvent(JSON.parse(data.slice('data: '.length)))
+      }
+    }
+  },
 }
 
 export default api
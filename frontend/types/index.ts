@@ -49,6 +49,65 @@ export interface Resource {
   resource_id: string
   region: string
   detail: Record<string, any>
+  // metric -> { p50, p95, max, datapoints } over the last 14 days, EC2 / RDS only
+  utilization?: Record<string, { p50: number; p95: number; max: number; datapoints: number }> | null
+  // Validity of this version, valid_to is null for the current inventory
+  valid_from?: string
+  valid_to?: string | null
+}
+
+export interface ResourceQuery {
+  limit?: number
+  cursor?: string
+  resource_type?: string
+  region?: string
+  state?: string
+  tag_key?: string
+  tag_value?: string
+  // ISO 8601 instant, the inventory as it was at that time
+  as_of?: string
+}
+
+export interface ResourcePage {
+  message: string
+  data: Resource[]
+  next_cursor: string | null
+}
+
+export interface AccountSummary {
+  total_resources: number
+  s3_size_gb: number
+  by_resource_type: Record<string, number>
+  by_region: Record<string, number>
+  // resource_type -> state (EC2 state, RDS status) -> count
+  by_state: Record<string, Record<string, number>>
+  by_instance_type: Record<string, number>
+  // Cross-account summary only
+  accounts?: Record<string, { resources: number; s3_size_gb: number }>
+}
+
+export interface CostSummary {
+  // First day of the current month, ISO date
+  month: string
+  month_to_date: number
+  forecast: number
+  last_date: string | null
+  previous_month: number
+  by_service: { service_name: string; cost: number }[]
+}
+
+export interface MonthlyCost {
+  month: string
+  cost: number
+  forecast?: number
+  last_date?: string
+  service_name?: string
+}
+
+export interface DailyCost {
+  date: string
+  cost: number
+  service_name?: string
 }
 
 export interface ScanTask {
@@ -58,6 +117,19 @@ export interface ScanTask {
   error?: any
 }
 
+export interface ScanProgressEvent {
+  seq: number
+  type: 'scan_waiting' | 'scan_started' | 'service_started' | 'batch_written' | 'service_finished' | 'service_failed' | 'scan_finished'
+  at: number
+  service?: string
+  region?: string
+  jobs?: { service: string; region: string }[]
+  collected?: number
+  counts?: Record<string, number>
+  status?: string
+  error?: string
+}
+
 export interface ConnectionTestResponse {
   Account: string
   UserId: string